@@ -0,0 +1,106 @@
+#!/usr/bin/python
+
+#Import-time benchmark for Mission Control
+#Starts a fresh interpreter for every run, times an import statement inside it, and records which
+#heavy dependencies the statement loaded, so that the startup cost of short-lived scripts that only
+#parse() and export() can be compared between versions.
+#
+#usage: python bench_import.py --statement "from missionControl import parse" --repeat 20 --out bench_import.json
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+STATEMENTS = ['from missionControl import parse']
+
+#modules that missionControl only needs for visualization, layout and upload
+HEAVY = ['numpy', 'matplotlib', 'json_utils', 'layout_utils', 'graphspace_utils', 'http.client', 'concurrent.futures', 'getpass']
+
+PROBE = '''import time
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+import json, sys
+print(json.dumps([elapsed, [m for m in %r if m in sys.modules]]))
+'''
+
+
+def run_once(statement, env):
+    #runs the statement in a new interpreter and returns (seconds for the statement, seconds for the whole process, heavy modules loaded)
+    start = time.perf_counter()
+    out = subprocess.check_output([sys.executable, '-c', PROBE % (statement, HEAVY)], env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    wall = time.perf_counter() - start
+    elapsed, loaded = json.loads(out.decode('utf8').strip().splitlines()[-1])
+    return elapsed, wall, loaded
+
+
+def bench_statement(statement, repeat, bytecode_cache):
+    cache = tempfile.mkdtemp(prefix='mc_pycache_')
+    env = dict(os.environ)
+    env['PYTHONPYCACHEPREFIX'] = cache
+    env['PYTHONWARNINGS'] = 'ignore'
+    if bytecode_cache:
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+    else:
+        env['PYTHONDONTWRITEBYTECODE'] = '1'
+    try:
+        if bytecode_cache:
+            run_once(statement, env)  #warm-up run that writes the bytecode cache
+        runs = [run_once(statement, env) for i in range(repeat)]
+    finally:
+        shutil.rmtree(cache)
+
+    imports = [r[0] for r in runs]
+    walls = [r[1] for r in runs]
+    return {
+        'statement': statement,
+        'import_seconds': {'min': min(imports), 'median': statistics.median(imports)},
+        'process_seconds': {'min': min(walls), 'median': statistics.median(walls)},
+        'heavy_modules_loaded': runs[-1][2],
+    }
+
+
+def git_version():
+    try:
+        out = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL)
+        return out.decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark for importing Mission Control in a fresh interpreter.')
+    parser.add_argument('--statement', action='append', default=None, help='import statement to time; may be given several times (default "' + STATEMENTS[0] + '")')
+    parser.add_argument('--repeat', type=int, default=20, help='fresh interpreters per statement (default 20)')
+    parser.add_argument('--no-bytecode-cache', action='store_true', help='compile the modules in every run, as when __pycache__ cannot be written')
+    parser.add_argument('--out', default='bench_import.json', help='file for machine-readable results (default bench_import.json)')
+    args = parser.parse_args()
+
+    statements = args.statement or STATEMENTS
+    results = {
+        'version': git_version(),
+        'python': platform.python_version(),
+        'repeat': args.repeat,
+        'bytecode_cache': not args.no_bytecode_cache,
+        'statements': [bench_statement(s, args.repeat, not args.no_bytecode_cache) for s in statements],
+    }
+
+    for r in results['statements']:
+        print('%-45s import %7.1f ms (median %7.1f ms)  process %7.1f ms  loaded: %s' % (r['statement'], r['import_seconds']['min'] * 1000,
+              r['import_seconds']['median'] * 1000, r['process_seconds']['min'] * 1000, ', '.join(r['heavy_modules_loaded']) or 'none'))
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=4)
+    print('results written to ' + args.out)
+
+
+if __name__ == '__main__':
+    main()
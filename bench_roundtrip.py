@@ -0,0 +1,185 @@
+#!/usr/bin/python
+
+#Round-trip throughput benchmark for Mission Control
+#Times Graph.export() -> parse() and make_json_data() -> write_json() on synthetic graphs,
+#checks that both round trips are lossless, and writes the results as JSON so that
+#numbers from different versions can be compared.
+#
+#usage: python bench_roundtrip.py --nodes 10000 --edges 50000 --visual background_color,shape,line_color,width --out bench_roundtrip.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+import json_utils
+from missionControl import Graph, Node, Edge, parse, discrete_coloring, pick_shape
+
+
+VISUALS = ['background_color', 'border_color', 'size', 'shape', 'line_color', 'width']
+
+
+def make_graph(n_nodes, n_edges, n_groups=8, seed=0):
+    #builds a random undirected Graph with a numeric, a categorical and a boolean node attribute and a numeric edge attribute
+    rng = random.Random(seed)
+    nodes = []
+    for i in range(n_nodes):
+        n = Node('n' + str(i))
+        for attrName, value in [('score', rng.random() * 100), ('group', 'g' + str(rng.randrange(n_groups))), ('flag', rng.random() < 0.5)]:
+            n.newAttr(attrName)
+            n.put(attrName, value)
+        nodes.append(n)
+
+    edges = []
+    seen = set()
+    while len(edges) < n_edges:
+        s = 'n' + str(rng.randrange(n_nodes))
+        t = 'n' + str(rng.randrange(n_nodes))
+        e = Edge(s, t)
+        if s == t or e.get('ID') in seen:
+            continue
+        seen.add(e.get('ID'))
+        e.newAttr('weight')
+        e.put('weight', rng.random() * 10)
+        edges.append(e)
+    return Graph(nodes, edges, False)
+
+
+def install_visuals(g, visuals):
+    #installs the given visual attributes without going through the interactive UI
+    for GS_attr in visuals:
+        if GS_attr in ['background_color', 'border_color']:
+            g.scaleGradient('score', [255, 0, 0], [0, 0, 255], GS_attr)
+        elif GS_attr == 'size':
+            g.scaleBySize('score', max_size=60, min_size=20)
+        elif GS_attr == 'shape':
+            attr_dict, group_dict = g.discretizeAttr('group')
+            g.installNodeAttr('__shape__', dict((k, pick_shape(v)) for k, v in attr_dict.items()))
+            g.GSnodeAttrInstall('shape')
+        elif GS_attr == 'line_color':
+            g.scaleGradient('weight', [0, 0, 0], [255, 0, 0], GS_attr, n_or_e='e')
+        elif GS_attr == 'width':
+            g.scaleEdgeWidth('weight', max_size=10, min_size=2)
+        else:
+            raise NameError("Unknown visual attribute '" + str(GS_attr) + "'. Choose from " + str(VISUALS))
+
+
+def graph_state(g):
+    #everything a round trip through export() and parse() should preserve
+    nodes = dict((n.get('ID'), dict(n.d)) for n in g.nodes)
+    edges = dict((e.get('ID'), dict(e.d)) for e in g.edges)
+    return nodes, edges, sorted(g.GSnodeDir), sorted(g.GSedgeDir)
+
+
+def timed(f, *args, **kwargs):
+    #runs f with its console output suppressed and returns (result, seconds)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = f(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+    return result, elapsed
+
+
+def rates(n_bytes, n_elements, seconds):
+    return {'seconds': seconds, 'bytes': n_bytes, 'MB_per_s': n_bytes / 1e6 / seconds, 'elements_per_s': n_elements / seconds}
+
+
+def bench_export_parse(g, workdir):
+    edgefile = os.path.join(workdir, 'edges.txt')
+    nodefile = os.path.join(workdir, 'nodes.txt')
+    n_elements = len(g.nodes) + len(g.edges)
+
+    _, t_export = timed(g.export, edgefile, nodefile)
+    n_bytes = os.path.getsize(edgefile) + os.path.getsize(nodefile)
+    parsed, t_parse = timed(parse, edgefile, nodefile=nodefile)
+
+    return {
+        'export': rates(n_bytes, n_elements, t_export),
+        'parse': rates(n_bytes, n_elements, t_parse),
+        'lossless': graph_state(parsed) == graph_state(g),
+    }
+
+
+def bench_json(g, workdir):
+    jsonfile = os.path.join(workdir, 'graph.json')
+    n_ls = [x.get('ID') for x in g.nodes]
+    e_ls = [[e.get('source'), e.get('target')] for e in g.edges]
+    n_elements = len(n_ls) + len(e_ls)
+    g.GSattrsUpdate()
+    GS_nodes = g.defaultizeNodes()
+    GS_edges = g.defaultizeEdges()
+
+    data, t_make = timed(json_utils.make_json_data, n_ls, e_ls, GS_nodes, GS_edges, 'bench', 'round trip benchmark', ['bench'])
+    _, t_write = timed(json_utils.write_json, data, jsonfile)
+    n_bytes = os.path.getsize(jsonfile)
+    with open(jsonfile) as f:
+        loaded = json.load(f)
+
+    return {
+        'make_json_data': rates(n_bytes, n_elements, t_make),
+        'write_json': rates(n_bytes, n_elements, t_write),
+        'lossless': loaded == data,
+    }
+
+
+def git_version():
+    try:
+        out = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL)
+        return out.decode('utf8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Round-trip throughput benchmark for export/parse and make_json_data/write_json.')
+    parser.add_argument('--nodes', type=int, default=10000, help='number of nodes (default 10000)')
+    parser.add_argument('--edges', type=int, default=50000, help='number of edges (default 50000)')
+    parser.add_argument('--visual', default=','.join(VISUALS), help='comma separated visual attributes to install, from ' + str(VISUALS))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest run is reported (default 3)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the synthetic graph')
+    parser.add_argument('--out', default='bench_roundtrip.json', help='file for machine-readable results (default bench_roundtrip.json)')
+    args = parser.parse_args()
+
+    visuals = [v for v in args.visual.split(',') if v]
+    g = make_graph(args.nodes, args.edges, seed=args.seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        install_visuals(g, visuals)
+
+    workdir = tempfile.mkdtemp(prefix='mc_bench_')
+    try:
+        runs = [(bench_export_parse(g, workdir), bench_json(g, workdir)) for i in range(args.repeat)]
+    finally:
+        shutil.rmtree(workdir)
+
+    results = {
+        'version': git_version(),
+        'python': platform.python_version(),
+        'nodes': args.nodes,
+        'edges': args.edges,
+        'visual': visuals,
+        'repeat': args.repeat,
+        'lossless': all(r[0]['lossless'] and r[1]['lossless'] for r in runs),
+    }
+    for i, stages in enumerate([['export', 'parse'], ['make_json_data', 'write_json']]):
+        for stage in stages:
+            results[stage] = min((r[i][stage] for r in runs), key=lambda x: x['seconds'])
+
+    for stage in ['export', 'parse', 'make_json_data', 'write_json']:
+        r = results[stage]
+        print('%-15s %8.3f s %9.2f MB/s %12.0f elements/s' % (stage, r['seconds'], r['MB_per_s'], r['elements_per_s']))
+    print('lossless round trips: ' + str(results['lossless']))
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=4)
+    print('results written to ' + args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/python
+
+#Upload load test for graphspace_utils
+#Posts synthetic graphs with postGraphs() at several concurrency levels, against a local
+#GraphSpace stand-in (graphspace_standin.py) or any server given with --url, and reports
+#upload throughput and tail latency.  The results are written as JSON so that numbers
+#from different versions can be compared.
+#
+#usage: python bench_upload.py --graphs 200 --nodes 200 --edges 800 --concurrency 1,4,8 --latency 0.02 --out bench_upload.json
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+
+import json_utils
+import graphspace_utils
+from graphspace_standin import StandInServer
+from bench_roundtrip import git_version
+
+
+def make_payloads(n_graphs, n_nodes, n_edges, seed=0):
+    #builds n_graphs random graphs and returns them as (graphid, JSON bytes) pairs
+    rng = random.Random(seed)
+    payloads = []
+    for g in range(n_graphs):
+        nodes = ['n' + str(i) for i in range(n_nodes)]
+        edges = set()
+        while len(edges) < n_edges:
+            s = rng.randrange(n_nodes)
+            t = rng.randrange(n_nodes)
+            if s != t:
+                edges.add(('n' + str(s), 'n' + str(t)))
+        node_attrs = dict((n, {'background_color': '#%06x' % rng.randrange(1 << 24), 'score': rng.random()}) for n in nodes)
+        data = json_utils.make_json_data(nodes, sorted(edges), node_attrs, title='bench' + str(g), tags=['bench'])
+        payloads.append(('bench' + str(g), json_utils.dumps_json(data)))
+    return payloads
+
+
+def percentile(values, p):
+    #nearest-rank percentile of a non-empty list
+    values = sorted(values)
+    return values[max(0, int(math.ceil(p / 100.0 * len(values))) - 1)]
+
+
+def run(payloads, url, concurrency, run_id, compress):
+    graphs = [('%s-r%d' % (graphid, run_id), payload) for graphid, payload in payloads]
+    graphspace_utils.METRICS.reset()
+    start = time.perf_counter()
+    results = graphspace_utils.postGraphs(graphs, 'bench', 'bench', concurrency=concurrency, force=True, compress=compress, url=url)
+    elapsed = time.perf_counter() - start
+
+    seconds = [r.seconds for r in results if r.ok]
+    n_bytes = sum(len(payload) for graphid, payload in payloads)
+    out = {
+        'concurrency': concurrency,
+        'seconds': elapsed,
+        'graphs': len(graphs),
+        'failed': sum(1 for r in results if not r.ok),
+        'graphs_per_s': len(graphs) / elapsed,
+        'MB_per_s': n_bytes / 1e6 / elapsed,
+    }
+    if seconds:
+        for p in [50, 90, 99]:
+            out['p%d_s' % p] = percentile(seconds, p)
+        out['max_s'] = max(seconds)
+    #where the time of each request went, from the client's metrics
+    histograms = graphspace_utils.METRICS.snapshot()['histograms']
+    out['phases'] = dict((phase, histograms['all.' + phase]) for phase in graphspace_utils.PHASES)
+    errors = [r.error for r in results if not r.ok]
+    if errors:
+        out['first_error'] = errors[0]
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Upload throughput and latency benchmark for graphspace_utils.')
+    parser.add_argument('--graphs', type=int, default=200, help='graphs uploaded per run (default 200)')
+    parser.add_argument('--nodes', type=int, default=200, help='nodes per graph (default 200)')
+    parser.add_argument('--edges', type=int, default=800, help='edges per graph (default 800)')
+    parser.add_argument('--concurrency', default='1,4,8', help='comma separated concurrency levels (default 1,4,8)')
+    parser.add_argument('--compress', type=int, default=None, help='gzip level for uploads, see postGraph() (default none)')
+    parser.add_argument('--url', default=None, help='server to upload to; by default a local stand-in is started')
+    parser.add_argument('--latency', type=float, default=0.02, help='stand-in latency per request in seconds (default 0.02)')
+    parser.add_argument('--jitter', type=float, default=0.01, help='stand-in random extra latency in seconds (default 0.01)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of stand-in requests answered with 503 (default 0)')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='fraction of stand-in requests dropped (default 0)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the graphs and the stand-in')
+    parser.add_argument('--out', default='bench_upload.json', help='file for machine-readable results (default bench_upload.json)')
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(',') if c]
+    payloads = make_payloads(args.graphs, args.nodes, args.edges, seed=args.seed)
+
+    #keep the benchmark out of the user's upload cache and quiet
+    cachedir = tempfile.mkdtemp(prefix='mc_bench_')
+    graphspace_utils.CACHE_DIR = cachedir
+    graphspace_utils.ARCHIVE_DIR = os.path.join(cachedir, 'archive')
+    graphspace_utils.setLogLevel('ERROR')
+
+    server = None
+    url = args.url
+    if url == None:
+        server = StandInServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, drop_rate=args.drop_rate, seed=args.seed).start()
+        url = server.url
+    try:
+        runs = [run(payloads, url, c, i, args.compress) for i, c in enumerate(levels)]
+    finally:
+        if server:
+            server.stop()
+        shutil.rmtree(cachedir)
+
+    results = {
+        'version': git_version(),
+        'python': platform.python_version(),
+        'server': 'standin' if server else url,
+        'graphs': args.graphs,
+        'nodes': args.nodes,
+        'edges': args.edges,
+        'payload_bytes': sum(len(payload) for graphid, payload in payloads),
+        'compress': args.compress,
+        'runs': runs,
+    }
+    if server:
+        results['standin'] = {'latency': args.latency, 'jitter': args.jitter, 'error_rate': args.error_rate, 'drop_rate': args.drop_rate, 'requests': server.counts}
+
+    for r in runs:
+        print('concurrency %-3d %8.3f s %8.1f graphs/s %8.2f MB/s  p50 %.3f s  p99 %.3f s  failed %d' % (
+            r['concurrency'], r['seconds'], r['graphs_per_s'], r['MB_per_s'], r.get('p50_s', 0), r.get('p99_s', 0), r['failed']))
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=4)
+    print('results written to ' + args.out)
+
+
+if __name__ == '__main__':
+    main()
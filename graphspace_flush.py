@@ -0,0 +1,66 @@
+#!/usr/bin/python
+
+## Flusher for the upload spool of graphspace_utils.py.  Posts the graphs that
+## were queued with spoolGraph() (or uploadGraph(async_=True) in Mission
+## Control), and with --interval keeps watching the spool for new graphs.
+## Graphs stay queued while GraphSpace cannot be reached, and a flusher that
+## is stopped or crashes picks up where it left off when it is started again.
+##
+## The password of each user with queued graphs is asked for once, or taken
+## from the GRAPHSPACE_PASSWORD environment variable.  How much is printed is
+## set with the GRAPHSPACE_LOG_LEVEL environment variable (default INFO).
+##
+## usage: python graphspace_flush.py --concurrency 4 --interval 30
+import os
+import time
+import getpass
+import argparse
+import graphspace_utils
+__docformat__ = 'reStructuredText'
+
+def flush(spool,concurrency,timeout=None):
+	"""
+	Logs in every user with queued graphs and flushes the spool once.
+
+	:param spool: string -- spool directory
+	:param concurrency: int -- largest number of graphs uploaded at once
+	:param timeout: float -- seconds to wait for the server on each request.  Default is graphspace_utils.TIMEOUT.
+	:returns: list of UploadResult
+	"""
+	for job in graphspace_utils.spooledUploads(spool):
+		if graphspace_utils.getSession(job['user'],job['url']) == None:
+			password = os.environ.get('GRAPHSPACE_PASSWORD')
+			if password == None:
+				password = getpass.getpass('GraphSpace password for %s at %s: ' % (job['user'],job['url']))
+			graphspace_utils.login(job['user'],password,job['url'])
+	results = graphspace_utils.flushSpool(concurrency=concurrency,spool=spool,timeout=timeout)
+	for r in results:
+		if r.ok:
+			graphspace_utils.logger.info('%s %s (%.2f s)',r.graphid,'posted' if r.posted else 'unchanged',r.seconds)
+		else:
+			graphspace_utils.logger.warning('%s failed: %s',r.graphid,r.error)
+	return results
+
+def main():
+	parser = argparse.ArgumentParser(description='Posts the graphs waiting in the GraphSpace upload spool.')
+	parser.add_argument('--spool',default=graphspace_utils.SPOOL_DIR,help='spool directory (default %s)' % (graphspace_utils.SPOOL_DIR))
+	parser.add_argument('--concurrency',type=int,default=4,help='largest number of graphs uploaded at once (default 4)')
+	parser.add_argument('--timeout',type=float,default=None,help='seconds to wait for the server on each request (default %s)' % (graphspace_utils.TIMEOUT))
+	parser.add_argument('--interval',type=float,default=None,help='keep flushing every INTERVAL seconds instead of once')
+	args = parser.parse_args()
+	graphspace_utils.setLogLevel()
+
+	while True:
+		try:
+			flush(args.spool,args.concurrency,args.timeout)
+		except graphspace_utils.GraphSpaceError as e:
+			graphspace_utils.logger.warning('%s',e)
+		if args.interval == None:
+			break
+		try:
+			time.sleep(args.interval)
+		except KeyboardInterrupt:
+			break
+
+if __name__ == '__main__':
+	main()
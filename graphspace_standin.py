@@ -0,0 +1,277 @@
+#!/usr/bin/python
+
+## Local stand-in for the GraphSpace API, for testing and benchmarking
+## graphspace_utils.py without a network connection.  It answers every request
+## that the _construct*Command functions send, keeps graphs in memory, and can
+## add latency and failures to each request.
+##
+## usage: python graphspace_standin.py --port 8000 --latency 0.05
+##        GRAPHSPACE_URL=http://127.0.0.1:8000 python missionControl.py ...
+import re
+import gzip
+import base64
+import json
+import time
+import random
+import argparse
+import threading
+import http.server
+import urllib.parse
+import email.parser
+__docformat__ = 'reStructuredText'
+
+## Requests that the stand-in answers, and the StandInServer method that
+## handles each of them.  The groups of each pattern are passed to the method.
+ROUTES = [
+	(re.compile(r'^/api/users/([^/]+)/graph/(exists|add|update|delete|makeGraphPublic|makeGraphPrivate)/([^/]+)/?$'),'_graphRequest'),
+	(re.compile(r'^/api/users/graphs/([^/]+)/(share|unshare)/([^/]+)/([^/]+)/?$'),'_groupRequest'),
+	(re.compile(r'^/api/tags/user/([^/]+)/([^/]+)/(makePublic|makePrivate)/?$'),'_tagRequest'),
+]
+
+class StandInServer(http.server.ThreadingHTTPServer):
+	"""
+	In-memory GraphSpace server.  Graphs are stored per user and forgotten when
+	the server stops.
+
+	Every request first waits 'latency' seconds plus a random delay of up to
+	'jitter' seconds.  A fraction 'error_rate' of the requests is then answered
+	with a 503 error page, and a fraction 'drop_rate' is dropped by closing the
+	connection without an answer.
+
+	:param address: (host,port) tuple -- address to listen on.  Port 0 picks a free port.
+	:param latency: float -- seconds added to every request.  Default is 0.
+	:param jitter: float -- largest random delay in seconds added on top of 'latency'.  Default is 0.
+	:param error_rate: float -- fraction of requests answered with 503.  Default is 0.
+	:param drop_rate: float -- fraction of requests dropped without an answer.  Default is 0.
+	:param passwords: dictionary -- password of each user.  Optional; if not given, any password is accepted.
+	:param seed: int -- random seed for the injected delays and failures.  Optional.
+	"""
+	daemon_threads = True
+
+	def __init__(self,address=('127.0.0.1',0),latency=0.0,jitter=0.0,error_rate=0.0,drop_rate=0.0,passwords=None,seed=None):
+		http.server.ThreadingHTTPServer.__init__(self,address,_Handler)
+		self.latency = latency
+		self.jitter = jitter
+		self.error_rate = error_rate
+		self.drop_rate = drop_rate
+		self.passwords = passwords
+		self.graphs = {}
+		self.counts = {}
+		self._random = random.Random(seed)
+		self._lock = threading.Lock()
+		self._thread = None
+
+	@property
+	def url(self):
+		"""
+		URL of the server, to use as graphspace_utils.URL or GRAPHSPACE_URL.
+		"""
+		host,port = self.server_address[:2]
+		return 'http://%s:%d' % (host,port)
+
+	def start(self):
+		"""
+		Serves requests from a background thread.
+
+		:returns: StandInServer -- the server itself.
+		"""
+		self._thread = threading.Thread(target=self.serve_forever,name='graphspace-standin',daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		"""
+		Stops a server started with start() and closes its socket.
+		"""
+		self.shutdown()
+		self.server_close()
+		if self._thread:
+			self._thread.join()
+			self._thread = None
+
+	def answer(self,path,fields,files):
+		## answers one request.  Returns (status,response dictionary).
+		for pattern,method in ROUTES:
+			match = pattern.match(path)
+			if match:
+				groups = [urllib.parse.unquote(g) for g in match.groups()]
+				return getattr(self,method)(fields,files,*groups)
+		return 404,{'StatusCode':404,'Error':'Unknown API request %s' % (path)}
+
+	def _authorized(self,fields,user):
+		if fields.get('username') != user:
+			return False
+		return self.passwords == None or self.passwords.get(user) == fields.get('password')
+
+	def _graphRequest(self,fields,files,user,action,graphid):
+		if not self._authorized(fields,user):
+			return 401,{'StatusCode':401,'Error':'Username/Password is not recognized!'}
+		key = (user,graphid)
+		with self._lock:
+			self._count(action)
+			graph = self.graphs.get(key)
+			if action == 'add':
+				if graph != None:
+					return 400,{'StatusCode':400,'Error':'Graph with name %s already exists.' % (graphid)}
+				data = _graphData(files)
+				if data == None:
+					return 400,{'StatusCode':400,'Error':'No graph file was uploaded.'}
+				self.graphs[key] = {'data':data,'public':False,'groups':set()}
+				return 201,{'StatusCode':201,'Message':'Added graph %s.' % (graphid)}
+			if graph == None:
+				return 404,{'StatusCode':404,'Error':'No Such Graph Exists!'}
+			if action == 'exists':
+				return 200,{'StatusCode':200,'Message':'Graph %s exists.' % (graphid)}
+			if action == 'update':
+				data = _graphData(files)
+				if data == None:
+					return 400,{'StatusCode':400,'Error':'No graph file was uploaded.'}
+				graph['data'] = data
+				return 200,{'StatusCode':200,'Message':'Updated graph %s.' % (graphid)}
+			if action == 'delete':
+				del self.graphs[key]
+				return 200,{'StatusCode':200,'Message':'Deleted graph %s.' % (graphid)}
+			graph['public'] = action == 'makeGraphPublic'
+			return 200,{'StatusCode':200,'Message':'Graph %s is now %s.' % (graphid,'public' if graph['public'] else 'private')}
+
+	def _groupRequest(self,fields,files,graphid,action,group_owner,group):
+		user = fields.get('username')
+		if not self._authorized(fields,user):
+			return 401,{'StatusCode':401,'Error':'Username/Password is not recognized!'}
+		with self._lock:
+			self._count(action)
+			graph = self.graphs.get((user,graphid))
+			if graph == None:
+				return 404,{'StatusCode':404,'Error':'No Such Graph Exists!'}
+			if action == 'share':
+				graph['groups'].add((group_owner,group))
+			else:
+				graph['groups'].discard((group_owner,group))
+			return 200,{'StatusCode':200,'Message':'Graph %s %sd with group %s owned by %s.' % (graphid,action,group,group_owner)}
+
+	def _tagRequest(self,fields,files,user,tag,action):
+		if not self._authorized(fields,user):
+			return 401,{'StatusCode':401,'Error':'Username/Password is not recognized!'}
+		with self._lock:
+			self._count(action)
+			n = 0
+			for (owner,graphid),graph in self.graphs.items():
+				if owner == user and tag in graph['data'].get('metadata',{}).get('tags',[]):
+					graph['public'] = action == 'makePublic'
+					n += 1
+			return 200,{'StatusCode':200,'Message':'%d graphs with tag %s changed.' % (n,tag)}
+
+	def _count(self,action):
+		self.counts[action] = self.counts.get(action,0) + 1
+
+	def _fault(self):
+		## picks the delay and the injected failure (None, 'error' or 'drop') of a request.
+		with self._lock:
+			delay = self.latency + self._random.uniform(0,self.jitter)
+			r = self._random.random()
+		if r < self.drop_rate:
+			return delay,'drop'
+		if r < self.drop_rate + self.error_rate:
+			return delay,'error'
+		return delay,None
+
+def _graphData(files):
+	## decodes the uploaded graph, which may be gzip-compressed.
+	if 'graphname' not in files:
+		return None
+	payload,content_type = files['graphname']
+	if content_type == 'application/gzip' or payload[:2] == b'\x1f\x8b':
+		payload = gzip.decompress(payload)
+	return json.loads(payload.decode('utf8'))
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+	## HTTP/1.1 keeps connections open between requests, like GraphSpace.
+	protocol_version = 'HTTP/1.1'
+	timeout = 30
+	## buffer the answer so the headers and body go out in one packet; 
+	## written separately, Nagle's algorithm and delayed ACKs add ~40 ms.
+	wbufsize = 65536
+
+	def log_message(self,format,*args):
+		pass
+
+	def do_POST(self):
+		body = self._readBody()
+		delay,fault = self.server._fault()
+		if delay > 0:
+			time.sleep(delay)
+		if fault == 'drop':
+			self.close_connection = True
+			return
+		if fault == 'error':
+			self._answer(503,b'<!DOCTYPE html><html><body><h1>503 Service Unavailable</h1></body></html>','text/html')
+			return
+		fields,files = _parseForm(self.headers.get('Content-Type',''),body)
+		## HTTP basic authentication stands in for the credential fields.
+		authorization = self.headers.get('Authorization','')
+		if authorization.startswith('Basic '):
+			user,sep,password = base64.b64decode(authorization[6:]).decode('utf8').partition(':')
+			fields.setdefault('username',user)
+			fields.setdefault('password',password)
+		status,response = self.server.answer(urllib.parse.urlsplit(self.path).path,fields,files)
+		self._answer(status,json.dumps(response).encode('utf8'),'application/json')
+
+	def _readBody(self):
+		if self.headers.get('Transfer-Encoding','').lower() == 'chunked':
+			chunks = []
+			while True:
+				size = int(self.rfile.readline().split(b';')[0],16)
+				if size == 0:
+					## skip the trailer.
+					while self.rfile.readline() not in (b'\r\n',b'\n',b''):
+						pass
+					return b''.join(chunks)
+				chunks.append(self.rfile.read(size))
+				self.rfile.readline()
+		return self.rfile.read(int(self.headers.get('Content-Length',0)))
+
+	def _answer(self,status,body,content_type):
+		self.send_response(status)
+		self.send_header('Content-Type',content_type)
+		self.send_header('Content-Length',str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+def _parseForm(content_type,body):
+	## splits a multipart/form-data body into a dictionary of fields and a
+	## dictionary of files, which map each name to (payload,content type).
+	fields = {}
+	files = {}
+	if not content_type.startswith('multipart/form-data'):
+		return fields,files
+	message = email.parser.BytesParser().parsebytes(b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+	for part in message.get_payload():
+		name = part.get_param('name',header='content-disposition')
+		payload = part.get_payload(decode=True)
+		if part.get_param('filename',header='content-disposition') != None:
+			files[name] = (payload,part.get_content_type())
+		else:
+			fields[name] = payload.decode('utf8')
+	return fields,files
+
+def main():
+	parser = argparse.ArgumentParser(description='Local stand-in for the GraphSpace API.')
+	parser.add_argument('--host',default='127.0.0.1',help='address to listen on (default 127.0.0.1)')
+	parser.add_argument('--port',type=int,default=8000,help='port to listen on (default 8000)')
+	parser.add_argument('--latency',type=float,default=0.0,help='seconds added to every request (default 0)')
+	parser.add_argument('--jitter',type=float,default=0.0,help='largest random delay added on top of --latency (default 0)')
+	parser.add_argument('--error-rate',type=float,default=0.0,help='fraction of requests answered with 503 (default 0)')
+	parser.add_argument('--drop-rate',type=float,default=0.0,help='fraction of requests dropped without an answer (default 0)')
+	parser.add_argument('--seed',type=int,default=None,help='random seed for the injected delays and failures')
+	args = parser.parse_args()
+
+	server = StandInServer((args.host,args.port),args.latency,args.jitter,args.error_rate,args.drop_rate,seed=args.seed)
+	print('GraphSpace stand-in listening on %s (set GRAPHSPACE_URL to use it)' % (server.url))
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	server.server_close()
+
+if __name__ == '__main__':
+	main()
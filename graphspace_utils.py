@@ -3,67 +3,423 @@
 ## utility functions for posting graphs to graphspace
 ## BIO331
 ## Anna Ritz
+import os
 import sys
+import gzip
 import json
-import subprocess
+import time
+import uuid
+import random
+import socket
+import base64
+import bisect
+import hashlib
+import getpass
+import itertools
+import logging
+import tempfile
+import threading
+import contextlib
+import collections
+try:
+	import fcntl
+except ImportError:
+	## no locking between flusher processes on Windows.
+	fcntl = None
+import http.client
+import concurrent.futures
+import urllib.parse
+import json_utils
 __docformat__ = 'reStructuredText'
 
 ## URL for original GraphSpace
 ##URL="http://graphspace.org"
 ## URL for Reed GraphSpace
-URL="http://ec2-52-41-252-78.us-west-2.compute.amazonaws.com/"
+## The server can be changed with the GRAPHSPACE_URL environment variable (e.g.
+## to run against graphspace_standin.py), or for a single call with 'url'.
+URL=os.environ.get('GRAPHSPACE_URL',"http://ec2-52-41-252-78.us-west-2.compute.amazonaws.com/")
 
-def postGraph(graphid,jsonfile,user,password,logfile=None):
+## Messages are logged to the 'graphspace_utils' logger, which prints nothing
+## unless the application configures logging or calls setLogLevel().  At INFO
+## each call logs one line; at DEBUG the requests and responses are logged as
+## well.
+logger = logging.getLogger('graphspace_utils')
+logger.addHandler(logging.NullHandler())
+
+## Directory for the local upload cache.
+CACHE_DIR=os.environ.get('GRAPHSPACE_CACHE_DIR',os.path.join(os.path.expanduser('~'),'.graphspace'))
+
+## Set to True for servers that accept gzip-compressed graph files.  When it
+## is False, compressed uploads are sent uncompressed and a compressed copy 
+## is kept in ARCHIVE_DIR instead.
+GZIP_UPLOADS=False
+
+## Set to True for servers that read node and edge styles from a stylesheet of
+## classes (see json_utils.compress_styles).  The Reed GraphSpace API reads 
+## the visual attributes of each element from its data, so Mission Control 
+## only sends classes when asked to.
+STYLE_CLASSES_SUPPORTED=False
+ARCHIVE_DIR=os.path.join(CACHE_DIR,'archive')
+
+## Directory of the upload spool, where spoolGraph() queues graphs for 
+## flushSpool() to post later.
+SPOOL_DIR=os.environ.get('GRAPHSPACE_SPOOL_DIR',os.path.join(CACHE_DIR,'spool'))
+
+## Idle connections to each host that are kept open for reuse, and how many 
+## seconds they may sit idle before they are closed (Apache closes keep-alive
+## connections after 5 seconds by default).
+POOL_SIZE=4
+KEEPALIVE_IDLE=4.0
+
+## Largest number of requests in flight to one host at a time.
+MAX_PER_HOST=8
+
+## Seconds to wait for the server before a request times out, unless a call
+## is given its own 'timeout'.
+TIMEOUT=60
+
+## Requests that fail because the server could not be reached, timed out or 
+## returned a 5xx error are retried up to RETRIES times.  The n-th retry waits
+## a random time of up to BACKOFF*2**n seconds (never more than BACKOFF_MAX).
+RETRIES=3
+BACKOFF=0.5
+BACKOFF_MAX=30
+
+## After BREAKER_THRESHOLD failed requests in a row, requests to that server 
+## fail immediately with GraphSpaceUnavailable for BREAKER_COOLDOWN seconds.
+BREAKER_THRESHOLD=5
+BREAKER_COOLDOWN=30
+
+## Set to True for servers that accept chunked request bodies.  When it is 
+## False, streamed payloads of unknown length are spooled to a temporary file
+## first so that the request can be sent with a Content-Length.
+CHUNKED_UPLOADS=False
+
+## Set to True for servers that accept HTTP basic authentication.  Requests
+## then carry the credentials in an Authorization header instead of as form 
+## fields.  The Reed GraphSpace API reads the username and password from the
+## form of each request, so by default every request still sends them there,
+## even within a session from login().
+BASIC_AUTH=False
+
+## If set, every request is also written as one line of JSON to this file
+## (see Metrics.trace()).
+TRACE_FILE=os.environ.get('GRAPHSPACE_TRACE')
+
+class GraphSpaceError(Exception):
+	"""
+	Base class for errors raised by GraphSpace calls.
+	"""
+	pass
+
+class GraphSpaceConnectionError(GraphSpaceError):
+	"""
+	The server could not be reached, or the connection failed mid-request.
+	"""
+	pass
+
+class GraphSpaceTimeout(GraphSpaceConnectionError):
+	"""
+	The server did not answer within the timeout.
+	"""
+	pass
+
+class GraphSpaceServerError(GraphSpaceError):
+	"""
+	The server answered with a 5xx status.
+
+	:param status: int -- HTTP status code
+	:param output: string -- body of the response
+	"""
+	def __init__(self,message,status,output):
+		GraphSpaceError.__init__(self,message)
+		self.status = status
+		self.output = output
+
+class GraphSpaceResponseError(GraphSpaceError):
+	"""
+	The server answered, but not with JSON (usually an HTML page because the
+	graph JSON was improperly formatted).  Not retried.
+
+	:param output: string -- body of the response
+	"""
+	def __init__(self,message,output):
+		GraphSpaceError.__init__(self,message)
+		self.output = output
+
+class GraphSpaceRequestError(GraphSpaceError):
+	"""
+	The server answered with an error in its JSON response (e.g. because the
+	password was wrong).  Not retried.
+
+	:param status: int -- status code of the response
+	:param error: string -- error reported by the server
+	"""
+	def __init__(self,message,status,error):
+		GraphSpaceError.__init__(self,message)
+		self.status = status
+		self.error = error
+
+class GraphSpaceUnavailable(GraphSpaceError):
+	"""
+	Too many requests to the server failed in a row, so the circuit breaker
+	is failing requests without sending them.
+	"""
+	pass
+
+def postGraph(graphid,jsonfile,user,password,logfile=None,force=False,digest=None,compress=None,archive=None,url=None,tags=None,timeout=None):
 	"""
 	Posts a graph in 'jsonfile' with id 'graphid' to the account of the user 'user' to GraphSpace.
+	If the same graph was already posted (according to the local upload cache), nothing is sent.
+	The GraphSpace API has no request for partial updates, so a graph that 
+	changed is always sent whole.
+
+	Graphs this module has posted before are updated directly, and other graphs are
+	added directly; only if the server answers that the graph does (or does not) 
+	exist is the other request sent.  Most uploads therefore take one request.  If 
+	the request fails with an error that does not say either way, the server is 
+	asked whether the graph exists, and the other request is sent if the guess 
+	was wrong.
+
+	Instead of a filename, 'jsonfile' may be the JSON payload itself, either as bytes
+	(e.g. from json_utils.dumps_json()) or as an iterable of bytes chunks (e.g. from 
+	json_utils.iter_json()).  In-memory payloads are streamed to the server, so 
+	nothing is written to disk.  Streamed payloads can only be hashed for the upload 
+	cache if 'digest' is given.
+
+	If 'compress' is given and the server accepts gzip (GZIP_UPLOADS), the payload is
+	compressed as it is sent.  Otherwise a compressed copy is written to ARCHIVE_DIR.
+	A compressed copy of every upload can also be kept by giving an 'archive' directory.
+	Payloads that are already gzip data (e.g. from json_utils.dumps_json() with 
+	'compress', or a .json.gz file from json_utils.write_json()) are sent as they 
+	are if the server accepts gzip, and decompressed as they are sent otherwise.
 
 	:param graphid: string -- ID of GraphSpace graph
-	:param jsonfile: string -- JSON file to post. 
+	:param jsonfile: string, bytes or iterable of bytes -- JSON file to post, or the JSON payload.
 	:param user: string -- graph owner's username
 	:param password: string -- graph owner's password
 	:param logfile: filename for command outputs.  Optional.
+	:param force: boolean -- If True, post the graph even if it is unchanged since the last upload.  Default is False.
+	:param digest: string -- content hash from json_utils.hash_json_data().  Optional; computed from 'jsonfile' if not given.
+	:param compress: int -- gzip compression level from 1 (fastest) to 9 (smallest).  Optional.
+	:param archive: string -- directory for a gzip-compressed copy of the payload.  Optional.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param tags: list -- tags of the graph, remembered for bulk operations (see shareGraphs()).  Optional; read from 'jsonfile' if not given and 'digest' is not given either.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: boolean -- True if the graph was posted, False if it was skipped.
+	:raises GraphSpaceRequestError: if the server did not accept the graph.
+	:raises GraphSpaceError: if the request failed (see the subclasses for the reasons).
 	"""
-	if logfile:
-		logout = open(logfile,'w')
-	else:
-		logout = None
+	posted,response = _postGraph(graphid,jsonfile,user,password,logfile,force,digest,compress,archive,url,tags,timeout)
+	error = _responseError(response) if posted else None
+	if error != None:
+		raise GraphSpaceRequestError('GraphSpace did not accept graph %s from user %s: %s' % (graphid,user,error),_responseStatus(response),error)
+	return posted
+
+def _postGraph(graphid,jsonfile,user,password,logfile,force,digest,compress,archive,url,tags,timeout=None):
+	## does the work of postGraph(), and returns whether the graph was posted
+	## along with the server's Response (None if it was skipped).
+	jsonfile,gzipped = _peekGzip(jsonfile)
+	if digest == None:
+		digest,found = _payloadSummary(jsonfile)
+		if tags == None:
+			tags = found
+	if not force and digest != None and isUploadCached(graphid,user,digest,url):
+		logger.info('Graph %s from user %s is unchanged since the last upload. Skipping (use force=True to post anyway).',graphid,user)
+		return False,None
+
+	## compressing or archiving wraps the payload in a stream of chunks, which
+	## is compressed and/or copied to the archive as it is sent.
+	content_type = 'application/json'
+	if compress and not GZIP_UPLOADS and archive == None:
+		archive = ARCHIVE_DIR
+	if gzipped:
+		## already compressed: archived as it is, and only sent as it is if 
+		## the server accepts gzip.
+		if GZIP_UPLOADS:
+			content_type = 'application/gzip'
+		if archive or not GZIP_UPLOADS:
+			chunks = _payloadChunks(jsonfile)
+			if archive:
+				chunks = _archiveChunks(chunks,graphid,archive,None)
+			if not GZIP_UPLOADS:
+				chunks = json_utils.gunzip_chunks(chunks)
+			jsonfile = chunks
+	elif compress or archive:
+		chunks = _payloadChunks(jsonfile)
+		if compress and GZIP_UPLOADS:
+			chunks = json_utils.gzip_chunks(chunks,compress)
+			content_type = 'application/gzip'
+			if archive:
+				chunks = _archiveChunks(chunks,graphid,archive,None)
+		elif archive:
+			chunks = _archiveChunks(chunks,graphid,archive,compress or 6)
+		jsonfile = chunks
 		
-	# check to see if this graph is already in GraphSpace.
-	graph_exists = False
-	cmd = _constructExistsCommand(graphid,user,password)
-	outstring = execute(cmd,logout)
-	outstring = json.loads(outstring)
-	if outstring["StatusCode"] == 200:
-		# a status code of 200 indicates that a graph already exists.
-		graph_exists = True
-
-	if graph_exists:  
-		#print('\nUpdating existing graph %s from user %s' % (graphid,user))
-		cmd = _constructUpdateCommand(graphid,user,password,jsonfile)
-		execute(cmd,logout)
-	else:
-		#print('\nGraph does not exist. Posting new graph %s from user %s' % (graphid,user))
-		cmd = _constructPostCommand(graphid,user,password,jsonfile)
-		execute(cmd,logout)
+	## the log file and any temporary file made for the payload are closed 
+	## when the upload is done.
+	with contextlib.ExitStack() as stack:
+		logout = stack.enter_context(open(logfile,'w')) if logfile else None
+		## the payload may have to be sent twice, so streams are spooled first.
+		## This is where streamed payloads are serialized.
+		start = time.time()
+		jsonfile = _replayablePayload(jsonfile,stack)
+		serialize = time.time() - start
+
+		def send(graph_exists,serialize=0.0):
+			if graph_exists:  
+				#logger.info('Updating existing graph %s from user %s',graphid,user)
+				cmd = _constructUpdateCommand(graphid,user,password,jsonfile,content_type,url)
+			else:
+				#logger.info('Graph does not exist. Posting new graph %s from user %s',graphid,user)
+				cmd = _constructPostCommand(graphid,user,password,jsonfile,content_type,url)
+			return execute(cmd,logout,timeout,serialize=serialize)
+
+		# guess whether this graph is already in GraphSpace from the graphs we have 
+		# posted before, and only fall back to the other request if the guess was wrong.
+		graph_exists = _isKnownGraph(graphid,user,url)
+		response = send(graph_exists,serialize)
+		error = _responseError(response)
+		if error == None:
+			known = True
+		elif _reportsGraphMissing(response) if graph_exists else _reportsGraphExists(response):
+			known = not graph_exists
+			response = send(known)
+		elif _responseStatus(response) in [401,403]:
+			## the credentials were refused; asking again will not help.
+			known = None
+		else:
+			## an error that does not say whether the graph exists: ask the server.
+			known = _graphExists(graphid,user,password,logout,url,timeout)
+			if known != graph_exists:
+				response = send(known)
+		if _responseError(response) == None or _reportsGraphExists(response):
+			known = True
+		elif _reportsGraphMissing(response):
+			known = False
+		if known != None:
+			_setKnownGraph(graphid,user,known,url)
+
+		# only remember the upload if the server did not report an error.
+		if _responseError(response) == None and digest != None:
+			recordUpload(graphid,user,digest,url,tags)
 	
-	if logout:
-		print('command output written to %s' % (logfile))
-		logout.close()
-	return
+		if logout:
+			logger.info('command output written to %s',logfile)
+		return True,response
+
+## Result of posting one graph with postGraphs().  'ok' is False if the 
+## graph could not be posted, in which case 'error' says why; 'posted' is 
+## False if the graph was skipped because it was unchanged.
+UploadResult = collections.namedtuple('UploadResult',['graphid','ok','posted','seconds','error'])
+
+def postGraphs(graphs,user,password,concurrency=4,force=False,compress=None,archive=None,url=None,timeout=None):
+	"""
+	Posts many graphs at once, with up to 'concurrency' uploads in flight.  All 
+	uploads share the module's connection pool, which allows at most MAX_PER_HOST
+	requests to the server at a time.  The graphs are read lazily, so payloads 
+	given as filenames, generators or functions are only loaded when their upload
+	starts.  A graph that fails does not stop the others.
+
+	:param graphs: iterable of (graphid,jsonfile) pairs -- see postGraph() for the forms 'jsonfile' can take.  'jsonfile' may also be a function that returns one of them.
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password
+	:param concurrency: int -- largest number of graphs uploaded at once.  Default is 4.
+	:param force: boolean -- If True, post graphs even if they are unchanged since the last upload.  Default is False.
+	:param compress: int -- gzip compression level, see postGraph().  Optional.
+	:param archive: string -- archive directory, see postGraph().  Optional.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: list of UploadResult, in the same order as 'graphs'.
+	"""
+	def upload(graphid,jsonfile):
+		start = time.time()
+		try:
+			if callable(jsonfile):
+				jsonfile = jsonfile()
+			posted,response = _postGraph(graphid,jsonfile,user,password,None,force,None,compress,archive,url,None,timeout)
+			error = _responseError(response) if posted else None
+			return UploadResult(graphid,error == None,posted,time.time()-start,error)
+		except Exception as e:
+			## one bad graph must not end the whole batch, but Ctrl-C still does.
+			return UploadResult(graphid,False,False,time.time()-start,'%s: %s' % (e.__class__.__name__,e))
+
+	return _runConcurrently(upload,graphs,concurrency)
+
+def _runConcurrently(func,items,concurrency):
+	## calls func(*item) for each item with up to 'concurrency' calls at once,
+	## and returns the results in the order of the items.  Items are only 
+	## taken from 'items' when a worker is free, so they are not read ahead.
+	results = {}
+	pending = {}
+	with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+		for i,item in enumerate(items):
+			if len(pending) >= concurrency:
+				done,not_done = concurrent.futures.wait(pending,return_when=concurrent.futures.FIRST_COMPLETED)
+				for future in done:
+					results[pending.pop(future)] = future.result()
+			pending[pool.submit(func,*item)] = i
+		for future in concurrent.futures.as_completed(pending):
+			results[pending[future]] = future.result()
+	return [results[i] for i in range(len(results))]
+
+def _reportsGraphExists(response):
+	## True if the server refused to add a graph because it already exists,
+	## by its status (409 Conflict) or, failing that, by its message.
+	error = _responseError(response)
+	if error == None:
+		return False
+	return _responseStatus(response) == 409 or 'already exist' in error.lower()
 
-def deleteGraph(graphid,user,password):
+def _reportsGraphMissing(response):
+	## True if the server refused to update a graph because it does not exist,
+	## by its status (404 Not Found) or, failing that, by its message.
+	error = _responseError(response)
+	if error == None:
+		return False
+	if _responseStatus(response) == 404:
+		return True
+	error = error.lower()
+	return 'no such graph' in error or 'does not exist' in error or 'not found' in error
+
+def _graphExists(graphid,user,password,logout=None,url=None,timeout=None):
+	## asks the server whether the graph exists; a 'StatusCode' of 200 means it does.
+	response = execute(_constructExistsCommand(graphid,user,password,url),logout,timeout)
+	return _responseError(response) == None and _responseStatus(response) == 200
+
+def _responseStatus(response):
+	## the status code in a server Response: the 'StatusCode' that GraphSpace
+	## puts in its answers, or else the HTTP status.
+	if isinstance(response.payload,dict) and 'StatusCode' in response.payload:
+		try:
+			return int(response.payload['StatusCode'])
+		except (TypeError,ValueError):
+			pass
+	return response.status
+
+def _responseError(response):
+	## returns the error reported in a server Response, or None.
+	if isinstance(response.payload,dict) and 'Error' in response.payload:
+		return str(response.payload['Error'])
+	return None
+
+def deleteGraph(graphid,user,password,url=None,timeout=None):
 	"""
 	Removes a graph (denoted by graphid and user) from GraphSpace.
 
 	:param graphid: ID of GraphSpace graph 
 	:param user: graph owner's username
 	:param password: graph owner's password
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
 	"""
-	print('\nRemoving existing graph %s from user %s' % (graphid,user))
-	cmd = _constructDeleteCommand(graphid,user,password)
-	execute(cmd)
+	logger.info('Removing existing graph %s from user %s',graphid,user)
+	cmd = _constructDeleteCommand(graphid,user,password,url)
+	execute(cmd,timeout=timeout)
+	forgetUpload(graphid,user,url)
+	_setKnownGraph(graphid,user,False,url)
    
-def shareGraph(graphid,user,password,group,group_owner):
+def shareGraph(graphid,user,password,group,group_owner,url=None,timeout=None):
 	"""
 	Shares an existing graph with a group.
 
@@ -72,12 +428,14 @@ def shareGraph(graphid,user,password,group,group_owner):
 	:param password: graph owner's password
 	:param group: group to share graph with.
 	:param group_user: owner of group. 
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
 	"""
-	print('\nSharing existing graph %s from user %s with group %s owned by %s' % (graphid,user,group,group_owner))
-	cmd = _constructShareCommand(graphid,user,password,group,group_owner)
-	outstring = execute(cmd)
+	logger.info('Sharing existing graph %s from user %s with group %s owned by %s',graphid,user,group,group_owner)
+	cmd = _constructShareCommand(graphid,user,password,group,group_owner,url)
+	execute(cmd,timeout=timeout)
 
-def unShareGraph(graphid,user,password,group,group_owner):
+def unShareGraph(graphid,user,password,group,group_owner,url=None,timeout=None):
 	"""
 	Un-Shares a graph with a group.  Graph is not deleted, but others
 	in the group may no longer view it.
@@ -87,227 +445,1409 @@ def unShareGraph(graphid,user,password,group,group_owner):
 	:param password: graph owner's password
 	:param group: group to share graph with.
 	:param group_user: owner of group. 
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
 	"""
-	print('\nUn-Sharing existing graph %s from user %s with group %s owned by %s' % (graphid,user,group,group_owner))
-	cmd = _constructUnShareCommand(graphid,user,password,group,group_owner)
-	outstring = execute(cmd)
+	logger.info('Un-Sharing existing graph %s from user %s with group %s owned by %s',graphid,user,group,group_owner)
+	cmd = _constructUnShareCommand(graphid,user,password,group,group_owner,url)
+	execute(cmd,timeout=timeout)
 
-def makeGraphPublic(graphid,user,password):
+def makeGraphPublic(graphid,user,password,url=None,timeout=None):
 	"""
 	Makes a graph publicly viewable.
 
 	:param graphid: ID of GraphSpace graph 
 	:param user: graph owner's username
 	:param password: graph owner's password
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
 	"""
-	print('\nMaking graph %s from user %s public' % (graphid,user))
-	cmd = _constructPublicGraphCommand(graphid,user,password)
-	outstring = execute(cmd)
+	logger.info('Making graph %s from user %s public',graphid,user)
+	cmd = _constructPublicGraphCommand(graphid,user,password,url)
+	execute(cmd,timeout=timeout)
 
 
-def makeGraphPrivate(graphid,user,password):
+def makeGraphPrivate(graphid,user,password,url=None,timeout=None):
 	"""
 	Makes a graph privately viewable (makes it no longer public).
 
 	:param graphid: ID of GraphSpace graph 
 	:param user: graph owner's username
 	:param password: graph owner's password
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
 	"""
-	print('\nMaking graph %s from user %s private' % (graphid,user))
-	cmd = _constructPrivateGraphCommand(graphid,user,password)
-	outstring = execute(cmd)
+	logger.info('Making graph %s from user %s private',graphid,user)
+	cmd = _constructPrivateGraphCommand(graphid,user,password,url)
+	execute(cmd,timeout=timeout)
 
-def makeGraphsWithTagPublic(user,password,tag):
+def makeGraphsWithTagPublic(user,password,tag,url=None,timeout=None):
 	"""
 	Makes all graphs with a tag publicly viewable.
 
 	:param user: graph owner's username
 	:param password: graph owner's password
 	:param tag: graph tag.
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
 	"""
-	print('\nMaking graphs with tag %s from user %s public' % (tag,user))
-	cmd = _constructPublicTagCommand(user,password,tag)
-	outstring = execute(cmd)  
+	logger.info('Making graphs with tag %s from user %s public',tag,user)
+	cmd = _constructPublicTagCommand(user,password,tag,url)
+	execute(cmd,timeout=timeout)
 
-def makeGraphsWithTagPrivate(user,password,tag):
+def makeGraphsWithTagPrivate(user,password,tag,url=None,timeout=None):
 	"""
 	Makes all graphs with a tag privately viewable (make them no longer public).
 
 	:param user: graph owner's username
 	:param password: graph owner's password
 	:param tag: graph tag.
+	:param url: GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	"""
+	logger.info('Making graphs with tag %s from user %s public',tag,user)
+	cmd = _constructPrivateTagCommand(user,password,tag,url)
+	execute(cmd,timeout=timeout)
+
+####################################################################
+### SESSIONS  ######################################################
+
+class Session:
+	"""
+	Credentials of a GraphSpace user, given once and reused for every request
+	of the session.  The server has no login of its own, so the credentials 
+	are still sent with each request: as form fields, or as an Authorization
+	header for BASIC_AUTH servers, which is computed once when the session 
+	is created.
+
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password
+	:param url: string -- GraphSpace URL.  Default is URL.
+	"""
+	def __init__(self,user,password,url=None):
+		self.user = user
+		self.password = password
+		self.url = _serverURL(url)
+		self.authorization = 'Basic ' + base64.b64encode(('%s:%s' % (user,password)).encode('utf8')).decode('ascii')
+
+	def __repr__(self):
+		## the password is never printed.
+		return 'Session(%r, url=%r)' % (self.user,self.url)
+
+## Sessions from login(), for each server and user.  The last user to log in 
+## to a server is its default user.
+_sessions = {}
+_defaultUsers = {}
+_sessionLock = threading.Lock()
+
+def login(user,password=None,url=None):
+	"""
+	Starts a session for the user.  The password is asked for once if it is not
+	given; afterwards every function of this module can be called with 
+	password=None and uses the session's credentials.  Logging in again 
+	replaces the user's session.  The session is kept on this side only: the
+	credentials are sent with every request (see BASIC_AUTH), and they are 
+	not checked until the first one.
+
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password.  Optional; asked for if not given.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:returns: Session
+	"""
+	if password == None:
+		password = getpass.getpass('GraphSpace password for %s: ' % (user))
+	session = Session(user,password,url)
+	with _sessionLock:
+		_sessions[(session.url,user)] = session
+		_defaultUsers[session.url] = user
+	return session
+
+def logout(user=None,url=None):
+	"""
+	Ends the user's session (by default, the session of the default user).
+
+	:param user: string -- graph owner's username.  Optional.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	"""
+	url = _serverURL(url)
+	with _sessionLock:
+		if user == None:
+			user = _defaultUsers.get(url)
+		_sessions.pop((url,user),None)
+		if _defaultUsers.get(url) == user:
+			_defaultUsers.pop(url,None)
+
+def getSession(user=None,url=None):
+	"""
+	Returns the user's session (by default, the session of the user who 
+	logged in last), or None if there is none.
+
+	:param user: string -- graph owner's username.  Optional.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:returns: Session or None
+	"""
+	url = _serverURL(url)
+	with _sessionLock:
+		if user == None:
+			user = _defaultUsers.get(url)
+		return _sessions.get((url,user))
+
+####################################################################
+### BULK OPERATIONS  ###############################################
+
+## Result of a bulk operation on one graph.  'ok' is False if the operation
+## failed, in which case 'error' says why.  'graphid' is None for a single 
+## tag request that covered every graph with the tag.
+BulkResult = collections.namedtuple('BulkResult',['graphid','ok','seconds','error'])
+
+def shareGraphs(graphids,user,password,group,group_owner,tag=None,prefix=None,concurrency=4,url=None,timeout=None):
+	"""
+	Shares many graphs with a group at once, with up to 'concurrency' requests 
+	in flight over the module's connection pool.  The graphs are given as a 
+	list of IDs and/or selected by 'tag' or ID 'prefix' among the graphs posted
+	from this machine (according to the local upload cache).
+
+	:param graphids: list -- IDs of GraphSpace graphs, or None to select graphs only by 'tag' or 'prefix'.
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password
+	:param group: string -- group to share the graphs with.
+	:param group_owner: string -- owner of group.
+	:param tag: string -- also share the posted graphs with this tag.  Optional.
+	:param prefix: string -- also share the posted graphs whose IDs start with this prefix.  Optional.
+	:param concurrency: int -- largest number of requests in flight.  Default is 4.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: list of BulkResult, one for each graph.
+	"""
+	logger.info('Sharing graphs from user %s with group %s owned by %s',user,group,group_owner)
+	graphids = _selectGraphs(graphids,user,tag,prefix,url)
+	return _bulkRequest(graphids,concurrency,lambda graphid: _constructShareCommand(graphid,user,password,group,group_owner,url),timeout)
+
+def unShareGraphs(graphids,user,password,group,group_owner,tag=None,prefix=None,concurrency=4,url=None,timeout=None):
+	"""
+	Un-Shares many graphs with a group at once.  The graphs are selected as in
+	shareGraphs().
+
+	:param graphids: list -- IDs of GraphSpace graphs, or None to select graphs only by 'tag' or 'prefix'.
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password
+	:param group: string -- group to un-share the graphs with.
+	:param group_owner: string -- owner of group.
+	:param tag: string -- also un-share the posted graphs with this tag.  Optional.
+	:param prefix: string -- also un-share the posted graphs whose IDs start with this prefix.  Optional.
+	:param concurrency: int -- largest number of requests in flight.  Default is 4.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: list of BulkResult, one for each graph.
+	"""
+	logger.info('Un-Sharing graphs from user %s with group %s owned by %s',user,group,group_owner)
+	graphids = _selectGraphs(graphids,user,tag,prefix,url)
+	return _bulkRequest(graphids,concurrency,lambda graphid: _constructUnShareCommand(graphid,user,password,group,group_owner,url),timeout)
+
+def makeGraphsPublic(graphids,user,password,tag=None,prefix=None,concurrency=4,url=None,timeout=None):
+	"""
+	Makes many graphs publicly viewable at once.  The graphs are selected as
+	in shareGraphs(), except that a 'tag' on its own is sent to GraphSpace as 
+	a single tag request (see makeGraphsWithTagPublic()), which also covers 
+	graphs with the tag that were not posted from this machine.
+
+	:param graphids: list -- IDs of GraphSpace graphs, or None to select graphs only by 'tag' or 'prefix'.
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password
+	:param tag: string -- graph tag.  Optional.
+	:param prefix: string -- also make the posted graphs whose IDs start with this prefix public.  Optional.
+	:param concurrency: int -- largest number of requests in flight.  Default is 4.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: list of BulkResult, one for each graph or a single one for a tag request.
+	"""
+	logger.info('Making graphs from user %s public',user)
+	if tag != None and graphids == None and prefix == None:
+		return _bulkRequest([None],1,lambda graphid: _constructPublicTagCommand(user,password,tag,url),timeout)
+	graphids = _selectGraphs(graphids,user,tag,prefix,url)
+	return _bulkRequest(graphids,concurrency,lambda graphid: _constructPublicGraphCommand(graphid,user,password,url),timeout)
+
+def makeGraphsPrivate(graphids,user,password,tag=None,prefix=None,concurrency=4,url=None,timeout=None):
+	"""
+	Makes many graphs privately viewable at once.  The graphs are selected as
+	in makeGraphsPublic(), and a 'tag' on its own is sent as a single tag request.
+
+	:param graphids: list -- IDs of GraphSpace graphs, or None to select graphs only by 'tag' or 'prefix'.
+	:param user: string -- graph owner's username
+	:param password: string -- graph owner's password
+	:param tag: string -- graph tag.  Optional.
+	:param prefix: string -- also make the posted graphs whose IDs start with this prefix private.  Optional.
+	:param concurrency: int -- largest number of requests in flight.  Default is 4.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: list of BulkResult, one for each graph or a single one for a tag request.
+	"""
+	logger.info('Making graphs from user %s private',user)
+	if tag != None and graphids == None and prefix == None:
+		return _bulkRequest([None],1,lambda graphid: _constructPrivateTagCommand(user,password,tag,url),timeout)
+	graphids = _selectGraphs(graphids,user,tag,prefix,url)
+	return _bulkRequest(graphids,concurrency,lambda graphid: _constructPrivateGraphCommand(graphid,user,password,url),timeout)
+
+def _selectGraphs(graphids,user,tag,prefix,url):
+	## returns the given graph IDs followed by the posted graphs that match
+	## the tag or the prefix, without duplicates.
+	selected = [str(graphid) for graphid in graphids] if graphids != None else []
+	if tag != None or prefix != None:
+		keyprefix = _cacheKey('',user,url)
+		for key,entry in sorted(_readUploadCache().items()):
+			if not key.startswith(keyprefix):
+				continue
+			graphid = key[len(keyprefix):]
+			if (tag != None and tag in entry.get('tags',[])) or (prefix != None and graphid.startswith(prefix)):
+				selected.append(graphid)
+	return list(collections.OrderedDict.fromkeys(selected))
+
+def _bulkRequest(graphids,concurrency,construct,timeout=None):
+	## sends construct(graphid) for every graph ID, with up to 'concurrency'
+	## requests at once.
+	def request(graphid):
+		start = time.time()
+		try:
+			error = _responseError(execute(construct(graphid),timeout=timeout))
+		except Exception as e:
+			error = '%s: %s' % (e.__class__.__name__,e)
+		return BulkResult(graphid,error == None,time.time()-start,error)
+	return _runConcurrently(request,[(graphid,) for graphid in graphids],concurrency)
+
+####################################################################
+### UPLOAD CACHE  ##################################################
+
+## The upload cache maps each graph (server, user and graph ID) to the content
+## hash of the last graph that was successfully posted.  It is stored as a 
+## JSON file in CACHE_DIR.  Changes are made under a lock so that uploads 
+## from several threads do not overwrite each other's entries.
+_cacheLock = threading.RLock()
+
+def isUploadCached(graphid,user,digest,url=None):
+	"""
+	Checks whether a graph with this content hash was the last one posted.
+
+	:param graphid: string -- ID of GraphSpace graph
+	:param user: string -- graph owner's username
+	:param digest: string -- content hash from json_utils.hash_json_data()
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:returns: boolean -- True if the graph is unchanged since the last upload.
+	"""
+	entry = _readUploadCache().get(_cacheKey(graphid,user,url))
+	return entry != None and entry['hash'] == digest
+
+def recordUpload(graphid,user,digest,url=None,tags=None):
+	"""
+	Records the content hash of a successfully posted graph.  The graph's tags
+	are remembered as well, so bulk operations can select graphs by tag.
+
+	:param graphid: string -- ID of GraphSpace graph
+	:param user: string -- graph owner's username
+	:param digest: string -- content hash from json_utils.hash_json_data(), or None if it is unknown.
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param tags: list -- tags of the graph.  Optional.
+	"""
+	entry = {'hash':digest}
+	if tags:
+		entry['tags'] = tags
+	with _cacheLock:
+		cache = _readUploadCache()
+		cache[_cacheKey(graphid,user,url)] = entry
+		_writeUploadCache(cache)
+
+def forgetUpload(graphid,user,url=None):
 	"""
-	print('\nMaking graphs with tag %s from user %s public' % (tag,user))
-	cmd = _constructPrivateTagCommand(user,password,tag)
-	outstring = execute(cmd)  
+	Removes a graph from the upload cache, so the next post is always sent.
+
+	:param graphid: string -- ID of GraphSpace graph
+	:param user: string -- graph owner's username
+	:param url: string -- GraphSpace URL.  Default is URL.
+	"""
+	with _cacheLock:
+		cache = _readUploadCache()
+		if cache.pop(_cacheKey(graphid,user,url),None) != None:
+			_writeUploadCache(cache)
+
+def clearUploadCache():
+	"""
+	Removes every entry from the upload cache.
+	"""
+	with _cacheLock:
+		_writeUploadCache({})
+
+## Graphs known to exist on the server, for each server and user.  Each set 
+## is filled lazily from the upload cache the first time it is needed, and 
+## kept up to date from the server's responses and by deleteGraph().
+_knownGraphs = {}
+
+def _knownGraphIds(user,url):
+	key = (_serverURL(url),user)
+	if key not in _knownGraphs:
+		prefix = '%s|%s|' % key
+		_knownGraphs[key] = set(k[len(prefix):] for k in _readUploadCache() if k.startswith(prefix))
+	return _knownGraphs[key]
+
+def _isKnownGraph(graphid,user,url=None):
+	with _cacheLock:
+		return str(graphid) in _knownGraphIds(user,url)
+
+def _setKnownGraph(graphid,user,exists,url=None):
+	with _cacheLock:
+		if exists:
+			_knownGraphIds(user,url).add(str(graphid))
+		else:
+			_knownGraphIds(user,url).discard(str(graphid))
+
+def _payloadSummary(jsonfile):
+	## returns the content hash and the tags of a JSON filename or bytes 
+	## payload, which may be gzip data.  Streamed payloads cannot be read 
+	## without consuming them, so (None,None) is returned.
+	if isinstance(jsonfile,str):
+		with open(jsonfile,'rb') as f:
+			raw = f.read()
+	elif isinstance(jsonfile,bytes):
+		raw = jsonfile
+	else:
+		return None,None
+	if raw[:2] == GZIP_MAGIC:
+		raw = gzip.decompress(raw)
+	data = json.loads(raw.decode('utf8'))
+	return json_utils.hash_json_data(data),_dataTags(data)
+
+## first two bytes of every gzip file.
+GZIP_MAGIC = b'\x1f\x8b'
+
+def _peekGzip(jsonfile):
+	## returns the payload and whether it is gzip data.  A stream is put back
+	## together after its first chunk has been looked at.
+	if isinstance(jsonfile,str):
+		with open(jsonfile,'rb') as f:
+			return jsonfile,f.read(2) == GZIP_MAGIC
+	if isinstance(jsonfile,bytes):
+		return jsonfile,jsonfile[:2] == GZIP_MAGIC
+	chunks = iter(jsonfile)
+	first = next(chunks,b'')
+	return itertools.chain([first],chunks),first[:2] == GZIP_MAGIC
+
+def _dataTags(data):
+	try:
+		return list(data['metadata']['tags'])
+	except (KeyError,TypeError):
+		return None
+
+def _payloadChunks(jsonfile,chunk_size=65536):
+	## yields a JSON filename or payload as a stream of bytes chunks.
+	if isinstance(jsonfile,str):
+		with open(jsonfile,'rb') as f:
+			chunk = f.read(chunk_size)
+			while chunk:
+				yield chunk
+				chunk = f.read(chunk_size)
+	elif isinstance(jsonfile,bytes):
+		yield jsonfile
+	else:
+		for chunk in jsonfile:
+			yield chunk
+
+def _archiveChunks(chunks,graphid,archive,compress):
+	## passes the chunks through while writing them to a timestamped file in
+	## the archive directory.  If 'compress' is None the chunks are already 
+	## gzip data and are written as they are.  The file only appears under its
+	## final name once the whole payload has been read.
+	if not os.path.isdir(archive):
+		os.makedirs(archive)
+	name = '%s-%s.json.gz' % (str(graphid).replace(os.sep,'_'),time.strftime('%Y%m%d-%H%M%S'))
+	path = os.path.join(archive,name)
+	if compress == None:
+		out = open(path+'.tmp','wb')
+	else:
+		out = gzip.open(path+'.tmp','wb',compresslevel=compress)
+	try:
+		for chunk in chunks:
+			out.write(chunk)
+			yield chunk
+	except:
+		out.close()
+		os.remove(path+'.tmp')
+		raise
+	out.close()
+	os.replace(path+'.tmp',path)
+
+def _cacheKey(graphid,user,url=None):
+	return '%s|%s|%s' % (_serverURL(url),user,graphid)
+
+def _readUploadCache():
+	try:
+		with open(os.path.join(CACHE_DIR,'uploads.json')) as f:
+			return json.load(f)
+	except (IOError,ValueError):
+		return {}
+
+def _writeUploadCache(cache):
+	## write to a temporary file and rename it, so an interrupted write
+	## never leaves a truncated cache behind.
+	if not os.path.isdir(CACHE_DIR):
+		os.makedirs(CACHE_DIR)
+	fd,tmpname = tempfile.mkstemp(dir=CACHE_DIR,suffix='.tmp')
+	with os.fdopen(fd,'w') as f:
+		json.dump(cache,f)
+	os.replace(tmpname,os.path.join(CACHE_DIR,'uploads.json'))
+
+####################################################################
+### UPLOAD SPOOL  ##################################################
+
+## The spool is a directory with one job file per graph (server, user and 
+## graph ID), named by the hash of its cache key, and the payload of each job
+## in a file of its own.  Queuing a graph again replaces its job, so only the
+## last version is posted.  A flusher claims a job by renaming it from .job 
+## to .claimed; claimed jobs left behind by a flusher that crashed are queued 
+## again when the next flusher starts.  Jobs the server rejects are moved to
+## the 'failed' subdirectory.
+
+def spoolGraph(graphid,jsonfile,user,url=None,force=False,digest=None,compress=None,archive=None,spool=None,tags=None):
+	"""
+	Queues a graph for posting and returns immediately.  The payload is copied
+	to the spool directory and synced to disk, so the upload survives a crash.
+	If the graph is already queued, the queued version is replaced.  Run 
+	flushSpool() (or graphspace_flush.py) to post the queued graphs.
+
+	:param graphid: string -- ID of GraphSpace graph
+	:param jsonfile: string, bytes or iterable of bytes -- JSON file to post, or the JSON payload.
+	:param user: string -- graph owner's username
+	:param url: string -- GraphSpace URL.  Default is URL.
+	:param force: boolean -- If True, post the graph even if it is unchanged since the last upload.  Default is False.
+	:param digest: string -- content hash from json_utils.hash_json_data().  Optional; computed from 'jsonfile' if not given.
+	:param compress: int -- gzip compression level, see postGraph().  Optional.
+	:param archive: string -- archive directory, see postGraph().  Optional.
+	:param spool: string -- spool directory.  Default is SPOOL_DIR.
+	:param tags: list -- tags of the graph, see postGraph().  Optional.
+	:returns: string -- path of the job file.
+	"""
+	spool = spool or SPOOL_DIR
+	if not os.path.isdir(spool):
+		os.makedirs(spool)
+	if digest == None:
+		digest,found = _payloadSummary(jsonfile)
+		if tags == None:
+			tags = found
+	name = hashlib.sha1(_cacheKey(graphid,user,url).encode('utf8')).hexdigest()
+	payload = os.path.join(spool,'%s-%s.payload' % (name,uuid.uuid4().hex))
+	with open(payload,'wb') as f:
+		for chunk in _payloadChunks(jsonfile):
+			f.write(chunk)
+		f.flush()
+		os.fsync(f.fileno())
+	job = {'graphid':str(graphid),'user':user,'url':_serverURL(url),'payload':os.path.basename(payload),'digest':digest,'tags':tags,
+		'force':force,'compress':compress,'archive':archive,'queued':time.time()}
+	path = os.path.join(spool,name+'.job')
+	previous = _readJob(path)
+	_writeJob(path,job)
+	## the replaced job's payload is no longer needed.  If a flusher claimed
+	## it in the meantime, it finds the payload gone and drops the old job.
+	if previous != None:
+		_removeFile(os.path.join(spool,previous['payload']))
+	logger.info('Queued graph %s from user %s for upload',graphid,user)
+	return path
+
+def spooledUploads(spool=None):
+	"""
+	Returns the jobs waiting in the spool, oldest first.
+
+	:param spool: string -- spool directory.  Default is SPOOL_DIR.
+	:returns: list of dictionaries with the graph ID, user, URL and time each graph was queued.
+	"""
+	spool = spool or SPOOL_DIR
+	if not os.path.isdir(spool):
+		return []
+	jobs = [_readJob(os.path.join(spool,name)) for name in os.listdir(spool) if name.endswith('.job') or name.endswith('.claimed')]
+	return sorted([job for job in jobs if job != None],key=lambda job: job['queued'])
+
+def flushSpool(password=None,concurrency=4,spool=None,timeout=None):
+	"""
+	Posts every graph waiting in the spool, with up to 'concurrency' uploads 
+	at once.  Graphs that cannot be posted because the server is unreachable
+	stay queued for the next flush; graphs the server rejects are moved to 
+	the 'failed' subdirectory of the spool.  Only one flusher can work on a 
+	spool at a time.
+
+	:param password: string -- password for every queued graph.  Optional; by default the sessions from login() are used.
+	:param concurrency: int -- largest number of graphs uploaded at once.  Default is 4.
+	:param spool: string -- spool directory.  Default is SPOOL_DIR.
+	:param timeout: float -- seconds to wait for the server on each request.  Default is TIMEOUT.
+	:returns: list of UploadResult, one for each job.
+	:raises GraphSpaceError: if another flusher is working on the spool.
+	"""
+	spool = spool or SPOOL_DIR
+	if not os.path.isdir(spool):
+		return []
+	lock = open(os.path.join(spool,'.lock'),'w')
+	try:
+		if fcntl != None:
+			try:
+				fcntl.flock(lock,fcntl.LOCK_EX | fcntl.LOCK_NB)
+			except OSError:
+				raise GraphSpaceError('Another flusher is working on %s.' % (spool))
+		## jobs claimed by a flusher that did not finish are queued again.
+		for name in os.listdir(spool):
+			if name.endswith('.claimed'):
+				_unclaimJob(spool,name[:-len('.claimed')])
+		names = []
+		for job in spooledUploads(spool):
+			name = hashlib.sha1(_cacheKey(job['graphid'],job['user'],job['url']).encode('utf8')).hexdigest()
+			try:
+				os.replace(os.path.join(spool,name+'.job'),os.path.join(spool,name+'.claimed'))
+			except OSError:
+				continue
+			names.append((name,))
+		return _runConcurrently(lambda name: _flushJob(spool,name,password,timeout),names,concurrency)
+	finally:
+		lock.close()
+
+def _flushJob(spool,name,password,timeout=None):
+	## posts one claimed job and returns its UploadResult.
+	start = time.time()
+	claimed = os.path.join(spool,name+'.claimed')
+	job = _readJob(claimed)
+	payload = os.path.join(spool,job['payload'])
+	if not os.path.exists(payload):
+		## replaced by a newer job after it was claimed.
+		_removeFile(claimed)
+		return UploadResult(job['graphid'],True,False,time.time()-start,None)
+	if password == None and getSession(job['user'],job['url']) == None:
+		_unclaimJob(spool,name)
+		return UploadResult(job['graphid'],False,False,time.time()-start,'No password given for user %s and no session (still queued)' % (job['user']))
+	try:
+		posted,response = _postGraph(job['graphid'],payload,job['user'],password,None,job['force'],job['digest'],job['compress'],job['archive'],job['url'],job['tags'],timeout)
+		error = _responseError(response) if posted else None
+	except (GraphSpaceConnectionError,GraphSpaceServerError,GraphSpaceUnavailable) as e:
+		_unclaimJob(spool,name)
+		return UploadResult(job['graphid'],False,False,time.time()-start,'%s: %s (still queued)' % (e.__class__.__name__,e))
+	except GraphSpaceError as e:
+		posted = True
+		error = '%s: %s' % (e.__class__.__name__,e)
+	if error == None:
+		_removeFile(payload)
+		_removeFile(claimed)
+	else:
+		logger.warning('GraphSpace rejected graph %s from user %s: %s',job['graphid'],job['user'],error)
+		failed = os.path.join(spool,'failed')
+		if not os.path.isdir(failed):
+			os.makedirs(failed)
+		job['error'] = error
+		os.replace(payload,os.path.join(failed,job['payload']))
+		_writeJob(os.path.join(failed,name+'.job'),job)
+		_removeFile(claimed)
+	return UploadResult(job['graphid'],error == None,posted,time.time()-start,error)
+
+def _unclaimJob(spool,name):
+	## puts a claimed job back in the queue, unless it was replaced by a newer one.
+	claimed = os.path.join(spool,name+'.claimed')
+	if os.path.exists(os.path.join(spool,name+'.job')):
+		job = _readJob(claimed)
+		if job != None:
+			_removeFile(os.path.join(spool,job['payload']))
+		_removeFile(claimed)
+	else:
+		os.replace(claimed,os.path.join(spool,name+'.job'))
+
+def _readJob(path):
+	try:
+		with open(path) as f:
+			return json.load(f)
+	except (IOError,ValueError):
+		return None
+
+def _writeJob(path,job):
+	## written to a temporary file, synced and renamed, so a job file is 
+	## always complete.
+	fd,tmpname = tempfile.mkstemp(dir=os.path.dirname(path),suffix='.tmp')
+	with os.fdopen(fd,'w') as f:
+		json.dump(job,f)
+		f.flush()
+		os.fsync(f.fileno())
+	os.replace(tmpname,path)
+
+def _removeFile(path):
+	try:
+		os.remove(path)
+	except OSError:
+		pass
+
+####################################################################
+### METRICS  #######################################################
+
+## Phases of a request, in order: preparing the payload, opening the 
+## connection, sending the request, waiting for the server's answer, reading
+## the answer, and decoding it.
+PHASES = ['serialize','connect','send','wait','receive','parse']
+
+## Record of one call to execute().  'time' is when the call started, 
+## 'action' the API request (e.g. 'add' or 'share'), 'attempts' the number of
+## requests sent including retries, and 'seconds' the whole time of the call.
+## 'ok' is False if the request failed or the server reported an error, which
+## is then given in 'error'.  The remaining fields are the seconds spent in 
+## each of the PHASES, summed over all attempts.
+CallRecord = collections.namedtuple('CallRecord',['time','action','host','status','ok','attempts','bytes_sent','bytes_received','seconds','error']+PHASES)
+
+class Histogram:
+	"""
+	Counts values in exponentially growing buckets, so percentiles can be
+	estimated in constant memory.  The first bucket holds values up to 'start'
+	and each following bucket is twice as wide.
+
+	:param start: float -- upper bound of the first bucket.
+	:param buckets: int -- number of buckets; larger values go in the last one.
+	"""
+	def __init__(self,start=0.001,buckets=20):
+		self.bounds = [start*2**i for i in range(buckets)]
+		self.counts = [0]*(buckets+1)
+		self.count = 0
+		self.sum = 0.0
+		self.min = None
+		self.max = None
+
+	def observe(self,value):
+		self.counts[bisect.bisect_left(self.bounds,value)] += 1
+		self.count += 1
+		self.sum += value
+		if self.min == None or value < self.min:
+			self.min = value
+		if self.max == None or value > self.max:
+			self.max = value
+
+	def percentile(self,p):
+		"""
+		Returns an upper bound for the p-th percentile (0-100), or None if 
+		no values were observed.
+		"""
+		if not self.count:
+			return None
+		rank = p/100.0*self.count
+		total = 0
+		for i,n in enumerate(self.counts):
+			total += n
+			if total >= rank and n:
+				return min(self.bounds[i],self.max) if i < len(self.bounds) else self.max
+		return self.max
+
+	def summary(self):
+		if not self.count:
+			return {'count':0}
+		return {'count':self.count,'mean':self.sum/self.count,'min':self.min,'p50':self.percentile(50),'p90':self.percentile(90),'p99':self.percentile(99),'max':self.max}
+
+class Metrics:
+	"""
+	In-process registry of counters and latency histograms for the requests 
+	sent by execute().  For each action (and for all actions together, as 
+	'all') it counts requests, errors, retries and bytes, and keeps histograms
+	of the call time and of every phase.  A registry can be shared between
+	threads.
+
+	Calls can also be written to a JSON-lines trace file with trace(), and the
+	calls made by one thread can be collected with collect().
+	"""
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._collectors = {}
+		self._trace = None
+		self.reset()
+
+	def reset(self):
+		"""
+		Sets all counters and histograms back to zero.
+		"""
+		with self._lock:
+			self.counters = collections.defaultdict(int)
+			self.histograms = collections.defaultdict(Histogram)
+
+	def trace(self,path):
+		"""
+		Appends every following call to 'path' as one line of JSON.  A path of 
+		None stops tracing.
+
+		:param path: string -- name of the trace file, or None.
+		"""
+		with self._lock:
+			if self._trace != None:
+				self._trace.close()
+			self._trace = open(path,'a') if path else None
+
+	def record(self,call):
+		"""
+		Adds a CallRecord to the counters, histograms, trace file and the 
+		collector of the calling thread.
+		"""
+		with self._lock:
+			for name in ['all',call.action]:
+				self.counters[name+'.requests'] += 1
+				self.counters[name+'.retries'] += call.attempts - 1
+				self.counters[name+'.bytes_sent'] += call.bytes_sent
+				self.counters[name+'.bytes_received'] += call.bytes_received
+				if not call.ok:
+					self.counters[name+'.errors'] += 1
+				self.histograms[name+'.seconds'].observe(call.seconds)
+			for phase in PHASES:
+				self.histograms['all.'+phase].observe(getattr(call,phase))
+			if self._trace != None:
+				self._trace.write(json.dumps(call._asdict())+'\n')
+				self._trace.flush()
+			collector = self._collectors.get(threading.get_ident())
+		if collector != None:
+			collector.append(call)
+
+	@contextlib.contextmanager
+	def collect(self):
+		"""
+		Context manager that yields a list, to which the CallRecord of every 
+		call made by this thread inside the with block is appended.
+		"""
+		ident = threading.get_ident()
+		calls = []
+		with self._lock:
+			previous = self._collectors.get(ident)
+			self._collectors[ident] = calls
+		try:
+			yield calls
+		finally:
+			with self._lock:
+				if previous == None:
+					del self._collectors[ident]
+				else:
+					self._collectors[ident] = previous
+			if previous != None:
+				previous.extend(calls)
+
+	def snapshot(self):
+		"""
+		Returns the counters and histogram summaries as a dictionary that can
+		be written as JSON.
+		"""
+		with self._lock:
+			return {'counters':dict(self.counters),'histograms':dict((name,h.summary()) for name,h in self.histograms.items())}
+
+## metrics registry shared by every request from this module.
+METRICS = Metrics()
+if TRACE_FILE:
+	METRICS.trace(TRACE_FILE)
+
+def summarizeCalls(calls):
+	"""
+	Sums up a list of CallRecords (e.g. from Metrics.collect()) in one line.
+
+	:param calls: list of CallRecord
+	:returns: string -- number of requests, status, bytes sent and received and the seconds spent in each phase.
+	"""
+	if not calls:
+		return 'no requests'
+	statuses = ','.join(str(call.status) for call in calls)
+	sent = sum(call.bytes_sent for call in calls)
+	received = sum(call.bytes_received for call in calls)
+	phases = ' '.join('%s %.3f' % (phase,sum(getattr(call,phase) for call in calls)) for phase in PHASES)
+	return '%d request(s), status %s, %d bytes sent, %d received, %.3f s (%s)' % (len(calls),statuses,sent,received,sum(call.seconds for call in calls),phases)
+
+def _commandAction(cmd):
+	## name of the API request, e.g. 'add' from .../graph/add/<graphid>/.
+	parts = [p for p in urllib.parse.urlsplit(cmd.url).path.split('/') if p]
+	if len(parts) >= 5 and parts[:2] == ['api','users']:
+		return parts[4]
+	if parts[:2] == ['api','tags']:
+		return 'tag.' + parts[-1]
+	return parts[-1] if parts else ''
 
 ####################################################################
 ### EXECUTE COMMAND  ###############################################
 
-def execute(cmd,logout=None):
+def execute(cmd,logout=None,timeout=None,retries=None,serialize=0.0):
 	"""
-	Executes the command, using subprocess.Popen.  We need to capture
-	the output, so we cannot simply us os.system().
+	Sends the command to GraphSpace over a pooled keep-alive connection
+	and returns the server's response.
 
-	:param cmd: string -- command to execute
+	Connection failures, timeouts and 5xx responses are retried with exponential
+	backoff and jitter.  If the server keeps failing, the circuit breaker makes 
+	further calls fail fast with GraphSpaceUnavailable until BREAKER_COOLDOWN 
+	has passed.
+
+	The body of the response is decoded once with an incremental JSON decoder,
+	which stops at the end of the first JSON value and ignores anything (such as
+	HTML) after it.
+
+	Every call, successful or not, is recorded in METRICS with the time spent 
+	in each phase of the request.
+
+	:param cmd: Command -- request to send, from one of the _construct*Command functions.
 	:param logout: File object -- File of log output or None.
-	:return out: string -- output of command
-	"""
-	print('COMMAND:')
-	print(cmd)
-	proc = subprocess.Popen(cmd.split(), shell=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-	(out, err) = proc.communicate()
-	## in python3, out is now a byte stream instead of unicde.
-	## explicitly cast it. To check if we're using python 2 or 3, see 
-	## http://sweetme.at/2013/10/21/how-to-detect-python-2-vs-3-in-your-python-script/
-	if sys.version_info > (3,0):
-		out =  str( out, encoding='utf8' )
-	ind = [i for i in range(len(out)) if out[i]=='}']
-	origout = out
-	out = out[:ind[0]+1]
-	if out != origout:
-		print('WARNING: additional HTML detected from output string and trimmed.')
-	print('OUTPUT:')
-	if 'DOCTYPE' in out or 'html' in out: # HTML is spit out; suppress this and write error statement instead.
-		print(out)
-		print('ERROR: JSON is improperly formatted.  Check your nodes, edges, or attributes.')
-		sys.exit()
+	:param timeout: float -- seconds to wait for the server.  Default is TIMEOUT.
+	:param retries: int -- number of retries.  Default is RETRIES.
+	:param serialize: float -- seconds the caller spent serializing the payload, for the call's record.  Default is 0.
+	:return: Response -- HTTP status, decoded JSON payload and elapsed seconds.
+	:raises GraphSpaceError: if the request failed (see the subclasses for the reasons).
+	"""
+	if timeout == None:
+		timeout = TIMEOUT
+	if retries == None:
+		retries = RETRIES
+	logger.debug('COMMAND: %s',cmd)
+	start = time.time()
+	phases = dict.fromkeys(PHASES,0.0)
+	phases['serialize'] = serialize
+	with contextlib.ExitStack() as stack:
+		if retries:
+			## a retry has to send the body again.
+			cmd = cmd._replace(files=[(name,_replayablePayload(payload,stack),content_type) for name,payload,content_type in cmd.files])
+			phases['serialize'] += time.time() - start
+		host = urllib.parse.urlsplit(cmd.url).netloc
+		attempt = 0
+		status = None
+		sent = received = 0
+		try:
+			while True:
+				BREAKER.check(host)
+				## the timing is filled in as the request goes, so the time spent
+				## on attempts that fail is counted as well.
+				timing = _Timing()
+				try:
+					status,out = _send(cmd,timeout,timing)
+					received += len(out)
+					if status >= 500:
+						raise GraphSpaceServerError('GraphSpace answered with status %d' % (status),status,str(out,encoding='utf8',errors='replace'))
+				except (GraphSpaceConnectionError,GraphSpaceServerError) as e:
+					BREAKER.failure(host)
+					if attempt >= retries:
+						raise
+					delay = random.uniform(0,min(BACKOFF_MAX,BACKOFF*2**attempt))
+					logger.warning('%s. Retrying in %.1f seconds.',e,delay)
+					time.sleep(delay)
+					attempt += 1
+					continue
+				finally:
+					for phase in timing:
+						phases[phase] += timing[phase]
+					sent += timing.sent
+				BREAKER.success(host)
+				break
+
+			parse_start = time.time()
+			response = _decodeResponse(status,out,parse_start-start)
+			phases['parse'] = time.time() - parse_start
+		except GraphSpaceError as e:
+			METRICS.record(CallRecord(start,_commandAction(cmd),host,status,False,attempt+1,sent,received,time.time()-start,str(e),**phases))
+			raise
+		error = _responseError(response)
+		METRICS.record(CallRecord(start,_commandAction(cmd),host,status,error == None,attempt+1,sent,received,time.time()-start,error,**phases))
+		logger.debug('OUTPUT (status %d, %.3f seconds): %s',response.status,response.elapsed,response.payload)
+		if logout:
+			logout.write(str(cmd)+'\n')
+			logout.write(json.dumps(response.payload)+'\n')
+		return response
+
+## Response of the server to a Command: the HTTP status code, the decoded JSON
+## payload and the time the call took in seconds.
+Response = collections.namedtuple('Response',['status','payload','elapsed'])
+
+_decoder = json.JSONDecoder()
+
+def _decodeResponse(status,out,elapsed):
+	## decodes the first JSON value in the body.  Anything after it is ignored;
+	## a body that does not start with JSON (usually an HTML error page because
+	## the graph was improperly formatted) raises GraphSpaceResponseError.
+	text = str(out,encoding='utf8',errors='replace')
+	start = len(text) - len(text.lstrip())
+	try:
+		payload,end = _decoder.raw_decode(text,start)
+	except ValueError:
+		raise GraphSpaceResponseError('GraphSpace did not answer with JSON (status %d). Check your nodes, edges, or attributes.' % (status),text)
+	if text[end:].strip():
+		logger.debug('%d characters after the JSON response were ignored.',len(text)-end)
+	return Response(status,payload,elapsed)
+
+## handler added by setLogLevel(), so that it is only added once.
+_stdoutHandler = None
+
+def setLogLevel(level=None):
+	"""
+	Prints this module's messages to standard output, and sets how much it 
+	prints.  'DEBUG' also prints every request and response, 'INFO' prints one
+	line per call, and 'WARNING' only prints retries and problems.  Scripts 
+	that configure the logging module themselves do not need this.
+
+	:param level: string or int -- a level name or number from the logging module.  Default is the GRAPHSPACE_LOG_LEVEL environment variable, or 'INFO'.
+	"""
+	global _stdoutHandler
+	if level == None:
+		level = os.environ.get('GRAPHSPACE_LOG_LEVEL','INFO')
+	if isinstance(level,str):
+		level = level.upper()
+	if _stdoutHandler == None:
+		_stdoutHandler = logging.StreamHandler(sys.stdout)
+		_stdoutHandler.setFormatter(logging.Formatter('%(message)s'))
+		logger.addHandler(_stdoutHandler)
+	logger.setLevel(level)
+
+####################################################################
+### HTTP CLIENT  ###################################################
+
+class Command(collections.namedtuple('Command',['url','fields','files','headers'])):
+	"""
+	A request to the GraphSpace API.  Commands are sent as multipart/form-data
+	POST requests, like the curl commands this module used to run.
+
+	:param url: string -- endpoint URL
+	:param fields: list of (name,value) pairs -- form fields
+	:param files: list of (name,payload,content_type) triples -- file fields.  The payload is a filename, bytes or an iterable of bytes.
+	:param headers: list of (name,value) pairs -- extra HTTP headers.  Optional.
+	"""
+	__slots__ = ()
+
+	def __new__(cls,url,fields,files,headers=()):
+		return super(Command,cls).__new__(cls,url,fields,files,headers)
+
+	def __str__(self):
+		## the password is never printed or written to log files.
+		s = 'POST ' + self.url
+		for name,value in self.fields:
+			if name == 'password':
+				value = '****'
+			s += ' %s=%s' % (name,value)
+		for name,payload,content_type in self.files:
+			s += ' %s=@%s' % (name,payload if isinstance(payload,str) else '<payload>')
+		return s
+
+class ConnectionPool:
+	"""
+	Keeps idle HTTP connections to each host open so that consecutive 
+	requests reuse them (HTTP keep-alive) instead of paying for a new TCP
+	and TLS handshake every time.  A pool can be shared between threads.
+
+	At most 'limit' connections to each host are handed out at a time; get()
+	blocks until one is returned with put() or discard().
+
+	:param maxsize: int -- idle connections kept per host.
+	:param idle: float -- seconds an idle connection is kept before it is closed.
+	:param timeout: float -- socket timeout for new connections, in seconds.  Optional.
+	:param limit: int -- largest number of connections in use per host.  Optional.
+	"""
+	def __init__(self,maxsize=POOL_SIZE,idle=KEEPALIVE_IDLE,timeout=None,limit=MAX_PER_HOST):
+		self.maxsize = maxsize
+		self.idle = idle
+		self.timeout = timeout
+		self.limit = limit
+		self._conns = {}
+		self._slots = {}
+		self._lock = threading.Lock()
+
+	def get(self,scheme,netloc):
+		"""
+		Returns a connection to the host, and whether it was reused from the pool.
+		"""
+		if self.limit:
+			with self._lock:
+				slots = self._slots.setdefault((scheme,netloc),threading.BoundedSemaphore(self.limit))
+			slots.acquire()
+		now = time.time()
+		with self._lock:
+			conns = self._conns.get((scheme,netloc),[])
+			while conns:
+				conn,since = conns.pop()
+				if now - since < self.idle:
+					return conn,True
+				conn.close()
+		if scheme == 'https':
+			conn = http.client.HTTPSConnection(netloc,timeout=self.timeout)
+		else:
+			conn = http.client.HTTPConnection(netloc,timeout=self.timeout)
+		return conn,False
+
+	def put(self,scheme,netloc,conn):
+		"""
+		Returns a connection to the pool after its response has been read.
+		"""
+		with self._lock:
+			conns = self._conns.setdefault((scheme,netloc),[])
+			if len(conns) < self.maxsize:
+				conns.append((conn,time.time()))
+				conn = None
+		if conn != None:
+			conn.close()
+		self._release(scheme,netloc)
+
+	def discard(self,scheme,netloc,conn):
+		"""
+		Closes a connection that cannot be reused, e.g. after an error.
+		"""
+		conn.close()
+		self._release(scheme,netloc)
+
+	def _release(self,scheme,netloc):
+		if self.limit:
+			self._slots[(scheme,netloc)].release()
+
+	def close(self):
+		"""
+		Closes all idle connections.
+		"""
+		with self._lock:
+			for conns in self._conns.values():
+				for conn,since in conns:
+					conn.close()
+			self._conns = {}
+
+## connection pool shared by every request from this module.
+POOL = ConnectionPool()
+
+class CircuitBreaker:
+	"""
+	Tracks consecutive failures per host.  After 'threshold' failures in a row
+	the circuit opens and check() raises GraphSpaceUnavailable, until 'cooldown'
+	seconds have passed.  Then one request is let through: if it succeeds the 
+	circuit closes again, and if it fails the circuit stays open for another 
+	cooldown.  A breaker can be shared between threads.
+
+	:param threshold: int -- consecutive failures that open the circuit.
+	:param cooldown: float -- seconds the circuit stays open.
+	"""
+	def __init__(self,threshold=BREAKER_THRESHOLD,cooldown=BREAKER_COOLDOWN):
+		self.threshold = threshold
+		self.cooldown = cooldown
+		self._failures = {}
+		self._opened = {}
+		self._lock = threading.Lock()
+
+	def check(self,host):
+		"""
+		Raises GraphSpaceUnavailable if requests to the host should not be sent.
+		"""
+		with self._lock:
+			opened = self._opened.get(host)
+			if opened == None:
+				return
+			wait = opened + self.cooldown - time.time()
+			if wait > 0:
+				raise GraphSpaceUnavailable('%d requests to %s failed in a row; not sending requests for another %.0f seconds.' % (self._failures[host],host,wait))
+			## let this request through as a trial, and hold back others
+			## until it has finished.
+			self._opened[host] = time.time()
+
+	def success(self,host):
+		with self._lock:
+			self._failures.pop(host,None)
+			self._opened.pop(host,None)
+
+	def failure(self,host):
+		with self._lock:
+			self._failures[host] = self._failures.get(host,0) + 1
+			if self._failures[host] >= self.threshold:
+				self._opened[host] = time.time()
+
+## circuit breaker shared by every request from this module.
+BREAKER = CircuitBreaker()
+
+class _Timing(dict):
+	## seconds spent in the connect, send, wait and receive phases of a 
+	## request, and the number of bytes sent.
+	def __init__(self):
+		dict.__init__(self,connect=0.0,send=0.0,wait=0.0,receive=0.0)
+		self.sent = 0
+
+	def lap(self,phase,since):
+		## adds the time since 'since' to the phase, and returns the current time.
+		now = time.time()
+		self[phase] += now - since
+		return now
+
+	def count(self,chunks):
+		for chunk in chunks:
+			self.sent += len(chunk)
+			yield chunk
+
+def _send(cmd,timeout=None,timing=None):
+	## sends the command over a pooled connection and returns (status,body).
+	## The time spent in each phase and the bytes sent are added to 'timing',
+	## a _Timing, as they happen, so they are known even if the request fails.
+	parts = urllib.parse.urlsplit(cmd.url)
+	path = parts.path
+	if parts.query:
+		path += '?' + parts.query
+	with contextlib.ExitStack() as stack:
+		files = [(name,_preparePayload(payload,stack),content_type) for name,payload,content_type in cmd.files]
+		replayable = all(_payloadLength(payload) != None for name,payload,content_type in files)
+		boundary = uuid.uuid4().hex
+		headers = dict(cmd.headers)
+		headers['Content-Type'] = 'multipart/form-data; boundary=%s' % (boundary)
+		length = _multipartLength(cmd.fields,files,boundary)
+		if length != None:
+			headers['Content-Length'] = str(length)
+
+		if timing == None:
+			timing = _Timing()
+		while True:
+			conn,reused = POOL.get(parts.scheme,parts.netloc)
+			conn.timeout = timeout
+			if conn.sock != None:
+				conn.sock.settimeout(timeout)
+			phase = 'connect'
+			t = time.time()
+			try:
+				if conn.sock == None:
+					conn.connect()
+				t = timing.lap(phase,t)
+				phase = 'send'
+				## without a Content-Length, http.client sends the body chunked.
+				conn.request('POST',path,body=timing.count(_multipartBody(cmd.fields,files,boundary)),headers=headers)
+				t = timing.lap(phase,t)
+				phase = 'wait'
+				response = conn.getresponse()
+				t = timing.lap(phase,t)
+				phase = 'receive'
+				body = response.read()
+				timing.lap(phase,t)
+			except socket.timeout as e:
+				timing.lap(phase,t)
+				POOL.discard(parts.scheme,parts.netloc,conn)
+				raise GraphSpaceTimeout('No answer from %s within %s seconds' % (parts.netloc,timeout))
+			except (http.client.HTTPException,OSError) as e:
+				timing.lap(phase,t)
+				POOL.discard(parts.scheme,parts.netloc,conn)
+				## the server may have closed a reused connection while it was idle.
+				## try again on a fresh connection if the body can be sent again.
+				if reused and replayable:
+					continue
+				raise GraphSpaceConnectionError('Request to %s failed: %s' % (parts.netloc,e))
+			except BaseException:
+				timing.lap(phase,t)
+				POOL.discard(parts.scheme,parts.netloc,conn)
+				raise
+			if response.will_close:
+				POOL.discard(parts.scheme,parts.netloc,conn)
+			else:
+				POOL.put(parts.scheme,parts.netloc,conn)
+			return response.status,body
+
+def _preparePayload(payload,stack):
+	## streams of unknown length are spooled to an anonymous temporary file
+	## unless the server accepts chunked bodies.
+	if CHUNKED_UPLOADS:
+		return payload
+	return _replayablePayload(payload,stack)
+
+def _replayablePayload(payload,stack):
+	## filenames, bytes and files can be read more than once; any other stream
+	## is spooled to an anonymous temporary file, which is closed (and so 
+	## removed) when 'stack', a contextlib.ExitStack, is closed.
+	if isinstance(payload,(str,bytes)) or hasattr(payload,'read'):
+		return payload
+	spool = stack.enter_context(tempfile.TemporaryFile(prefix='graphspace_upload_'))
+	for chunk in payload:
+		spool.write(chunk)
+	spool.flush()
+	return spool
+
+def _payloadLength(payload):
+	if isinstance(payload,str):
+		return os.path.getsize(payload)
+	if isinstance(payload,bytes):
+		return len(payload)
+	if hasattr(payload,'fileno'):
+		return os.fstat(payload.fileno()).st_size
+	return None
+
+def _iterPayload(payload,chunk_size=65536):
+	if hasattr(payload,'read'):
+		payload.seek(0)
+		chunk = payload.read(chunk_size)
+		while chunk:
+			yield chunk
+			chunk = payload.read(chunk_size)
 	else:
-		print(out)
-	print('DONE')
-	print('')
-	if logout:
-		logout.write(cmd+'\n')
-		logout.write(out+'\n')
-	return out
+		for chunk in _payloadChunks(payload,chunk_size):
+			yield chunk
+
+def _multipartParts(fields,files,boundary):
+	## yields the encoded multipart body, with None in place of each file's contents.
+	for name,value in fields:
+		yield ('--%s\r\nContent-Disposition: form-data; name="%s"\r\n\r\n%s\r\n' % (boundary,name,value)).encode('utf8')
+	for name,payload,content_type in files:
+		filename = os.path.basename(payload) if isinstance(payload,str) else 'graph.json'
+		yield ('--%s\r\nContent-Disposition: form-data; name="%s"; filename="%s"\r\nContent-Type: %s\r\n\r\n' % (boundary,name,filename,content_type)).encode('utf8')
+		yield None
+		yield b'\r\n'
+	yield ('--%s--\r\n' % (boundary)).encode('utf8')
+
+def _multipartBody(fields,files,boundary):
+	payloads = iter([payload for name,payload,content_type in files])
+	for part in _multipartParts(fields,files,boundary):
+		if part == None:
+			for chunk in _iterPayload(next(payloads)):
+				yield chunk
+		else:
+			yield part
+
+def _multipartLength(fields,files,boundary):
+	length = sum(len(part) for part in _multipartParts(fields,files,boundary) if part != None)
+	for name,payload,content_type in files:
+		n = _payloadLength(payload)
+		if n == None:
+			return None
+		length += n
+	return length
 
 ####################################################################
-### CURL COMMANDS  #################################################
+### GRAPHSPACE COMMANDS  ###########################################
 
-def _constructExistsCommand(graphid,user,password):
+def _credentials(user,password,url):
+	## returns the form fields and headers that authenticate a request: the 
+	## username and password as form fields, or an Authorization header if 
+	## BASIC_AUTH is set.  Without a password, the credentials of the user's
+	## session are used.
+	session = None
+	if password == None:
+		session = getSession(user,url)
+		if session == None:
+			raise GraphSpaceError('No password given for user %s and no session; call login() first.' % (user))
+	elif BASIC_AUTH:
+		session = Session(user,password,url)
+	if BASIC_AUTH:
+		return [],[('Authorization',session.authorization)]
+	if session != None:
+		password = session.password
+	return [('username',user),('password',password)],[]
+
+def _serverURL(url):
+	return (URL if url == None else url).rstrip('/')
+
+def _constructExistsCommand(graphid,user,password,url=None):
 	"""
-	Construct curl command to check whether a graph exists.
+	Construct request to check whether a graph exists.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/%s/graph/exists/%s/ -F username=%s -F password=%s ; echo' % \
-		  (URL,user,graphid,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/%s/graph/exists/%s/' % (_serverURL(url),user,graphid),fields,[],headers)
 	return cmd
 
-def _constructPostCommand(graphid,user,password,jsonfile):
+def _constructPostCommand(graphid,user,password,jsonfile,content_type='application/json',url=None):
 	"""
-	Construct curl command to post a graph.
+	Construct request to post a graph.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
-	:param jsonfile: string -- JSON file of graph
+	:param jsonfile: string, bytes or iterable of bytes -- JSON file of graph, or the JSON payload
+	:param content_type: string -- content type of the JSON payload
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/%s/graph/add/%s/ -F username=%s -F password=%s -F graphname=@%s ; echo'  % \
-	   (URL, user, graphid, user, password, jsonfile) 
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/%s/graph/add/%s/' % (_serverURL(url),user,graphid),fields,[('graphname',jsonfile,content_type)],headers)
 	return cmd
 
-def _constructUpdateCommand(graphid,user,password,jsonfile):
+def _constructUpdateCommand(graphid,user,password,jsonfile,content_type='application/json',url=None):
 	"""
-	Construct curl command to update (overwrite) a graph.
+	Construct request to update (overwrite) a graph.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
-	:param jsonfile: string -- JSON file of graph
+	:param jsonfile: string, bytes or iterable of bytes -- JSON file of graph, or the JSON payload
+	:param content_type: string -- content type of the JSON payload
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/%s/graph/update/%s/ -F username=%s -F password=%s -F graphname=@%s ; echo'  % \
-		(URL, user, graphid, user, password, jsonfile) 
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/%s/graph/update/%s/' % (_serverURL(url),user,graphid),fields,[('graphname',jsonfile,content_type)],headers)
 	return cmd
 
-def _constructDeleteCommand(graphid,user,password):
+def _constructDeleteCommand(graphid,user,password,url=None):
 	"""
-	Construct curl command to delete a graph.
+	Construct request to delete a graph.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/%s/graph/delete/%s/ -F username=%s -F password=%s ; echo'  % \
-		  (URL, user, graphid, user, password) 
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/%s/graph/delete/%s/' % (_serverURL(url),user,graphid),fields,[],headers)
 	return cmd
 
-def _constructShareCommand(graphid,user,password,groupid,group_owner):
+def _constructShareCommand(graphid,user,password,groupid,group_owner,url=None):
 	"""
-	Construct curl command to share a graph with a group.
+	Construct request to share a graph with a group.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
 	:param groupid: string -- group to share graph with
 	:param group_owner: string -- group's owner
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/graphs/%s/share/%s/%s/ -F username=%s -F password=%s ; echo'  % \
-		  (URL, graphid,group_owner,groupid,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/graphs/%s/share/%s/%s/' % (_serverURL(url),graphid,group_owner,groupid),fields,[],headers)
 	return cmd
 
-def _constructUnShareCommand(graphid,user,password,groupid,group_owner):
+def _constructUnShareCommand(graphid,user,password,groupid,group_owner,url=None):
 	"""
-	Construct curl command to unshare a graph with a group.
+	Construct request to unshare a graph with a group.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
 	:param groupid: string -- group to share graph with
 	:param group_owner: string -- group's owner
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/graphs/%s/unshare/%s/%s/ -F username=%s -F password=%s ; echo'  % \
-		  (URL, graphid,group_owner,groupid,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/graphs/%s/unshare/%s/%s/' % (_serverURL(url),graphid,group_owner,groupid),fields,[],headers)
 	return cmd
 
-def _constructPublicGraphCommand(graphid,user,password):
+def _constructPublicGraphCommand(graphid,user,password,url=None):
 	"""
-	Construct curl command to make a graph publicly viewable.
+	Construct request to make a graph publicly viewable.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/%s/graph/makeGraphPublic/%s/ -F username=%s -F password=%s; echo' % \
-			(URL,user,graphid,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/%s/graph/makeGraphPublic/%s/' % (_serverURL(url),user,graphid),fields,[],headers)
 	return cmd
 
-def _constructPrivateGraphCommand(graphid,user,password):
+def _constructPrivateGraphCommand(graphid,user,password,url=None):
 	"""
-	Construct curl command to make a graph privately viewable.
+	Construct request to make a graph privately viewable.
 
 	:param graphid: string -- ID of GraphSpace graph
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/users/%s/graph/makeGraphPrivate/%s/ -F username=%s -F password=%s; echo' % \
-			(URL,user,graphid,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/users/%s/graph/makeGraphPrivate/%s/' % (_serverURL(url),user,graphid),fields,[],headers)
 	return cmd
 
-def _constructPublicTagCommand(user,password,tag):
+def _constructPublicTagCommand(user,password,tag,url=None):
 	"""
-	Construct curl command to make all graphs associated with a tag public.
+	Construct request to make all graphs associated with a tag public.
 
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
 	:param tag: string -- tag of graphs to make public
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/tags/user/%s/%s/makePublic/ -F username=%s -F password=%s; echo' % \
-			(URL,user,tag,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/tags/user/%s/%s/makePublic/' % (_serverURL(url),user,tag),fields,[],headers)
 	return cmd
 
-def _constructPrivateTagCommand(user,password,tag):
+def _constructPrivateTagCommand(user,password,tag,url=None):
 	"""
-	Construct curl command to make all graphs associated with a tag private.
+	Construct request to make all graphs associated with a tag private.
 
 	:param user: string -- graph owner username
 	:param password: string -- graph owner password
 	:param tag: string -- tag of graphs to make private
+	:param url: string -- GraphSpace URL.  Default is URL.
 	"""
-	cmd = 'curl -X POST %s/api/tags/user/%s/%s/makePrivate/ -F username=%s -F password=%s; echo' % \
-			(URL,user,tag,user,password)
+	fields,headers = _credentials(user,password,url)
+	cmd = Command('%s/api/tags/user/%s/%s/makePrivate/' % (_serverURL(url),user,tag),fields,[],headers)
 	return cmd
-
-
@@ -3,7 +3,10 @@
 ## utility functions for writing JSON files.
 ## BIO331
 ## Anna Ritz
+import gzip
 import json
+import zlib
+import hashlib
 
 def test():
 	"""
@@ -12,18 +15,200 @@ def test():
 	print('json_utils properly imported!')
 	return
 
-def write_json(data,jsonfile):
+def write_json(data,jsonfile,compress=None):
 	"""
-	Writes the data object as a JSON file.
+	Writes the data object as a JSON file.  If 'compress' is given, the file is
+	gzip-compressed as it is written (use a name ending in '.json.gz').
 
 	:param data: dictionary from make_json_data() function.
 	:param jsonfile: string -- name of JSON file.
+	:param compress: int -- gzip compression level from 1 (fastest) to 9 (smallest).  Optional.
 	"""
 	print('\nWriting JSON for graph to outfile %s' % (jsonfile))
-	json.dump(data,open(jsonfile,'w'),indent=4)
+	if compress:
+		with gzip.open(jsonfile,'wt',compresslevel=compress,encoding='utf8') as f:
+			json.dump(data,f,indent=4)
+	else:
+		with open(jsonfile,'w') as f:
+			json.dump(data,f,indent=4)
 	return
 
-def make_json_data(nodes,edges,node_attributes=None,edge_attributes=None,title="",description="",tags=[],labels=True):
+def dumps_json(data,compress=None):
+	"""
+	Serializes the data object as compact JSON in memory.
+
+	:param data: dictionary from make_json_data() function.
+	:param compress: int -- gzip compression level from 1 (fastest) to 9 (smallest).  Optional.
+	:returns: bytes -- UTF-8 encoded JSON, gzip-compressed if 'compress' is given.
+	"""
+	s = json.dumps(data,separators=(',',':')).encode('utf8')
+	if compress:
+		return gzip.compress(s,compresslevel=compress)
+	return s
+
+def iter_json(data,chunk_size=65536,compress=None):
+	"""
+	Serializes the data object as compact JSON, yielding it in UTF-8 encoded 
+	chunks of roughly 'chunk_size' bytes so the whole payload never has to 
+	be held in memory.
+
+	:param data: dictionary from make_json_data() function.
+	:param chunk_size: int -- approximate size of each chunk.  Default is 65536.
+	:param compress: int -- gzip compression level from 1 (fastest) to 9 (smallest).  Optional.
+	:returns: generator of bytes, gzip-compressed if 'compress' is given.
+	"""
+	chunks = _iter_json_chunks(data,chunk_size)
+	if compress:
+		return gzip_chunks(chunks,compress)
+	return chunks
+
+def gzip_chunks(chunks,compress=6):
+	"""
+	Compresses a stream of bytes chunks into a stream of gzip data.
+
+	:param chunks: iterable of bytes.
+	:param compress: int -- gzip compression level from 1 (fastest) to 9 (smallest).  Default is 6.
+	:returns: generator of bytes in gzip format.
+	"""
+	## wbits=31 writes a gzip header and trailer around the deflate stream.
+	compressor = zlib.compressobj(compress,zlib.DEFLATED,31)
+	for chunk in chunks:
+		out = compressor.compress(chunk)
+		if out:
+			yield out
+	yield compressor.flush()
+
+def gunzip_chunks(chunks):
+	"""
+	Decompresses a stream of gzip data into a stream of bytes chunks.
+
+	:param chunks: iterable of bytes in gzip format.
+	:returns: generator of bytes.
+	"""
+	## wbits=31 expects a gzip header and trailer around the deflate stream.
+	decompressor = zlib.decompressobj(31)
+	for chunk in chunks:
+		out = decompressor.decompress(chunk)
+		if out:
+			yield out
+	out = decompressor.flush()
+	if out:
+		yield out
+
+def _iter_json_chunks(data,chunk_size):
+	buf = []
+	size = 0
+	for s in json.JSONEncoder(separators=(',',':')).iterencode(data):
+		buf.append(s)
+		size += len(s)
+		if size >= chunk_size:
+			yield ''.join(buf).encode('utf8')
+			buf = []
+			size = 0
+	if buf:
+		yield ''.join(buf).encode('utf8')
+
+def compress_styles(data,node_styles,edge_styles,max_classes=64):
+	"""
+	Moves visual attributes that few nodes or edges differ in out of the
+	elements and into a stylesheet of classes, which is much smaller than
+	repeating the same values in every element.  Attributes that have the same
+	value for all nodes (or edges) go into a style for all of them.  The other
+	attributes with few distinct values are combined into classes; each 
+	element refers to its class by a short name in its "classes" entry, and
+	the class gives the values.  Attributes are added to the classes from the
+	fewest distinct values up, as long as there are at most 'max_classes'
+	classes.  The result has the form::
+
+		{
+			"graph": {
+				"nodes": [{"data": {...}, "classes": "n0"}, ...],
+				"edges": [{"data": {...}, "classes": "e0"}, ...]
+			},
+			"style": [
+				{"selector": "node", "style": {"attribute1": "val1", ...}},
+				{"selector": "node.n0", "style": {"attribute2": "val2", ...}},
+				...
+			],
+			"metadata": {...}
+		}
+
+	Only servers that read the "style" stylesheet can show the result (see
+	STYLE_CLASSES_SUPPORTED in graphspace_utils.py).
+
+	:param data: dictionary from make_json_data() function.  It is not changed.
+	:param node_styles: list of node attribute names that may be moved to the stylesheet.
+	:param edge_styles: list of edge attribute names that may be moved to the stylesheet.
+	:param max_classes: int -- largest number of classes for nodes, and for edges.  Default is 64.
+	:returns: dictionary formatted for JSON.
+	"""
+	compressed = dict(data)
+	compressed['graph'] = dict(data['graph'])
+	style = list(data.get('style',[]))
+	for kind,selector,prefix,names in (('nodes','node','n',node_styles),('edges','edge','e',edge_styles)):
+		elements = data['graph'][kind]
+		shared,classed = _styleAttributes(elements,names,max_classes)
+		if shared:
+			style.append({'selector':selector,'style':dict((name,elements[0]['data'][name]) for name in shared)})
+		classes = {}
+		moved = set(shared+classed)
+		new_elements = []
+		for element in elements:
+			new = dict(element)
+			new['data'] = dict((k,v) for k,v in element['data'].items() if k not in moved)
+			if classed:
+				key = tuple(element['data'][name] for name in classed)
+				if key not in classes:
+					classes[key] = prefix+str(len(classes))
+					style.append({'selector':selector+'.'+classes[key],'style':dict(zip(classed,key))})
+				new['classes'] = classes[key]
+			new_elements.append(new)
+		compressed['graph'][kind] = new_elements
+	compressed['style'] = style
+	return compressed
+
+def _styleAttributes(elements,names,max_classes):
+	## splits the attributes that every element has into those with a single
+	## value (shared) and those that are combined into at most max_classes 
+	## classes (classed).  Attributes with unhashable values are left alone.
+	counts = []
+	for name in names:
+		try:
+			values = set(element['data'][name] for element in elements)
+		except (KeyError,TypeError):
+			continue
+		counts.append((len(values),name))
+	counts.sort()
+	shared = [name for count,name in counts if count == 1]
+	classed = []
+	for count,name in counts:
+		if count == 1 or count > max_classes:
+			continue
+		combos = len(set(tuple(element['data'][n] for n in classed+[name]) for element in elements))
+		if combos <= max_classes:
+			classed.append(name)
+	return shared,classed
+
+def hash_json_data(data):
+	"""
+	Computes a content hash of the data object.  The data is normalized before
+	hashing: keys are sorted and nodes and edges are ordered by ID, so two 
+	equivalent graphs have the same hash regardless of the order in which 
+	they were built.
+
+	:param data: dictionary from make_json_data() function.
+	:returns: string -- hex digest of the normalized JSON.
+	"""
+	normalized = dict(data)
+	if 'graph' in data:
+		graph = dict(data['graph'])
+		graph['nodes'] = sorted(graph.get('nodes',[]),key=lambda x: str(x['data'].get('id')))
+		graph['edges'] = sorted(graph.get('edges',[]),key=lambda x: (str(x['data'].get('source')),str(x['data'].get('target'))))
+		normalized['graph'] = graph
+	s = json.dumps(normalized,sort_keys=True,separators=(',',':'))
+	return hashlib.sha1(s.encode('utf8')).hexdigest()
+
+def make_json_data(nodes,edges,node_attributes=None,edge_attributes=None,title="",description="",tags=[],labels=True,positions=None):
 	"""
 	Creates a dictionary that contains the following entries::
 
@@ -55,6 +240,7 @@ def make_json_data(nodes,edges,node_attributes=None,edge_attributes=None,title="
 	:param description: string -- description of graph. Optional.
 	:param tags: list -- list of tag names. Optional.
 	:param labels: boolean -- If True, write node IDs as the text on the node.  Default is True.  Set labels=False to not write the names on the nodes.
+	:param positions: dictionary of node positions. Optional.  The key is a node name and the value is an (x,y) pair in pixels (see layout_utils.py).  Nodes with a position are drawn there instead of being laid out by GraphSpace.
 	:returns: dictionary formatted for JSON.
 	"""
 	data = {}
@@ -82,6 +268,11 @@ def make_json_data(nodes,edges,node_attributes=None,edge_attributes=None,title="
 		## node_element dictionary as the value.
 		node_wrapper = {'data':node_element}
 
+		## a precomputed position goes next to "data", as {"x":x,"y":y}.
+		if positions != None and node_name in positions:
+			x,y = positions[node_name]
+			node_wrapper['position'] = {'x':x,'y':y}
+
 		## append node_wrapper to the list of nodes.
 		data['graph']['nodes'].append(node_wrapper)
 
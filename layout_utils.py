@@ -0,0 +1,338 @@
+#!/usr/bin/python
+
+## utility functions for computing graph layouts.
+## GraphSpace lays out a graph in the browser when it is opened, which takes
+## too long for graphs with more than a few thousand nodes.  The layouts here
+## are computed before uploading instead, and the positions are written into
+## the JSON (see the positions argument of json_utils.make_json_data()).
+##
+## Nodes are given as a list of names and edges as a list of (source,target)
+## pairs, as for make_json_data().  Every layout returns a dictionary that
+## maps each node name to an (x,y) pair in pixels.
+import math
+import heapq
+import collections
+import concurrent.futures
+import numpy
+__docformat__ = 'reStructuredText'
+
+## Pixels per unit of layout distance; the force-directed layout aims for
+## edges of one unit, and the other layouts space nodes one unit apart.
+SCALE=100.0
+
+## The force-directed layout computes all pairwise repulsions exactly for
+## graphs with up to this many nodes, and uses the grid approximation above.
+EXACT_LIMIT=2000
+
+## Largest number of cells on each side of the grid approximation.
+GRID_LIMIT=512
+
+## Pull of every node towards the center, which keeps disconnected parts of
+## the graph from drifting apart in the force-directed layout.
+GRAVITY=0.05
+
+def forceLayout(nodes,edges,iterations=50,seed=0,approximation=None,workers=1,scale=SCALE):
+	"""
+	Computes a force-directed (Fruchterman-Reingold) layout.  Edges pull their
+	nodes together and all nodes push each other apart, and the nodes move a
+	little less at each iteration until they settle.
+
+	With approximation='exact', the push between every pair of nodes is
+	computed, which takes time quadratic in the number of nodes.  With 'grid',
+	the nodes are binned into a grid of about four nodes per cell.  Nodes in
+	the same or neighboring cells push each other as before, and the nodes of
+	farther cells push together from the cell, so each iteration takes close
+	to linear time.  Both are computed with NumPy array operations.
+
+	:param nodes: list of nodes
+	:param edges: list of (source,target) pairs
+	:param iterations: int -- number of iterations.  Default is 50.
+	:param seed: int -- seed for the random starting positions.  Default is 0.
+	:param approximation: string -- 'exact' or 'grid'.  Optional; by default 'exact' for graphs with up to EXACT_LIMIT nodes and 'grid' otherwise.
+	:param workers: int -- number of threads that compute the repulsions.  Default is 1.
+	:param scale: float -- pixels per edge length.  Default is SCALE.
+	:returns: dictionary of node to (x,y).
+	"""
+	index = _nodeIndex(nodes)
+	n = len(index)
+	if n == 0:
+		return {}
+	if approximation == None:
+		approximation = 'exact' if n <= EXACT_LIMIT else 'grid'
+	if approximation not in ['exact','grid']:
+		raise ValueError("approximation must be 'exact' or 'grid', not '%s'" % (approximation))
+	src,tgt = _edgeArrays(edges,index)
+
+	## the ideal edge length is 1, so the nodes start out in a square of area n.
+	side = math.sqrt(n)
+	pos = numpy.random.RandomState(seed).uniform(0,side,(n,2))
+	temperature = side/10.0
+	cooling = temperature/(iterations+1)
+
+	pool = None
+	if workers > 1:
+		pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+	try:
+		for i in range(iterations):
+			if approximation == 'exact':
+				disp = _exactRepulsion(pos,pool)
+			else:
+				disp = _gridRepulsion(pos,pool)
+
+			## attraction along each edge is d^2/k, towards the other end.
+			delta = pos[src]-pos[tgt]
+			force = delta*numpy.sqrt((delta**2).sum(axis=1))[:,None]
+			for axis in range(2):
+				disp[:,axis] += numpy.bincount(tgt,force[:,axis],n)-numpy.bincount(src,force[:,axis],n)
+			disp -= GRAVITY*(pos-pos.mean(axis=0))
+
+			## no node moves further than the current temperature.
+			length = numpy.sqrt((disp**2).sum(axis=1))
+			step = numpy.minimum(length,temperature)/numpy.maximum(length,1e-12)
+			pos += disp*step[:,None]
+			temperature -= cooling
+	finally:
+		if pool != None:
+			pool.shutdown()
+	return _positions(index,pos*scale)
+
+def hierarchicalLayout(nodes,edges,directed=True,sweeps=4,scale=SCALE):
+	"""
+	Computes a layered layout, with the layers stacked from the top of the
+	view down.  In a directed graph every edge points down to a lower layer
+	where possible: each node is placed one layer below the lowest of its
+	predecessors, and a few edges are ignored to break cycles.  In an
+	undirected graph the layer of a node is its distance from the node of
+	highest degree in its connected part.  Nodes are then ordered within their
+	layers by the average position of their neighbors in the layer above and
+	below (the barycenter heuristic), to reduce the number of edge crossings.
+
+	:param nodes: list of nodes
+	:param edges: list of (source,target) pairs
+	:param directed: boolean -- whether edges point from source to target.  Default is True.
+	:param sweeps: int -- number of ordering passes over the layers.  Default is 4.
+	:param scale: float -- pixels between neighboring nodes and layers.  Default is SCALE.
+	:returns: dictionary of node to (x,y).
+	"""
+	index = _nodeIndex(nodes)
+	n = len(index)
+	if n == 0:
+		return {}
+	src,tgt = _edgeArrays(edges,index)
+	if directed:
+		order,layer = _acyclicOrder(n,src,tgt)
+	else:
+		layer = _bfsLayers(n,src,tgt)
+
+	## only edges between neighboring layers take part in the ordering.
+	adjacent = numpy.abs(layer[src]-layer[tgt]) == 1
+	upper = numpy.where(layer[src] < layer[tgt],src,tgt)[adjacent]
+	lower = numpy.where(layer[src] < layer[tgt],tgt,src)[adjacent]
+
+	rank = _rankWithinLayers(layer,numpy.arange(n,dtype=float))
+	for sweep in range(sweeps):
+		## downward sweeps order nodes by their neighbors above, upward sweeps by their neighbors below.
+		if sweep % 2 == 0:
+			node,neighbor = lower,upper
+		else:
+			node,neighbor = upper,lower
+		count = numpy.bincount(node,minlength=n)
+		total = numpy.bincount(node,rank[neighbor],n)
+		barycenter = numpy.where(count > 0,total/numpy.maximum(count,1),rank)
+		rank = _rankWithinLayers(layer,barycenter)
+
+	width = numpy.bincount(layer)
+	x = rank-(width[layer]-1)/2.0
+	return _positions(index,numpy.column_stack([x,layer])*scale)
+
+def circularLayout(nodes,edges=None,directed=False,scale=SCALE):
+	"""
+	Places the nodes evenly around a circle.  In a directed graph the nodes
+	are placed in topological order (as far as cycles allow), so that most
+	edges run clockwise; otherwise they are placed in the order given.
+
+	:param nodes: list of nodes
+	:param edges: list of (source,target) pairs.  Only needed if directed=True.
+	:param directed: boolean -- whether edges point from source to target.  Default is False.
+	:param scale: float -- pixels between neighboring nodes on the circle.  Default is SCALE.
+	:returns: dictionary of node to (x,y).
+	"""
+	index = _nodeIndex(nodes)
+	n = len(index)
+	if n == 0:
+		return {}
+	slot = numpy.arange(n)
+	if directed and edges != None:
+		src,tgt = _edgeArrays(edges,index)
+		order,layer = _acyclicOrder(n,src,tgt)
+		slot[order] = numpy.arange(n)
+	angle = 2*math.pi*slot/n
+	radius = max(n/(2*math.pi),1.0)
+	return _positions(index,numpy.column_stack([numpy.cos(angle),numpy.sin(angle)])*radius*scale)
+
+def _nodeIndex(nodes):
+	## maps each distinct node to a row of the position array.
+	index = collections.OrderedDict()
+	for node in nodes:
+		if node not in index:
+			index[node] = len(index)
+	return index
+
+def _edgeArrays(edges,index):
+	## source and target rows of each edge between two different known nodes.
+	pairs = [(index[s],index[t]) for s,t in edges if s in index and t in index and s != t]
+	if not pairs:
+		return numpy.zeros(0,dtype=numpy.intp),numpy.zeros(0,dtype=numpy.intp)
+	pairs = numpy.array(pairs,dtype=numpy.intp)
+	return pairs[:,0],pairs[:,1]
+
+def _positions(index,pos):
+	## turns an array of positions into a dictionary of node to (x,y).
+	return dict(zip(index.keys(),[tuple(p) for p in pos.tolist()]))
+
+def _map(pool,func,items):
+	## runs func over the items in the thread pool, if there is one.
+	if pool == None:
+		return [func(item) for item in items]
+	return list(pool.map(func,items))
+
+def _exactRepulsion(pos,pool,chunk=512):
+	## repulsion k^2/d between every pair of nodes, away from each other,
+	## computed for blocks of rows at a time to bound the memory used.
+	def block(start):
+		delta = pos[start:start+chunk,None,:]-pos[None,:,:]
+		d2 = (delta**2).sum(axis=2)
+		d2[d2 == 0] = numpy.inf
+		return (delta/d2[:,:,None]).sum(axis=1)
+	return numpy.concatenate(_map(pool,block,range(0,len(pos),chunk)))
+
+def _gridRepulsion(pos,pool):
+	## repulsion k^2/d between every pair of nodes, approximated on a grid of
+	## about four nodes per cell.  Nodes in the same or neighboring cells push
+	## each other exactly: the nodes are sorted by cell, and the pairs in each
+	## cell and with four of its eight neighbors are enumerated with array
+	## operations over the sorted runs of nodes (the pairs with the other four
+	## neighbors are the same pairs the other way around).  Farther nodes push
+	## with the total of their cell from its center, which is a convolution of
+	## the cell counts with the force of a single node, computed with FFTs.
+	n = len(pos)
+	side = max(4,min(GRID_LIMIT,int(math.sqrt(n)/2)))
+	## the grid covers the middle 98% of the nodes on each axis, and the few
+	## outlying nodes are counted in the cells at the border; covering all of
+	## them would put most of the graph in a handful of cells.
+	low,high = numpy.percentile(pos,[1,99],axis=0)
+	width = max((high-low).max()/side,1e-9)
+	ij = numpy.clip(numpy.floor((pos-low)/width).astype(numpy.intp),0,side-1)
+
+	## cells are numbered with a margin around the grid, so that neighbors never wrap around.
+	cellid = (ij[:,0]+1)*(side+2)+ij[:,1]+1
+	order = numpy.argsort(cellid,kind='stable')
+	cells,start,count = numpy.unique(cellid[order],return_index=True,return_counts=True)
+
+	def near(d):
+		neighbor = cellid+d[0]*(side+2)+d[1]
+		found = numpy.minimum(numpy.searchsorted(cells,neighbor),len(cells)-1)
+		found = numpy.where(cells[found] == neighbor,found,-1)
+		m = numpy.where(found >= 0,count[found],0)
+		total = m.sum()
+		disp = numpy.zeros((n,2))
+		if total == 0:
+			return disp
+		i = numpy.repeat(numpy.arange(n),m)
+		first = numpy.repeat(start[found]-(numpy.cumsum(m)-m),m)
+		j = order[first+numpy.arange(total)]
+		delta = pos[i]-pos[j]
+		d2 = (delta**2).sum(axis=1)
+		d2[d2 == 0] = numpy.inf
+		for axis in range(2):
+			disp[:,axis] = numpy.bincount(i,delta[:,axis]/d2,n)
+			if d != (0,0):
+				disp[:,axis] -= numpy.bincount(j,delta[:,axis]/d2,n)
+		return disp
+
+	def far(kernel):
+		mass = numpy.bincount(ij[:,0]*side+ij[:,1],minlength=side*side).reshape(side,side)
+		size = 3*side
+		field = numpy.fft.irfft2(numpy.fft.rfft2(mass,(size,size))*kernel,(size,size))
+		return field[side-1:2*side-1,side-1:2*side-1][ij[:,0],ij[:,1]]/width
+
+	parts = _map(pool,lambda job: job[0](job[1]),[(near,d) for d in [(0,0),(0,1),(1,-1),(1,0),(1,1)]]+[(far,k) for k in _farKernels(side)])
+	disp = sum(parts[:5])
+	disp[:,0] += parts[5]
+	disp[:,1] += parts[6]
+	return disp
+
+_kernels = {}
+def _farKernels(side):
+	## FFTs of the force of a single node in a grid of side x side cells, on
+	## each axis, for cells more than one cell apart and in units of the cell
+	## width.  They only depend on the size of the grid, so they are cached.
+	if side not in _kernels:
+		d = numpy.arange(-side+1,side)
+		dx,dy = numpy.meshgrid(d,d,indexing='ij')
+		r2 = (dx**2+dy**2).astype(float)
+		r2[(numpy.abs(dx) <= 1) & (numpy.abs(dy) <= 1)] = numpy.inf
+		size = 3*side
+		_kernels[side] = [numpy.fft.rfft2(dx/r2,(size,size)),numpy.fft.rfft2(dy/r2,(size,size))]
+	return _kernels[side]
+
+def _acyclicOrder(n,src,tgt):
+	## orders the nodes so that edges point forward where possible, and puts
+	## each node one layer below the lowest of its earlier predecessors.  Nodes
+	## with no unplaced predecessors go first; when only cycles are left, the
+	## node with the fewest unplaced predecessors goes next, which drops the
+	## edges from those predecessors.  Returns the order and the layers.
+	succ_start,succ = _csr(n,src,tgt)
+	waiting = numpy.bincount(tgt,minlength=n).tolist()
+	succ_start = succ_start.tolist()
+	succ = succ.tolist()
+	heap = [(waiting[v],v) for v in range(n)]
+	heapq.heapify(heap)
+	placed = [False]*n
+	layer = [0]*n
+	order = []
+	while heap:
+		w,v = heapq.heappop(heap)
+		if placed[v] or w != waiting[v]:
+			continue
+		placed[v] = True
+		order.append(v)
+		for u in succ[succ_start[v]:succ_start[v+1]]:
+			if not placed[u]:
+				waiting[u] -= 1
+				layer[u] = max(layer[u],layer[v]+1)
+				heapq.heappush(heap,(waiting[u],u))
+	return numpy.array(order,dtype=numpy.intp),numpy.array(layer,dtype=numpy.intp)
+
+def _bfsLayers(n,src,tgt):
+	## distance of each node from the node of highest degree in its connected part.
+	start,neighbors = _csr(n,numpy.concatenate([src,tgt]),numpy.concatenate([tgt,src]))
+	start = start.tolist()
+	neighbors = neighbors.tolist()
+	layer = [-1]*n
+	for root in numpy.argsort(-numpy.diff(start),kind='stable').tolist():
+		if layer[root] >= 0:
+			continue
+		layer[root] = 0
+		queue = collections.deque([root])
+		while queue:
+			v = queue.popleft()
+			for u in neighbors[start[v]:start[v+1]]:
+				if layer[u] < 0:
+					layer[u] = layer[v]+1
+					queue.append(u)
+	return numpy.array(layer,dtype=numpy.intp)
+
+def _csr(n,src,tgt):
+	## compressed adjacency: the successors of v are tgt[perm][start[v]:start[v+1]].
+	perm = numpy.argsort(src,kind='stable')
+	start = numpy.searchsorted(src[perm],numpy.arange(n+1))
+	return start,tgt[perm]
+
+def _rankWithinLayers(layer,key):
+	## position of each node within its layer when the layer is sorted by key.
+	order = numpy.lexsort((key,layer))
+	first = numpy.searchsorted(layer[order],layer[order])
+	rank = numpy.empty(len(layer))
+	rank[order] = numpy.arange(len(layer))-first
+	return rank
@@ -4,20 +4,47 @@
 
 #import statements
 import math
-import numpy
-import json_utils
-import graphspace_utils
-import numpy as np
-import getpass
+import time
+import importlib
+import collections
+
+
+class LazyModule(object):
+    #stands in for a module until one of its attributes is first used, and only then imports it,
+    #so that scripts which only parse() and export() do not pay for numpy or the upload machinery at startup.
+    #once imported, the module takes the place of its stand-in under the given global name.
+    def __init__(self, name, alias):
+        self._name = name
+        self._alias = alias
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module == None:
+            self._module = importlib.import_module(self._name)
+            if globals().get(self._alias) is self:
+                globals()[self._alias] = self._module
+        return getattr(self._module, attr)
+    
+    def __repr__(self):
+        return "<lazily imported module '" + self._name + "'>"
+
+np = LazyModule('numpy', 'np')
+plt = LazyModule('matplotlib.pyplot', 'plt')
+getpass = LazyModule('getpass', 'getpass')
+futures = LazyModule('concurrent.futures', 'futures')
+json_utils = LazyModule('json_utils', 'json_utils')
+layout_utils = LazyModule('layout_utils', 'layout_utils')
+graphspace_utils = LazyModule('graphspace_utils', 'graphspace_utils')
 
 
 
 #User API
 #consists of the following functions: parse()
-#and the following methods of the Graph class: nodeInstall(), edgeInstall(), visualize(), upload(), export(), default(), display(), remove(), nodeGet(), edgeGet()
+#and the following methods of the Graph class: nodeInstall(), edgeInstall(), visualize(), layout(), upload(), export(), default(), display(), remove(), nodeGet(), edgeGet(),
+#scaleByAttr(), style(), topNodes(), neighborhood(), collapse()
 
 
-def parse(edgefile, delimiter='\t', isDirected=False, edgeHeader=None, nodefile=None, nodeHeader=None, nodeDelimiter=None, edgeDelimiter=None):
+def parse(edgefile, delimiter='\t', isDirected=False, edgeHeader=None, nodefile=None, nodeHeader=None, nodeDelimiter=None, edgeDelimiter=None, interactive=True):
     """
     The parse() function compiles data from a text file into a Graph object. 
     The edgefile argument should be supplied with the name of a text file as a string.
@@ -32,6 +59,9 @@ def parse(edgefile, delimiter='\t', isDirected=False, edgeHeader=None, nodefile=
     containing only edges with user-specified delimiter. It can also read in both an edge and a node file with multiple columns of data 
     and headers describing the names of the attributes. The parser also supports a rudimentary typing system which intelligently determines 
     whether numeric values in a data column should be floats or integers, and whether textual data should be boolean, None, or string type.
+    
+    If a header found in a file is not formatted correctly, the parser asks whether to use it anyway. With interactive=False it raises a
+    ValueError instead, so that scripts never wait for input.
     """
     e_formatted = True
     n_formatted = True
@@ -60,7 +90,7 @@ def parse(edgefile, delimiter='\t', isDirected=False, edgeHeader=None, nodefile=
         edge_header = edgeHeader
         e_startline = 0
     else:
-        edge_header = get_header(edgefile, e_delimiter, 'e')
+        edge_header = get_header(edgefile, e_delimiter, 'e', interactive)
         e_startline = 1
 
     
@@ -75,7 +105,7 @@ def parse(edgefile, delimiter='\t', isDirected=False, edgeHeader=None, nodefile=
             node_header = nodeHeader
             n_startline = 0
         else:
-            node_header = get_header(nodefile, n_delimiter, 'n')
+            node_header = get_header(nodefile, n_delimiter, 'n', interactive)
             n_startline = 1        
         nodes = handle_nodefile(nodefile, node_header, n_delimiter, n_startline)
     
@@ -159,12 +189,37 @@ class Graph:
             self.edge_visualize(attrName)
 
 
-    def upload(self):
+    def layout(self, method='force', iterations=50, seed=0, workers=1):
+        """
+        Computes positions for the nodes, so that GraphSpace can show the graph right away instead of laying it out in the browser.
+        
+        The layout() Graph method places the nodes with one of the layouts in layout_utils: 'force' (force-directed, approximated on a 
+        grid for large graphs), 'hierarchical' (layers that edges point down through in a directed graph), or 'circular'. The positions 
+        are installed as the data attributes 'layout_x' and 'layout_y', so they are kept by export() and parse(), and upload() sends 
+        them along with the graph. The iterations and seed arguments tune the force-directed layout, and workers sets how many threads 
+        compute it. To go back to letting GraphSpace lay out the graph, remove('layout_x') and remove('layout_y').
+        """
+        IDs = [n.get('ID') for n in self.nodes]
+        edges = [(e.get('source'), e.get('target')) for e in self.edges]
+        if method == 'force':
+            positions = layout_utils.forceLayout(IDs, edges, iterations=iterations, seed=seed, workers=workers)
+        elif method == 'hierarchical':
+            positions = layout_utils.hierarchicalLayout(IDs, edges, directed=self.isDirected)
+        elif method == 'circular':
+            positions = layout_utils.circularLayout(IDs, edges, directed=self.isDirected)
+        else:
+            raise NameError("Unknown layout '" + str(method) + "'. Please enter one of the following: \nforce \thierarchical \tcircular")
+        self.installNodeAttr(LAYOUT_ATTRS[0], dict((ID, positions[ID][0]) for ID in IDs))
+        self.installNodeAttr(LAYOUT_ATTRS[1], dict((ID, positions[ID][1]) for ID in IDs))
+
+
+    def upload(self, force=False):
         """
         Uploads the graph in its present state to GraphSpace. Takes you through a rudimentary UI that asks you for your
         GS username, password, and information about the graph.
+        Graphs that have not changed since they were last uploaded are skipped unless force=True.
         """
-        self.uploadGraph() 
+        self.uploadGraph(force=force)
         
 
     def export(self, edgefile=None, nodefile=None, delimiter='\t'):
@@ -326,6 +381,148 @@ class Graph:
         """
         return self.getEdgeAttr(attrName)
 
+    def scaleByAttr(self, attrName, GS_attrs, low, high, n_or_e='n', norm='linear'):
+        """
+        Sets one or more numeric visual attributes (e.g. 'width', or ['height', 'width']) from a data attribute without any prompts.
+        
+        The scaleByAttr() Graph method normalizes the data attribute (see normalize() for the schemes given by norm) and maps it linearly 
+        so that the smallest value gets low and the largest gets high; with low greater than high, larger values get smaller visual 
+        values. Elements with no numeric value get None, and so the default visual attribute. n_or_e is 'n' for node attributes and 'e' 
+        for edge attributes. scaleBySize(), scaleEdgeWidth() and scaleBlacken() all go through this method, which works on whole arrays 
+        of values at once.
+        """
+        if type(GS_attrs) == str:
+            GS_attrs = [GS_attrs]
+        stats = self.attrStats(attrName, n_or_e)
+        self.installValues(GS_attrs, column_values(scaled_column(stats, low, high, norm)), n_or_e)
+
+    def style(self, mappings, workers=4):
+        """
+        Applies a list of visual mappings at once, without any prompts, computing independent mappings in parallel.
+        
+        Each mapping is a dictionary with the data attribute ('attr') and the GraphSpace visual attribute ('visual') it is shown by, and 
+        'on': 'e' for edge attributes (nodes by default). The rest depends on the visual attribute:
+            colors (e.g. 'background_color', 'line_color'): 'colors', a list of two or more RGB vectors, makes a gradient (see 
+                scaleGradient()); otherwise the attribute is discrete and each group gets an automatic color, or the color given for it 
+                in 'groups' (a dictionary of group to RGB vector or color string).
+            'shape', 'line_style', 'border_style': discrete, with automatic values or the values given in 'groups'.
+            'background_blacken': 'mode' and 'lower' as in scaleBlacken().
+            'size' (height and width of nodes) and other numbers: 'low' and 'high', the values for the smallest and largest data values.
+        Continuous mappings take a normalization scheme as 'norm' (see normalize()), and discrete mappings an 'order' (see factorize()).
+        For example:
+            g.style([{'attr': 'Random 0-50', 'visual': 'background_color', 'colors': [[255,0,0], [0,0,255]]},
+                     {'attr': 'Team', 'visual': 'shape'},
+                     {'attr': 'weight', 'visual': 'width', 'on': 'e', 'low': 2, 'high': 10, 'norm': 'log'}])
+        
+        Each data attribute is read from the Graph once, however many mappings use it. The mappings are then computed by up to workers 
+        threads; their kernels only do NumPy array work, which runs without holding the interpreter lock, so they run side by side on 
+        several cores. The values of every mapping are computed before any of them is installed, so if any mapping fails the Graph is 
+        left as it was. The results are then installed in one pass over the nodes and one over the edges, in the order given: a later 
+        mapping to the same visual attribute wins, as with separate calls.
+        """
+        jobs = [self.mappingJob(m) for m in mappings]
+        if workers > 1 and len(jobs) > 1:
+            with futures.ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(lambda job: job[2](*job[3]), jobs))
+        else:
+            results = [func(*args) for GS_attrs, n_or_e, func, args in jobs]
+        
+        #turning the arrays into Python values needs the interpreter lock, so it is done here rather than in the threads
+        columns = {'n': [], 'e': []}
+        for (GS_attrs, n_or_e, func, args), column in zip(jobs, results):
+            columns[n_or_e].append((GS_attrs, column_values(column)))
+        for n_or_e in ['n', 'e']:
+            if columns[n_or_e]:
+                self.installColumns(columns[n_or_e], n_or_e)
+
+    def topNodes(self, attrName, k, hops=0):
+        """
+        Returns a new Graph with only the k nodes with the largest values of the given node attribute, and the edges between them.
+        
+        The topNodes(), neighborhood() and collapse() Graph methods reduce a graph that is too large for GraphSpace to show into a smaller 
+        one, e.g. g.topNodes('Node Degree', 500).uploadGraph(). The new Graph has copies of the kept nodes and edges, with all of their data 
+        and visual attributes, and the same default visual attributes, so it looks the same as the part of the original it was taken from. 
+        Nodes without a numeric value for the attribute are never among the top nodes. With hops greater than 0, the nodes up to that many 
+        edges away from the top nodes are kept as well (see neighborhood()). The original Graph is left unchanged.
+        """
+        stats = self.attrStats(attrName, 'n')
+        values = np.where(np.isnan(stats['values']), -np.inf, stats['values'])
+        if k < len(values):
+            top = np.argpartition(-values, k - 1)[:k]
+        else:
+            top = np.arange(len(values))
+        top = top[values[top] > -np.inf]
+        seeds = [stats['IDs'][i] for i in top.tolist()]
+        return self.subgraph(self.hopIDs(seeds, hops))
+
+    def neighborhood(self, seeds, hops=1):
+        """
+        Returns a new Graph with only the given seed nodes, the nodes up to hops edges away from them (in either direction), and the edges between them.
+        
+        seeds is a list of node IDs. See topNodes() for how the new Graph relates to the original.
+        """
+        return self.subgraph(self.hopIDs(seeds, hops))
+
+    def collapse(self, attrName, weight=None):
+        """
+        Returns a new Graph in which the nodes of each group of the given discrete node attribute are merged into a single node.
+        
+        The collapse() Graph method makes a node for each value of the attribute (see discretizeAttr()), whose ID is the attribute name 
+        and the value joined by a colon (e.g. 'Team:red'), so that it cannot be mistaken for one of the original nodes, and which has 
+        a 'members' attribute with the number of nodes merged into it. Nodes whose value is None are kept as they are; if one of them 
+        already has the ID of a merged node, a ValueError is raised. The merged node keeps the value as its attribute, and every other 
+        attribute of the merged node is the average of its members' values if they are numbers, and otherwise the most common value 
+        among them, so the merged node takes the most common color or shape of its group. The edges between two groups are merged into 
+        a single edge the same way, with an 'edges' attribute with the number of edges merged into it, and the sum of their values of 
+        the edge attribute named by weight, if one is given. Edges within a group are dropped. See topNodes() for how the new Graph 
+        relates to the original.
+        """
+        attr_dict, group_dict = self.discretizeAttr(attrName)
+        node_by_ID = dict((n.get('ID'), n) for n in self.nodes)
+        
+        kept = set(group_dict.get(None, []))
+        owner = {}
+        nodes = []
+        for g in group_dict:
+            if g == None:
+                for ID in group_dict[g]:
+                    owner[ID] = ID
+                    nodes.append(node_by_ID[ID].copy())
+                continue
+            group_ID = str(attrName) + ':' + str(g)
+            if group_ID in kept:
+                raise ValueError("Cannot collapse by '" + str(attrName) + "': the node for group " + str(g) + " would have the ID " + group_ID + ", which a node without a group already has.")
+            for ID in group_dict[g]:
+                owner[ID] = group_ID
+            new = merge_elements(Node(group_ID), [node_by_ID[ID] for ID in group_dict[g]])
+            new.newAttr('members')
+            new.put('members', len(group_dict[g]))
+            nodes.append(new)
+        
+        edge_groups = collections.OrderedDict()
+        for e in self.edges:
+            s = owner[e.get('source')]
+            t = owner[e.get('target')]
+            if s == t:
+                continue
+            if not self.isDirected and str(s) < str(t):
+                #same order as the Edge constructor uses for undirected edges
+                s, t = t, s
+            if (s, t) not in edge_groups:
+                edge_groups[(s, t)] = []
+            edge_groups[(s, t)].append(e)
+        
+        edges = []
+        for (s, t), members in edge_groups.items():
+            new = merge_elements(Edge(s, t, self.isDirected), members)
+            if weight != None:
+                new.newAttr(weight)
+                new.put(weight, sum(e.get(weight) for e in members if type(e.get(weight)) in [int, float]))
+            new.newAttr('edges')
+            new.put('edges', len(members))
+            edges.append(new)
+        return self.reducedGraph(nodes, edges)
+
 
 
 
@@ -371,25 +568,14 @@ class Graph:
             color2 = parse_RGB_input('Gradient Color 2 (input as an RGB vector e.g. [0,255,0]): ')
             self.scaleGradient(attrName, color1, color2, GS_attr, n_or_e='e')
 
-    def scaleEdgeWidth(self, attrName):
+    def scaleEdgeWidth(self, attrName, max_size=None, min_size=2, norm='linear'):
         #handles when you want to scale your attribute by edge width
-        max_size = int(input("Maximum edge width: "))
-        min_size = 2
-        normDict = self.normEdgeAttr(attrName)
+        #the maximum width is asked for if it is not given; norm is the normalization scheme, see normalize()
+        if max_size == None:
+            max_size = int(input("Maximum edge width: "))
         if max_size < min_size:
             max_size = min_size
-        
-        diff = max_size - min_size
-        
-        size_dict = {}
-        
-        for e in normDict:
-            if math.isnan(normDict[e]):
-                size_dict[e] = None
-            else:
-                size_dict[e] = min_size + diff*normDict[e] 
-        self.installEdgeAttr('__width__',size_dict)
-        self.GSedgeAttrInstall('width')
+        self.scaleByAttr(attrName, 'width', min_size, max_size, n_or_e='e', norm=norm)
             
     def edge_d(self, attrName):
         #handles when the given edge data attribute is discrete
@@ -397,21 +583,17 @@ class Graph:
         if GS_attr == 'line_color':
             self.discrete_color(attrName, 'line_color', 'e')
         elif GS_attr == 'line_style':
-            attr_dict, group_dict = self.discretizeAttr(attrName,n_or_e='e')
-            GS_dict = {}
-            for g in group_dict:
-                if g == None:
-                    continue
+            codes, categories = self.factorizeAttr(attrName, 'e')
+            table = []
+            for g in categories:
                 style = input("Line style for group '" + str(g) + "' (choose from [solid, dotted, dashed]) (enter 'quit' to cancel): ")
                 if style == 'quit':
                     return
                 if style not in ['solid', 'dotted', 'dashed']:
                     raise NameError("Please choose from one of the styles on the list.")
-                for e in group_dict[g]:
-                    GS_dict[e] = style 
+                table.append(style)
                     
-            self.installEdgeAttr('__line_style__', GS_dict)
-            self.GSedgeAttrInstall('line_style')
+            self.installByCodes('line_style', codes, table, 'e')
         else:
             raise NameError("The GraphSpace attribute you entered was not recognized. Please enter one of the following: \nline_color \tline_style \t shape")
     
@@ -437,89 +619,50 @@ class Graph:
             self.scaleBlacken(attrName)
             
 
-    def scaleGradient(self, attrName, color1, color2, GS_attr, n_or_e='n', loud=False):
+    def scaleGradient(self, attrName, color1, color2, GS_attr, n_or_e='n', loud=False, via=None, norm='linear'):
         #normalizes a data attribute, installs colors according to a gradient for that data attribute
-        color_dict = {}
-        working_group = self.check_nore(n_or_e)
-        
-        normDict = self.normByAttr(attrName, n_or_e, loud)
-        
-        for x in working_group:
-            color_dict[x.get('ID',loud)] = getGColor(color1,color2,normDict[x.get('ID',loud)])
-        
-        if n_or_e == 'n':
-            if '__' + GS_attr + '__' not in self.node_dir:
-                self.installNodeAttr('__' + GS_attr + '__', color_dict, loud)
-            else:
-                self.putNodeAttrs('__' + GS_attr + '__', color_dict, loud)
-            self.GSnodeAttrInstall(GS_attr, loud)
-        
-        elif n_or_e == 'e':
-            if '__' + GS_attr + '__' not in self.edge_dir:
-                self.installEdgeAttr('__' + GS_attr + '__', color_dict, loud)
-            else:
-                self.putEdgeAttrs('__' + GS_attr + '__', color_dict, loud)
-            self.GSedgeAttrInstall(GS_attr, loud)
+        #via is an optional list of RGB vectors the gradient passes through on its way from color1 to color2
+        #norm is the normalization scheme, see normalize()
+        stats = self.attrStats(attrName, n_or_e)
+        colors = [color1] + list(via or []) + [color2]
+        self.installValues([GS_attr], column_values(gradient_column(stats, colors, norm)), n_or_e)
 
     
-    def scaleBlacken(self, attrName):
+    def scaleBlacken(self, attrName, mode=None, lower=None, norm='linear'):
         #normalizes a data attribute, installs background_blacken according to the normalized values
-        b_w_both = restricted_input("Would you like to blacken, whiten, or both? Please enter one of the following: \nblacken\twhiten\tboth\n>>> ",['blacken','whiten','both']).lower()
-        if b_w_both not in ['blacken','whiten','both']:
+        #mode is 'blacken', 'whiten' or 'both'. lower says what happens to lower values of the attribute: 'more' or 'less' black or white
+        #for blacken and whiten, and 'black' or 'white' for both. Whatever is not given is asked for. See BLACKEN_RANGES.
+        #norm is the normalization scheme, see normalize()
+        if mode == None:
+            mode = restricted_input("Would you like to blacken, whiten, or both? Please enter one of the following: \nblacken\twhiten\tboth\n>>> ",['blacken','whiten','both']).lower()
+        if mode not in ['blacken','whiten','both']:
             raise NameError("Please enter blacken, whiten, or both.")
         
-        normDict = self.normByAttr(attrName, 'n')
-        
-        
-        if b_w_both == 'blacken':
-            i = restricted_input("Should lower values for attribute " + str(attrName) + " be more black or less black? Please input: \n1 for more black\t2 for less black\n>>> ",['1','2'])
-            if i == 1:
-                for k in normDict:
-                    normDict[k] = (normDict[k] - 1) * -1
-            else:
-                #then the normalized dictionary in its current form is appropriate, so do nothing
-                pass
-                
-            
-        elif b_w_both == 'whiten':
-            i = restricted_input("Should lower values for attribute " + str(attrName) + " be more white or less white? Please input: \n1 for more white\t2 for less white\n>>> ",['1','2'])
-            if i == 1:
-                for k in normDict:
-                    normDict[k] = normDict[k] - 1
-            else:
-                for k in normDict:
-                    normDict[k] = normDict[k] * -1
-            
-        elif b_w_both == 'both':
-            i = restricted_input("Should lower values for attribute " + str(attrName) + " be black or white? Please input one of the following:\nblack\t\white\n>>> ",['black','white'])
-            if i == 'white':
-                for k in normDict:
-                    normDict[k] = (normDict[k] - 0.5) * 2
+        if lower == None:
+            if mode == 'blacken':
+                i = restricted_input("Should lower values for attribute " + str(attrName) + " be more black or less black? Please input: \n1 for more black\t2 for less black\n>>> ",['1','2'])
+                lower = ['more','less'][int(i) - 1]
+            elif mode == 'whiten':
+                i = restricted_input("Should lower values for attribute " + str(attrName) + " be more white or less white? Please input: \n1 for more white\t2 for less white\n>>> ",['1','2'])
+                lower = ['more','less'][int(i) - 1]
             else:
-                for k in normDict:
-                    normDict[k] = ((normDict[k] * -1) + 0.5) * 2
+                lower = restricted_input("Should lower values for attribute " + str(attrName) + " be black or white? Please input one of the following:\nblack\twhite\n>>> ",['black','white'])
+        if (mode, lower) not in BLACKEN_RANGES:
+            raise NameError("Lower values can be 'more' or 'less' black or white for blacken and whiten, and 'black' or 'white' for both.")
         
-        self.installNodeAttr('__background_blacken__', normDict)
-        self.GSnodeAttrInstall('background_blacken')
+        low, high = BLACKEN_RANGES[(mode, lower)]
+        self.scaleByAttr(attrName, 'background_blacken', low, high, norm=norm)
         
         
             
-    def scaleBySize(self, attrName):
+    def scaleBySize(self, attrName, max_size=None, min_size=None, norm='linear'):
         #normalizes a data attribute, scales node size according to the attribute
-        max_size = int(input("Maximum node size: "))
-        min_size = int(input("Minimum node size: "))
-        diff = max_size - min_size
-        norm_dict = self.normNodeAttr(attrName)
-        
-        size_dict = {}
-        
-        for n in norm_dict:
-            size_dict[n] = min_size + (diff * norm_dict[n])
-        
-        self.installNodeAttr('__height__', size_dict)
-        self.installNodeAttr('__width__', size_dict)
-        self.GSnodeAttrInstall('height')
-        self.GSnodeAttrInstall('width')    
+        #sizes that are not given are asked for; norm is the normalization scheme, see normalize()
+        if max_size == None:
+            max_size = int(input("Maximum node size: "))
+        if min_size == None:
+            min_size = int(input("Minimum node size: "))
+        self.scaleByAttr(attrName, ['height', 'width'], min_size, max_size, norm=norm)
     
     
     #discrete
@@ -535,75 +678,152 @@ class Graph:
             raise NameError("The GraphSpace attribute you entered was not recognized. Please enter one of the following: \nbackground_color \tborder_color \t shape")    
     
     
-    def discrete_color(self, attrName, GS_attr, n_or_e='n'):
+    def discrete_color(self, attrName, GS_attr, n_or_e='n', m_or_a=None, order='sorted'):
         #colors according to discrete data
         #if automatic, it picks colors from a precompiled list of colors
         #if manual, the user picks colors for each group
-        m_or_a = input("Manual or Automatic color picking scheme: ")
-        working_group = self.check_nore(n_or_e)
-        
-        disc_dict, group_dict = self.discretizeAttr(attrName,n_or_e)
-        GS_dict = {}
+        #groups are numbered in the given order (see factorize()), so automatic colors stay the same from one session to the next
+        if m_or_a == None:
+            m_or_a = input("Manual or Automatic color picking scheme: ")
+        codes, categories = self.factorizeAttr(attrName, n_or_e, order)
         
         if m_or_a.lower() == 'automatic':
-            for x in working_group:
-                GS_dict[x.get('ID')] = discrete_coloring(disc_dict[x.get('ID')])
+            if len(categories) > len(color_ls):
+                raise ValueError("Too many discrete groups to visualize by color (there are " + str(len(color_ls)) + " precomputed colors)")
+            table = color_ls[:len(categories)]
         
         elif m_or_a.lower() == 'manual':
-            for g in group_dict:
-                if g == None:
-                    continue
+            table = []
+            for g in categories:
                 color = parse_RGB_input("Color for group \'" + str(g) + "\' (RGB vector e.g. [255,0,0]) (type 'quit' to cancel): ")
                 if color == 'quit':
                     return
-                for x in group_dict[g]:
-                    GS_dict[x] = vector_to_RGB(color)
+                table.append(vector_to_RGB(color))
         
         else:
             raise NameError("Please enter either manual or automatic.")
         
-        if n_or_e == 'n':
-            self.installNodeAttr('__'+GS_attr+'__', GS_dict)
-            self.GSnodeAttrInstall(GS_attr)
-        elif n_or_e == 'e':
-            self.installEdgeAttr('__'+GS_attr+'__', GS_dict)
-            self.GSedgeAttrInstall(GS_attr)
+        self.installByCodes(GS_attr, codes, table, n_or_e)
     
-    def discrete_shape(self, attrName):
+    def discrete_shape(self, attrName, m_or_a=None, order='sorted'):
         #gives nodes shapes according to discrete data groups
-        m_or_a = input("Manual or Automatic shape picking: ")
-        
-        attr_dict, group_dict = self.discretizeAttr(attrName)
-        GS_dict = {}
+        if m_or_a == None:
+            m_or_a = input("Manual or Automatic shape picking: ")
+        codes, categories = self.factorizeAttr(attrName, 'n', order)
         
         if m_or_a.lower() == 'automatic':
-            for n in self.nodes:
-                GS_dict[n.get('ID')] = pick_shape(attr_dict[n.get('ID')])
+            if len(categories) > len(shape_ls):
+                raise ValueError("Too many discrete groups to visualize by shape (GraphSpace has 12 unique node shapes)")
+            table = shape_ls[:len(categories)]
         
         elif m_or_a.lower() == 'manual':
-            for g in group_dict:
-                if g == None:
-                    continue
+            table = []
+            for g in categories:
                 shape = input("Shape for group '" + str(g) + "' (choose from " + str(shape_ls) + ") (enter 'quit' to cancel): ")
                 if shape == 'quit':
                     return
                 if shape not in shape_ls:
                     raise NameError("Please choose from one of the shapes on the list.")
-                for n in group_dict[g]:
-                    GS_dict[n] = shape
+                table.append(shape)
         else:
             raise NameError("Please enter either manual or automatic.")
         
-        self.installNodeAttr('__shape__', GS_dict)
-        self.GSnodeAttrInstall('shape')
-
-
+        self.installByCodes('shape', codes, table)
+    
+    def installByCodes(self, GS_attr, codes, table, n_or_e='n'):
+        #installs the visual attribute table[code] for each node (or edge), where codes are group numbers from factorizeAttr()
+        self.installValues([GS_attr], column_values(coded_column(codes, table)), n_or_e)
+
+
+    #######
+    #style#
+    #######
+    def mappingJob(self, m):
+        #turns a mapping for style() into (GS_attrs, n_or_e, func, args), where func(*args) computes the column to install (see column_values())
+        #the data is read from the Graph here, so that func only does array work and can run in any thread
+        attrName = m['attr']
+        GS_attr = m['visual']
+        n_or_e = m.get('on', 'n')
+        self.check_nore(n_or_e)
+        
+        if GS_attr.endswith('color') and 'colors' in m:
+            return ([GS_attr], n_or_e, gradient_column, (self.attrStats(attrName, n_or_e), m['colors'], m.get('norm', 'linear')))
+        
+        elif GS_attr.endswith('color') or GS_attr in DISCRETE_VALUES:
+            codes, categories = self.factorizeAttr(attrName, n_or_e, m.get('order', 'sorted'))
+            if 'groups' in m:
+                table = [m['groups'].get(g) for g in categories]
+                if GS_attr.endswith('color'):
+                    table = [vector_to_RGB(c) if type(c) in [list, tuple] else c for c in table]
+            else:
+                choices = color_ls if GS_attr.endswith('color') else DISCRETE_VALUES[GS_attr]
+                if len(categories) > len(choices):
+                    raise ValueError("Too many discrete groups in '" + str(attrName) + "' to visualize by " + GS_attr + " (there are " + str(len(choices)) + " to choose from).")
+                table = choices[:len(categories)]
+            return ([GS_attr], n_or_e, coded_column, (codes, table))
+        
+        if GS_attr == 'background_blacken' and 'low' not in m:
+            if (m.get('mode'), m.get('lower')) not in BLACKEN_RANGES:
+                raise NameError("A background_blacken mapping needs a 'mode' and 'lower' from " + str(list(BLACKEN_RANGES)) + ".")
+            low, high = BLACKEN_RANGES[(m['mode'], m['lower'])]
+        elif 'low' in m and 'high' in m:
+            low, high = m['low'], m['high']
+        else:
+            raise NameError("A mapping of '" + str(attrName) + "' to " + GS_attr + " needs 'low' and 'high' values.")
+        GS_attrs = ['height', 'width'] if GS_attr == 'size' and n_or_e == 'n' else [GS_attr]
+        return (GS_attrs, n_or_e, scaled_column, (self.attrStats(attrName, n_or_e), low, high, m.get('norm', 'linear')))
+    
+    
     ########
     #upload#
     ########
     #uploadGraph can be found in GRAPHSPACE METHODS
     
     
+    ###################################
+    #topNodes, neighborhood & collapse#
+    ###################################
+    def hopIDs(self, seeds, hops):
+        #returns the set of IDs of the seed nodes and of the nodes up to hops edges away from them, in either direction
+        if hops == 0:
+            return set(seeds)
+        adj = {}
+        for n in self.nodes:
+            adj[n.get('ID')] = []
+        for e in self.edges:
+            adj[e.get('source')].append(e.get('target'))
+            adj[e.get('target')].append(e.get('source'))
+        
+        found = set(ID for ID in seeds if ID in adj)
+        frontier = list(found)
+        for i in range(hops):
+            next_frontier = []
+            for ID in frontier:
+                for other in adj[ID]:
+                    if other not in found:
+                        found.add(other)
+                        next_frontier.append(other)
+            frontier = next_frontier
+        return found
+    
+    def subgraph(self, IDs):
+        #returns a new Graph with copies of the given nodes and of the edges between them
+        keep = set(IDs)
+        nodes = [n.copy() for n in self.nodes if n.get('ID') in keep]
+        if not nodes:
+            raise NameError("None of the nodes to keep were found in the Graph, so the reduced graph would be empty.")
+        edges = [e.copy() for e in self.edges if e.get('source') in keep and e.get('target') in keep]
+        return self.reducedGraph(nodes, edges)
+    
+    def reducedGraph(self, nodes, edges):
+        #wraps nodes and edges taken from this Graph in a new Graph with the same default visual attributes
+        #the visual attributes of the nodes and edges are picked up from their '__GS_attr__' data attributes by the Graph constructor
+        reduced = Graph(nodes, edges, self.isDirected)
+        reduced.GSnodeDefaults = dict(self.GSnodeDefaults)
+        reduced.GSedgeDefaults = dict(self.GSedgeDefaults)
+        return reduced
+    
+    
     ########
     #export#
     ########
@@ -664,10 +884,12 @@ class Graph:
         if attrName not in (self.node_dir | self.edge_dir):
             raise NameError("The given attribute '" + str(attrName) + "' was not found in the Graph directory.")
         elif n_or_e == 'n':
+            self.forgetStats(attrName, n_or_e)
             self.node_dir = self.node_dir - set([attrName])
             for n in self.nodes:
                 n.delete(attrName)
         elif n_or_e == 'e':
+            self.forgetStats(attrName, n_or_e)
             self.edge_dir = self.edge_dir - set([attrName])
             for e in self.edges:
                 e.delete(attrName)
@@ -692,6 +914,7 @@ class Graph:
         self.isDirected = isDirected
         
         self.init_dirs()
+        self.statsCache = {}
         
         self.GSnodeAttrs = self.initGSnodeAttrs()
         self.GSedgeAttrs = self.initGSedgeAttrs()
@@ -712,7 +935,11 @@ class Graph:
         
 
     def init_dirs(self):
-        self.edge_dir = set(dir(self.edges[0]))
+        #a graph reduced by topNodes() or neighborhood() may have no edges left
+        if self.edges:
+            self.edge_dir = set(dir(self.edges[0]))
+        else:
+            self.edge_dir = set(['source', 'target', 'ID'])
         self.node_dir = set(dir(self.nodes[0]))
 
     def init_GS_dirs(self):
@@ -786,6 +1013,7 @@ class Graph:
         else:
             raise NameError('n_or_e must be either \'n\' for nodes or \'e\' for edges.')
         
+        self.forgetStats(attrName, n_or_e)
         for x in working_group:
             try:
                 x.put(attrName, attrDict[x.get('ID')])
@@ -824,85 +1052,80 @@ class Graph:
     #UTILITY METHODS#########################################
     #########################################################        
     
-    def normNodeAttr(self,attrName,loud=False):
+    def normNodeAttr(self,attrName,loud=False,scheme='linear'):
         #normalizes the values for the given node attribute and returns the normalized values as a dictionary
-        return self.normByAttr(attrName, 'n', loud)
+        return self.normByAttr(attrName, 'n', loud, scheme)
 
-    def normEdgeAttr(self,attrName,loud=False):
+    def normEdgeAttr(self,attrName,loud=False,scheme='linear'):
         #normalizes the values for the given edge attribute and returns the normalized values as a dictionary
-        return self.normByAttr(attrName, 'e', loud)
+        return self.normByAttr(attrName, 'e', loud, scheme)
         
-    def normByAttr(self, attrName, n_or_e='n', loud=False):
+    def normByAttr(self, attrName, n_or_e='n', loud=False, scheme='linear'):
         #normalizes the values for the given attribute and returns the normalized values as a dictionary
-        d = {}
-        working_group = self.check_nore(n_or_e)
-        
-        for x in working_group:
-            d[x.get('ID')] = float('nan')
-        
-        all_bools = True
-        for x in working_group:
-            if x.get(attrName) not in [True, False, None]:
-                all_bools = False
-        if all_bools:
-            for x in working_group:
-                if x.get(attrName) == True:
-                    d[x.get('ID')] = 1
-                elif x.get(attrName) == False:
-                    d[x.get('ID')] = 0
-                else:
-                    d[x.get('ID')] = float('nan')
-                
-                    
-        
-        def key_func(x):
-            if type(x.get(attrName)) not in [float, int]:
-                return float('nan')
-            else:
-                return x.get(attrName)
-        
-        nums = [key_func(x) for x in working_group]
-        
-        biggest = numpy.nanmax(nums)
-        smallest = numpy.nanmin(nums)
+        #scheme picks the normalization, one of NORM_SCHEMES (see normalize()); missing and non-numeric values normalize to NaN
+        stats = self.attrStats(attrName, n_or_e)
+        return dict(zip(stats['IDs'], normalize(stats['values'], scheme, stats).tolist()))
+    
+    def attrStats(self, attrName, n_or_e='n'):
+        #returns the values of the given attribute as a float array along with summary statistics used by the normalization schemes
+        #the statistics are cached until a value of the attribute is put() or deleted in any node or edge (see attr_versions),
+        #so styling an attribute several times only summarizes it once
+        key = (n_or_e, attrName)
+        version = attr_versions.get(attrName, 0)
+        if key in self.statsCache and self.statsCache[key]['version'] == version:
+            return self.statsCache[key]
         
-        def normalizer(v, my_max, my_min):
-            if check_float(v):
-                norm = (v - my_min) / float(my_max - my_min)
-            else:
-                norm = float('nan')
-            return norm
+        working_group = self.check_nore(n_or_e)
+        IDs = [x.get('ID') for x in working_group]
+        raw = [x.get(attrName) for x in working_group]
         
-        for x in working_group:
-            if x.get(attrName,loud) != None:
-                d[x.get('ID')] = normalizer(x.get(attrName), biggest, smallest)
+        #attributes made only of booleans normalize to 1 for True and 0 for False
+        #otherwise only ints and floats count as numbers
+        if all(type(v) == bool or v == None for v in raw):
+            numeric = (bool,)
+        else:
+            numeric = (int, float)
+        values = np.fromiter((v if type(v) in numeric else float('nan') for v in raw), dtype=float, count=len(raw))
         
-        return d
+        stats = summarize_values(values)
+        stats['IDs'] = IDs
+        stats['values'] = values
+        stats['version'] = version
+        self.statsCache[key] = stats
+        return stats
+    
+    def forgetStats(self, attrName, n_or_e):
+        #drops the cached statistics of an attribute that is about to change
+        self.statsCache.pop((n_or_e, attrName), None)
 
     
-    def discretizeAttr(self, attrName, n_or_e='n'):
+    def discretizeAttr(self, attrName, n_or_e='n', order='sorted'):
         #counts how many discrete groups are in the given data attribute
         #returns an attr_dict whose keys are either nodes or edges and whose values are group numbers
         #also returns a group_dict, whose keys are group names and whose values are lists of nodes or edge IDs which are in that group.
-        working_group = self.check_nore(n_or_e)
-        group_dict = {} #keys are categories, values are lists of nodes
-        attr_dict = {} #keys are nodes, values are categories
-        for x in working_group:
-            current = x.get(attrName)
-            if current not in group_dict:
-                group_dict[current] = [x.get('ID')]
+        #elements whose value is None are in group None, which has no number. See factorizeAttr() for the numbering.
+        codes, categories = self.factorizeAttr(attrName, n_or_e, order)
+        IDs = [x.get('ID') for x in self.check_nore(n_or_e)]
+        
+        group_dict = collections.OrderedDict((g, []) for g in categories)
+        if (codes < 0).any():
+            group_dict[None] = []
+        attr_dict = {}
+        for ID, code in zip(IDs, codes.tolist()):
+            if code < 0:
+                attr_dict[ID] = None
+                group_dict[None].append(ID)
             else:
-                group_dict[current].append(x.get('ID'))
-        i = 0
-        for g in group_dict:
-            if g == None:
-                for x in group_dict[g]:
-                    attr_dict[x] = None
-            else:
-                for x in group_dict[g]:
-                    attr_dict[x] = i
-                i += 1
-        return attr_dict, group_dict    
+                attr_dict[ID] = code
+                group_dict[categories[code]].append(ID)
+        return attr_dict, group_dict
+    
+    def factorizeAttr(self, attrName, n_or_e='n', order='sorted'):
+        #splits the values of the given data attribute into discrete groups
+        #returns an array with the group number of each node (or edge) in order, -1 for None, and the list of the groups' values
+        #see factorize() for the order of the groups
+        working_group = self.check_nore(n_or_e)
+        return factorize([x.get(attrName) for x in working_group], order)
 
     def set_to_boolDict(self,s):
         #many graph analysis algorithms return a set of nodes instead of a dictionary, but dictionaries fit better into the framework of this package
@@ -921,6 +1144,19 @@ class Graph:
         
         return node_d
 
+    def nodePositions(self):
+        #returns the positions installed by layout() as a dictionary of node ID to (x, y), or None if there is no layout
+        #nodes whose position is missing are left for GraphSpace to place
+        if LAYOUT_ATTRS[0] not in self.node_dir or LAYOUT_ATTRS[1] not in self.node_dir:
+            return None
+        positions = {}
+        for n in self.nodes:
+            x = n.get(LAYOUT_ATTRS[0])
+            y = n.get(LAYOUT_ATTRS[1])
+            if type(x) in [int, float] and type(y) in [int, float]:
+                positions[n.get('ID')] = (x, y)
+        return positions
+
     def get_adj_ls(self):
         #returns the Graph in adjacency list form
         d = {}
@@ -991,6 +1227,45 @@ class Graph:
         self.GSedgeAttrs = attrs
 
         
+    def GSstyleAttrs(self, n_or_e):
+        #names of the GraphSpace visual attributes that are sent for the nodes (or edges), including the defaults
+        if n_or_e == 'n':
+            return sorted(set(self.GSnodeDefaults) | self.GSnodeDir)
+        return sorted(set(self.GSedgeDefaults) | self.GSedgeDir)
+
+    def installValues(self, GS_attrs, values, n_or_e='n'):
+        #installs a list of values, one for each node (or edge) in order, as the given GraphSpace visual attributes
+        #does the work of installNodeAttr() and GSnodeAttrInstall() (or the edge versions) in a single pass over the nodes or edges
+        self.installColumns([(GS_attrs, values)], n_or_e)
+    
+    def installColumns(self, columns, n_or_e='n'):
+        #installs several lists of values at once, in a single pass over the nodes or edges
+        #columns is a list of (GS_attrs, values) pairs as for installValues(), installed in order
+        working_group = self.check_nore(n_or_e)
+        pairs = []
+        for GS_attrs, values in columns:
+            keys = ['__' + GS_attr + '__' for GS_attr in GS_attrs]
+            for key in keys:
+                self.forgetStats(key, n_or_e)
+            if n_or_e == 'n':
+                self.node_dir.update(keys)
+                self.GSnodeDir.update(GS_attrs)
+            else:
+                self.edge_dir.update(keys)
+                self.GSedgeDir.update(GS_attrs)
+            pairs.append(list(zip(GS_attrs, keys)))
+        
+        for x, vs in zip(working_group, zip(*[values for GS_attrs, values in columns])):
+            if n_or_e == 'n':
+                row = self.GSnodeAttrs[x.get('ID')]
+            else:
+                row = self.GSedgeAttrs[x.get('source')][x.get('target')]
+            for column, v in zip(pairs, vs):
+                for GS_attr, key in column:
+                    x.newAttr(key)
+                    x.put(key, v)
+                    row[GS_attr] = v
+
     def GSattrsUpdate(self, loud=False):
         #updates all the GraphSpace visual attributes that are being kept track of
         for attr in self.GSnodeDir:
@@ -1035,18 +1310,38 @@ class Graph:
     
 
     
-    def uploadGraph(self, title=None, graphID=None, desc=None, tags=None):
-        #uploads the graph to GraphSpace.
+    def uploadGraph(self, title=None, graphID=None, desc=None, tags=None, force=False, json_filename=None, compress=None, archive=None, summary=False, async_=False, style_classes=None, raise_errors=False, user=None, timeout=None):
+        #uploads the graph to GraphSpace, and returns what happened: 'posted', 'unchanged', 'queued' or 'failed' (None if the user quit).
+        #to upload without being asked for a password, call graphspace_utils.login(user, password) first.
+        #if the graph is unchanged since it was last uploaded, nothing is written or sent unless force=True.
+        #the JSON is sent straight from memory; give json_filename to also keep a copy of it on disk.
+        #a graph that changed is always sent whole, as the GraphSpace API has no request for partial updates
+        #compress (gzip level 1-9), archive (a directory) and timeout (seconds to wait for the server on each request) are passed on to
+        #graphspace_utils.postGraph
+        #with summary=True, prints one line with the time spent building the JSON and in each phase of the requests
+        #with async_=True, the graph is queued in the upload spool and this returns right away; run graphspace_flush.py to post it.
+        #with style_classes=True, visual attributes shared by many nodes or edges are sent once in a stylesheet (see json_utils.compress_styles)
+        #instead of in every element; this defaults to graphspace_utils.STYLE_CLASSES_SUPPORTED.
+        #errors, including a graph that the server does not accept, are printed and give 'failed', unless raise_errors=True.
         self.GSattrsUpdate()
-        json_filename = 'graphspace_upload.json'
-        user = input("Graphspace username: ")
-        pw = getpass.getpass("Graphspace password: ")
+        #the username and password are only asked for the first time; after that the graphspace_utils session is reused
+        #queuing a graph only needs the username (which can be given as user); the flusher asks for the password
+        session = graphspace_utils.getSession(user)
+        if session != None:
+            user = session.user
+        else:
+            if user == None:
+                user = input("Graphspace username: ")
+            if not async_:
+                graphspace_utils.login(user, getpass.getpass("Graphspace password: "))
+        pw = None
         if title == None:
             title = input("Graph title: ")
         if graphID == None:
             graphID = input("Graph ID: ")
         if desc == None:
             desc = input("Graph description: ")
+        tag_str = None
         if tags == None:
             tag_str = input("Graph tags (separated by comma): ")
             tags = tag_str.strip().split(',')
@@ -1062,16 +1357,45 @@ class Graph:
         
         GS_nodes = self.defaultizeNodes()
         GS_edges = self.defaultizeEdges()
+        positions = self.nodePositions()
         
+        start = time.time()
+        build = 0.0
+        calls = []
         try:
-            data = json_utils.make_json_data(n_ls, e_ls, GS_nodes, GS_edges, title, desc, tags)
-            json_utils.write_json(data,json_filename)
-            graphspace_utils.postGraph(graphID, json_filename, user, pw)
+            with graphspace_utils.METRICS.collect() as calls:
+                data = json_utils.make_json_data(n_ls, e_ls, GS_nodes, GS_edges, title, desc, tags, positions=positions)
+                build = time.time() - start
+                if style_classes or (style_classes == None and graphspace_utils.STYLE_CLASSES_SUPPORTED):
+                    data = json_utils.compress_styles(data, self.GSstyleAttrs('n'), self.GSstyleAttrs('e'))
+                digest = json_utils.hash_json_data(data)
+                if not force and graphspace_utils.isUploadCached(graphID, user, digest):
+                    print("Graph " + str(graphID) + " is unchanged since the last upload. Skipping (use force=True to upload anyway).")
+                    return 'unchanged'
+                if json_filename:
+                    json_utils.write_json(data,json_filename,compress)
+                if async_:
+                    graphspace_utils.spoolGraph(graphID, json_utils.dumps_json(data), user, force=True, digest=digest, compress=compress, archive=archive, tags=tags)
+                    return 'queued'
+                #postGraph raises an error if the server does not accept the graph
+                if graphspace_utils.postGraph(graphID, json_utils.dumps_json(data), user, pw, force=True, digest=digest, compress=compress, archive=archive, tags=tags, timeout=timeout):
+                    return 'posted'
+                return 'unchanged'
         except Exception as e:
+            if raise_errors:
+                raise
             print(e)
+            return 'failed'
+        finally:
+            if summary:
+                print("Upload of graph " + str(graphID) + ": " + "%.3f s total, JSON built in %.3f s, " % (time.time() - start, build) + graphspace_utils.summarizeCalls(calls))
 
 
 
+#number of times each attribute has been written with put() or deleted, in any node or edge.
+#Graph.attrStats() compares it with the number at the time it summarized an attribute, so its statistics never go stale.
+attr_versions = {}
+
 class GenericDynamicObject:
     #Parent class for nodes and edges that allows attributes that can be dynamically updated by a user(!)
     #GenericDynamicObject does this by keeping track of a set of terms called the directory (accessible using the Python inbuilt dir() function) and a dictionary which holds the value associated with each term.
@@ -1092,7 +1416,7 @@ class GenericDynamicObject:
     def get(self,attrName,loud=False):
         #gets a value for an existing attribute
         #if the attribute exists in the directory, but no value has been put, returns None (prints a warning if the loud argument is True)
-        if attrName not in dir(self):
+        if attrName not in self.dir_set:
             raise NameError(str(self.__class__.__name__) +' object contains no attribute called ' + str(attrName))
         elif attrName not in self.d:
             if loud:
@@ -1103,14 +1427,23 @@ class GenericDynamicObject:
     
     def put(self, attrName,val,loud=False):
         #inputs a value for an existing attribute
-        if attrName not in dir(self):
+        if attrName not in self.dir_set:
             raise NameError(str(self.__class__.__name__) + ' object contains no attribute called ' + str(attrName))
         else:
             self.d[attrName] = val
+            attr_versions[attrName] = attr_versions.get(attrName, 0) + 1
     
     def delete(self, attrName):
         self.dir_set = self.dir_set - set([attrName])
         self.d.pop(attrName)
+        attr_versions[attrName] = attr_versions.get(attrName, 0) + 1
+    
+    def copy(self):
+        #returns a new object of the same class with the same directory and values
+        new = self.__class__.__new__(self.__class__)
+        new.d = dict(self.d)
+        new.dir_set = set(self.dir_set)
+        return new
     
     def __dir__(self):
         #gives the directory in list form.
@@ -1170,8 +1503,9 @@ class Edge(GenericDynamicObject):
 ########################
 #PARSE HELPER FUNCTIONS#
 ########################
-def get_header(file, delimiter, n_or_e):
+def get_header(file, delimiter, n_or_e, interactive=True):
     #automatically gets a header from the first line of a file
+    #a header that is not formatted correctly is only used if the user confirms it; with interactive=False it raises a ValueError instead
     with open(file, 'r') as f:
         h = f.readline()
         ls = h.strip().split(delimiter)
@@ -1180,6 +1514,8 @@ def get_header(file, delimiter, n_or_e):
         print("No header was supplied as argument for parsing node file " + file + "\nProceeding with automatic header detection.")
         if not ls[0].lower() == 'id':
             print("Warning! get_header() sees that the first entry of the header is not called 'ID'. A properly formatted node file should have a column of node ID's first, followed optionally by other attribute columns.")
+            if not interactive:
+                raise ValueError("The header of node file " + file + " does not start with 'ID'. Give the header to parse() as nodeHeader instead.")
             verify = input("Please verify: Does the first column of the node file contain node ID's despite not being called 'ID'? \n('yes' to proceed, 'no' to quit): ")
             if verify.lower() == 'yes':
                 ls[0] = 'ID'
@@ -1193,6 +1529,8 @@ def get_header(file, delimiter, n_or_e):
             raise SyntaxError("\n\nThe parser has detected a header with only one column in the edge file. Edges must start with a source column and a target column. \nTip: Make sure you are supplying the correct delimiter for the input file. It defaults to tab ('\\t') but it can be supplied as an argument (e.g. parse('my_edgefile.txt',nodefile='my_nodefile.txt',delimiter=';'))")
         if (not ls[0].lower() in ['source','s']) and (not ls[1].lower() in ['target', 't']):
             print("Warning! get_header() sees that the first two entries of the header are not called 'source' and 'target' respectively. A properly formatted edge file should have a column of source nodes first, and a column of target nodes second, followed optionally by other attribute columns.")
+            if not interactive:
+                raise ValueError("The header of edge file " + file + " does not start with 'source' and 'target'. Give the header to parse() as edgeHeader instead.")
             verify = input("Please verify: Do the first two columns of the edge file contain the nodes linked by each edge despite not being labelled 'source' and 'target'?\n('yes' to proceed, 'no' to quit): ")
             if verify.lower() == 'yes':
                 ls[0] = 'source'
@@ -1387,10 +1725,201 @@ def vector_to_RGB(vector):
     return '#{:02x}{:02x}{:02x}'.format(int(vector[0]),int(vector[1]),int(vector[2]))
 
 def getGColor(color1, color2, normVal):
+    #color of a single normalized value on the gradient from color1 to color2, see gradient_colors()
     if math.isnan(normVal):
         return None
-    gradient_vector = vector_add(scalar_mult((1-normVal),color1), scalar_mult(normVal,color2))     #in plain mathematics: (1-normVal)*color1 + (normVal)*color2 
-    return vector_to_RGB(gradient_vector)
+    return gradient_colors([normVal], [color1, color2])[0]
+
+
+###########################
+#GRADIENT COLORMAP ENGINE #
+###########################
+#a gradient is turned into a table of LUT_SIZE hex strings once, and normalized values are then colored
+#by looking up their quantized index in the table, so coloring a whole attribute is a single array operation
+LUT_SIZE = 256
+_gradient_luts = {}
+
+def gradient_lut(colors):
+    #returns the lookup table for a gradient running through the given RGB vectors (two or more, evenly spaced)
+    #entry i is the color of normalized value i/(LUT_SIZE-1); one extra entry at the end holds None for missing values
+    #tables are cached, so each gradient is only built once per session
+    key = tuple(tuple(color) for color in colors)
+    if key in _gradient_luts:
+        return _gradient_luts[key]
+    
+    stops = np.asarray(colors, dtype=float)
+    if stops.ndim != 2 or stops.shape[1] != 3 or len(stops) < 2:
+        raise IndexError("Error! A gradient needs at least two RGB vectors of length 3, but got " + str(colors) + ".")
+    if np.isnan(stops).any() or (stops < 0).any() or (stops > 255).any():
+        raise ValueError("Error! Tried to build a gradient from " + str(colors) + " but its values were not all between 0 and 255.")
+    
+    #in plain mathematics: between two neighboring stops, (1-t)*stop1 + t*stop2
+    x = np.linspace(0, 1, LUT_SIZE)
+    positions = np.linspace(0, 1, len(stops))
+    rgb = np.column_stack([np.interp(x, positions, stops[:, i]) for i in range(3)]).astype(int)
+    
+    lut = np.empty(LUT_SIZE + 1, dtype=object)
+    lut[:LUT_SIZE] = ['#{:02x}{:02x}{:02x}'.format(r, g, b) for r, g, b in rgb.tolist()]
+    lut[LUT_SIZE] = None
+    _gradient_luts[key] = lut
+    return lut
+
+def gradient_colors(normVals, colors):
+    #maps a sequence of normalized values in [0,1] to hex color strings on the gradient through the given RGB vectors
+    #NaN maps to None and values outside [0,1] are clipped to the ends of the gradient; returns a list
+    return gradient_lut(colors)[gradient_index(normVals)].tolist()
+
+def gradient_index(normVals):
+    #the entry of the gradient lookup table (see gradient_lut()) for each normalized value, as an integer array
+    v = np.asarray(normVals, dtype=float)
+    missing = np.isnan(v)
+    scaled = v * (LUT_SIZE - 1)
+    np.clip(scaled, 0, LUT_SIZE - 1, out=scaled)
+    scaled += 0.5
+    with np.errstate(invalid='ignore'):
+        #NaN casts to garbage here, it is pointed at the None entry right after
+        index = scaled.astype(np.intp)
+    index[missing] = LUT_SIZE
+    return index
+
+
+#######################
+#NORMALIZATION SCHEMES#
+#######################
+#normalize() maps an attribute onto [0,1] for the scale methods of the Graph. Besides plain min-max scaling
+#there are schemes for heavy-tailed data (degree, expression), where a few outliers would otherwise squash
+#every other value into one end of the scale:
+#   linear:   (v - min) / (max - min)
+#   log:      like linear, on log(1 + v - min)
+#   quantile: the fraction of the other values that are smaller (ties share their average rank)
+#   zscore:   0.5 + z / (2*Z_RANGE), so that Z_RANGE standard deviations either side of the mean span [0,1]
+#   clip:     like linear between the CLIP_PERCENTILES percentiles, values beyond them are clipped
+NORM_SCHEMES = ['linear', 'log', 'quantile', 'zscore', 'clip']
+Z_RANGE = 3.0
+CLIP_PERCENTILES = (1, 99)
+
+def summarize_values(values):
+    #summary statistics of a float array in which missing values are NaN
+    present = np.sort(values[~np.isnan(values)])
+    stats = {'count': len(present), 'sorted': present, 'percentiles': {}}
+    if len(present):
+        stats['min'] = present[0]
+        stats['max'] = present[-1]
+        stats['mean'] = present.mean()
+        stats['std'] = present.std()
+    return stats
+
+def normalize(values, scheme='linear', stats=None):
+    #maps a float array onto [0,1] with the given scheme from NORM_SCHEMES; NaN stays NaN
+    #stats are the summary statistics of values (see summarize_values()) and are computed if not given
+    if scheme not in NORM_SCHEMES:
+        raise NameError("Unknown normalization scheme '" + str(scheme) + "'. Please choose one of the following: " + str(NORM_SCHEMES))
+    if stats == None:
+        stats = summarize_values(values)
+    if stats['count'] == 0:
+        return np.full(len(values), float('nan'))
+    
+    if scheme == 'linear':
+        return rescale(values, stats['min'], stats['max'])
+    elif scheme == 'log':
+        return rescale(np.log1p(values - stats['min']), 0, np.log1p(stats['max'] - stats['min']))
+    elif scheme == 'quantile':
+        present = stats['sorted']
+        ranks = (np.searchsorted(present, values, 'left') + np.searchsorted(present, values, 'right') - 1) / 2.0
+        ranks[np.isnan(values)] = float('nan')
+        return rescale(ranks, 0, len(present) - 1)
+    elif scheme == 'zscore':
+        if stats['std'] == 0:
+            return rescale(values, stats['mean'], stats['mean'])
+        return np.clip(0.5 + (values - stats['mean']) / (2 * Z_RANGE * stats['std']), 0, 1)
+    elif scheme == 'clip':
+        #percentiles are only worked out for the clip scheme, and kept with the other statistics
+        if CLIP_PERCENTILES not in stats['percentiles']:
+            stats['percentiles'][CLIP_PERCENTILES] = np.percentile(stats['sorted'], CLIP_PERCENTILES)
+        low, high = stats['percentiles'][CLIP_PERCENTILES]
+        return rescale(np.clip(values, low, high), low, high)
+
+def factorize(values, order='sorted'):
+    #splits a list of values into discrete groups in one pass
+    #returns an array with the group number of each value, -1 for None, and the list of the groups' values
+    #with order='sorted' the groups are numbered in sorted order (numbers before other values), so the numbering only depends
+    #on which values there are; with order='appearance' they are numbered in the order they first appear in the list
+    if order not in ['sorted', 'appearance']:
+        raise NameError("order must be either 'sorted' or 'appearance'.")
+    
+    #the values are grouped with a dictionary, which is faster than converting them to an array for numpy.unique()
+    index = {}
+    codes = np.fromiter((-1 if v == None else index.setdefault(v, len(index)) for v in values), dtype=np.intp, count=len(values))
+    categories = list(index)
+    
+    if order == 'sorted':
+        #only the groups are sorted, and the codes are renumbered with one array lookup
+        ranks = sorted(range(len(categories)), key=lambda i: category_key(categories[i]))
+        renumber = np.empty(len(categories) + 1, dtype=np.intp)
+        renumber[ranks] = np.arange(len(categories))
+        renumber[len(categories)] = -1     #code -1 looks up this last entry, so None stays -1
+        codes = renumber[codes]
+        categories = [categories[i] for i in ranks]
+    return codes, categories
+
+def category_key(v):
+    #sort key for group values of mixed types: numbers (and booleans) first, then everything else by its text
+    if type(v) in [bool, int, float]:
+        return (0, v, '')
+    return (1, 0, str(v))
+
+def nan_to_none(values):
+    #turns a float array into a list in which NaN is None, so that missing values get the default visual attribute
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+#########################
+#VISUAL MAPPING KERNELS #
+#########################
+#each kernel turns the data of one attribute into a column of visual attribute values, one for each node (or edge) in order,
+#using only array operations on numbers, which NumPy runs without holding the interpreter lock, so that style() can run several
+#kernels in parallel threads. A column is a pair (values, table): a float array in which NaN is missing when table is None,
+#otherwise an integer array of entries in table, whose last entry is None. column_values() turns it into a list of Python values.
+
+def gradient_column(stats, colors, norm='linear'):
+    #colors on the gradient through the given RGB vectors for an attribute with the given statistics (see Graph.attrStats())
+    return gradient_index(normalize(stats['values'], norm, stats)), gradient_lut(colors)
+
+def scaled_column(stats, low, high, norm='linear'):
+    #numbers from low (smallest value) to high (largest value) for an attribute with the given statistics; None where it has no value
+    return low + (high - low) * normalize(stats['values'], norm, stats), None
+
+def coded_column(codes, table):
+    #table[code] for each group number from factorize(); None for code -1, so that elements with no group get the default
+    lookup = np.empty(len(table) + 1, dtype=object)
+    lookup[:len(table)] = table
+    lookup[len(table)] = None
+    return codes, lookup
+
+def column_values(column):
+    #the list of visual attribute values in a column from one of the kernels
+    values, table = column
+    if table is None:
+        return nan_to_none(values)
+    return table[values].tolist()
+
+#(low, high) background_blacken for the smallest and largest values of an attribute, for each choice in scaleBlacken()
+#positive values blacken and negative values whiten
+BLACKEN_RANGES = {
+    ('blacken', 'more'): (1, 0),
+    ('blacken', 'less'): (0, 1),
+    ('whiten', 'more'): (-1, 0),
+    ('whiten', 'less'): (0, -1),
+    ('both', 'black'): (1, -1),
+    ('both', 'white'): (-1, 1),
+}
+
+def rescale(values, low, high):
+    #linear map of [low,high] onto [0,1]; if low == high every value lands in the middle
+    if high == low:
+        return np.where(np.isnan(values), float('nan'), 0.5)
+    return (values - low) / float(high - low)
 
 
 def quick_plot(d):
@@ -1449,148 +1978,180 @@ def check_control_str(given, want):
             return False
 
 
+def merge_elements(new, members):
+    #gives the new Node or Edge every attribute of the given nodes or edges, for collapse()
+    #data attributes whose values are numbers take the average of the members' values; other attributes,
+    #including all visual attributes, take the most common value that is not None
+    for attrName in dir(members[0]):
+        if attrName in dir(new):
+            continue
+        values = [x.get(attrName) for x in members if x.get(attrName) != None]
+        numbers = [v for v in values if type(v) in [int, float]]
+        if numbers and len(numbers) == len(values) and not check_key(attrName):
+            value = sum(numbers) / float(len(numbers))
+        elif values:
+            value = collections.Counter(values).most_common(1)[0][0]
+        else:
+            value = None
+        new.newAttr(attrName)
+        new.put(attrName, value)
+    return new
+
+
+#data attributes that hold the node positions computed by layout()
+LAYOUT_ATTRS = ('layout_x', 'layout_y')
+
 shape_ls = ["rectangle", "ellipse", "triangle", "pentagon", "hexagon", "heptagon", "octagon", "star", "diamond", "vee", "rhomboid", "roundrectangle"]        
 def pick_shape(n):
     if n == None:
         return None
-    if n > len(shape_ls):
+    if n >= len(shape_ls):
         raise ValueError("Too many discrete groups to visualize by shape (GraphSpace has 12 unique node shapes)")
     else:
         return shape_ls[n]
 
+#table of precomputed discrete colors that are reasonably different from one another
+#taken from some answer on stack exchange
+color_ls = ["#FFFF00", "#1CE6FF", "#FF34FF", "#FF4A46", "#008941", "#006FA6", "#A30059",
+    "#FFDBE5", "#7A4900", "#0000A6", "#63FFAC", "#B79762", "#004D43", "#8FB0FF", "#997D87",
+    "#5A0007", "#809693", "#FEFFE6", "#1B4400", "#4FC601", "#3B5DFF", "#4A3B53", "#FF2F80",
+    "#61615A", "#BA0900", "#6B7900", "#00C2A0", "#FFAA92", "#FF90C9", "#B903AA", "#D16100",
+    "#DDEFFF", "#000035", "#7B4F4B", "#A1C299", "#300018", "#0AA6D8", "#013349", "#00846F",
+    "#372101", "#FFB500", "#C2FFED", "#A079BF", "#CC0744", "#C0B9B2", "#C2FF99", "#001E09",
+    "#00489C", "#6F0062", "#0CBD66", "#EEC3FF", "#456D75", "#B77B68", "#7A87A1", "#788D66",
+    "#885578", "#FAD09F", "#FF8A9A", "#D157A0", "#BEC459", "#456648", "#0086ED", "#886F4C",
+    "#34362D", "#B4A8BD", "#00A6AA", "#452C2C", "#636375", "#A3C8C9", "#FF913F", "#938A81",
+    "#575329", "#00FECF", "#B05B6F", "#8CD0FF", "#3B9700", "#04F757", "#C8A1A1", "#1E6E00",
+    "#7900D7", "#A77500", "#6367A9", "#A05837", "#6B002C", "#772600", "#D790FF", "#9B9700",
+    "#549E79", "#FFF69F", "#201625", "#72418F", "#BC23FF", "#99ADC0", "#3A2465", "#922329",
+    "#5B4534", "#FDE8DC", "#404E55", "#0089A3", "#CB7E98", "#A4E804", "#324E72", "#6A3A4C",
+    "#83AB58", "#001C1E", "#D1F7CE", "#004B28", "#C8D0F6", "#A3A489", "#806C66", "#222800",
+    "#BF5650", "#E83000", "#66796D", "#DA007C", "#FF1A59", "#8ADBB4", "#1E0200", "#5B4E51",
+    "#C895C5", "#320033", "#FF6832", "#66E1D3", "#CFCDAC", "#D0AC94", "#7ED379", "#012C58",
+    "#7A7BFF", "#D68E01", "#353339", "#78AFA1", "#FEB2C6", "#75797C", "#837393", "#943A4D",
+    "#B5F4FF", "#D2DCD5", "#9556BD", "#6A714A", "#001325", "#02525F", "#0AA3F7", "#E98176",
+    "#DBD5DD", "#5EBCD1", "#3D4F44", "#7E6405", "#02684E", "#962B75", "#8D8546", "#9695C5",
+    "#E773CE", "#D86A78", "#3E89BE", "#CA834E", "#518A87", "#5B113C", "#55813B", "#E704C4",
+    "#00005F", "#A97399", "#4B8160", "#59738A", "#FF5DA7", "#F7C9BF", "#643127", "#513A01",
+    "#6B94AA", "#51A058", "#A45B02", "#1D1702", "#E20027", "#E7AB63", "#4C6001", "#9C6966",
+    "#64547B", "#97979E", "#006A66", "#391406", "#F4D749", "#0045D2", "#006C31", "#DDB6D0",
+    "#7C6571", "#9FB2A4", "#00D891", "#15A08A", "#BC65E9", "#FFFFFE", "#C6DC99", "#203B3C",
+    "#671190", "#6B3A64", "#F5E1FF", "#FFA0F2", "#CCAA35", "#374527", "#8BB400", "#797868",
+    "#C6005A", "#3B000A", "#C86240", "#29607C", "#402334", "#7D5A44", "#CCB87C", "#B88183",
+    "#AA5199", "#B5D6C3", "#A38469", "#9F94F0", "#A74571", "#B894A6", "#71BB8C", "#00B433",
+    "#789EC9", "#6D80BA", "#953F00", "#5EFF03", "#E4FFFC", "#1BE177", "#BCB1E5", "#76912F",
+    "#003109", "#0060CD", "#D20096", "#895563", "#29201D", "#5B3213", "#A76F42", "#89412E",
+    "#1A3A2A", "#494B5A", "#A88C85", "#F4ABAA", "#A3F3AB", "#00C6C8", "#EA8B66", "#958A9F",
+    "#BDC9D2", "#9FA064", "#BE4700", "#658188", "#83A485", "#453C23", "#47675D", "#3A3F00",
+    "#061203", "#DFFB71", "#868E7E", "#98D058", "#6C8F7D", "#D7BFC2", "#3C3E6E", "#D83D66",
+    "#2F5D9B", "#6C5E46", "#D25B88", "#5B656C", "#00B57F", "#545C46", "#866097", "#365D25",
+    "#252F99", "#00CCFF", "#674E60", "#FC009C", "#92896B", "#1E2324", "#DEC9B2", "#9D4948",
+    "#85ABB4", "#342142", "#D09685", "#A4ACAC", "#00FFFF", "#AE9C86", "#742A33", "#0E72C5",
+    "#AFD8EC", "#C064B9", "#91028C", "#FEEDBF", "#FFB789", "#9CB8E4", "#AFFFD1", "#2A364C",
+    "#4F4A43", "#647095", "#34BBFF", "#807781", "#920003", "#B3A5A7", "#018615", "#F1FFC8",
+    "#976F5C", "#FF3BC1", "#FF5F6B", "#077D84", "#F56D93", "#5771DA", "#4E1E2A", "#830055",
+    "#02D346", "#BE452D", "#00905E", "#BE0028", "#6E96E3", "#007699", "#FEC96D", "#9C6A7D",
+    "#3FA1B8", "#893DE3", "#79B4D6", "#7FD4D9", "#6751BB", "#B28D2D", "#E27A05", "#DD9CB8",
+    "#AABC7A", "#980034", "#561A02", "#8F7F00", "#635000", "#CD7DAE", "#8A5E2D", "#FFB3E1",
+    "#6B6466", "#C6D300", "#0100E2", "#88EC69", "#8FCCBE", "#21001C", "#511F4D", "#E3F6E3",
+    "#FF8EB1", "#6B4F29", "#A37F46", "#6A5950", "#1F2A1A", "#04784D", "#101835", "#E6E0D0",
+    "#FF74FE", "#00A45F", "#8F5DF8", "#4B0059", "#412F23", "#D8939E", "#DB9D72", "#604143",
+    "#B5BACE", "#989EB7", "#D2C4DB", "#A587AF", "#77D796", "#7F8C94", "#FF9B03", "#555196",
+    "#31DDAE", "#74B671", "#802647", "#2A373F", "#014A68", "#696628", "#4C7B6D", "#002C27",
+    "#7A4522", "#3B5859", "#E5D381", "#FFF3FF", "#679FA0", "#261300", "#2C5742", "#9131AF",
+    "#AF5D88", "#C7706A", "#61AB1F", "#8CF2D4", "#C5D9B8", "#9FFFFB", "#BF45CC", "#493941",
+    "#863B60", "#B90076", "#003177", "#C582D2", "#C1B394", "#602B70", "#887868", "#BABFB0",
+    "#030012", "#D1ACFE", "#7FDEFE", "#4B5C71", "#A3A097", "#E66D53", "#637B5D", "#92BEA5",
+    "#00F8B3", "#BEDDFF", "#3DB5A7", "#DD3248", "#B6E4DE", "#427745", "#598C5A", "#B94C59",
+    "#8181D5", "#94888B", "#FED6BD", "#536D31", "#6EFF92", "#E4E8FF", "#20E200", "#FFD0F2",
+    "#4C83A1", "#BD7322", "#915C4E", "#8C4787", "#025117", "#A2AA45", "#2D1B21", "#A9DDB0",
+    "#FF4F78", "#528500", "#009A2E", "#17FCE4", "#71555A", "#525D82", "#00195A", "#967874",
+    "#555558", "#0B212C", "#1E202B", "#EFBFC4", "#6F9755", "#6F7586", "#501D1D", "#372D00",
+    "#741D16", "#5EB393", "#B5B400", "#DD4A38", "#363DFF", "#AD6552", "#6635AF", "#836BBA",
+    "#98AA7F", "#464836", "#322C3E", "#7CB9BA", "#5B6965", "#707D3D", "#7A001D", "#6E4636",
+    "#443A38", "#AE81FF", "#489079", "#897334", "#009087", "#DA713C", "#361618", "#FF6F01",
+    "#006679", "#370E77", "#4B3A83", "#C9E2E6", "#C44170", "#FF4526", "#73BE54", "#C4DF72",
+    "#ADFF60", "#00447D", "#DCCEC9", "#BD9479", "#656E5B", "#EC5200", "#FF6EC2", "#7A617E",
+    "#DDAEA2", "#77837F", "#A53327", "#608EFF", "#B599D7", "#A50149", "#4E0025", "#C9B1A9",
+    "#03919A", "#1B2A25", "#E500F1", "#982E0B", "#B67180", "#E05859", "#006039", "#578F9B",
+    "#305230", "#CE934C", "#B3C2BE", "#C0BAC0", "#B506D3", "#170C10", "#4C534F", "#224451",
+    "#3E4141", "#78726D", "#B6602B", "#200441", "#DDB588", "#497200", "#C5AAB6", "#033C61",
+    "#71B2F5", "#A9E088", "#4979B0", "#A2C3DF", "#784149", "#2D2B17", "#3E0E2F", "#57344C",
+    "#0091BE", "#E451D1", "#4B4B6A", "#5C011A", "#7C8060", "#FF9491", "#4C325D", "#005C8B",
+    "#E5FDA4", "#68D1B6", "#032641", "#140023", "#8683A9", "#CFFF00", "#A72C3E", "#34475A",
+    "#B1BB9A", "#B4A04F", "#8D918E", "#A168A6", "#813D3A", "#425218", "#DA8386", "#776133",
+    "#563930", "#8498AE", "#90C1D3", "#B5666B", "#9B585E", "#856465", "#AD7C90", "#E2BC00",
+    "#E3AAE0", "#B2C2FE", "#FD0039", "#009B75", "#FFF46D", "#E87EAC", "#DFE3E6", "#848590",
+    "#AA9297", "#83A193", "#577977", "#3E7158", "#C64289", "#EA0072", "#C4A8CB", "#55C899",
+    "#E78FCF", "#004547", "#F6E2E3", "#966716", "#378FDB", "#435E6A", "#DA0004", "#1B000F",
+    "#5B9C8F", "#6E2B52", "#011115", "#E3E8C4", "#AE3B85", "#EA1CA9", "#FF9E6B", "#457D8B",
+    "#92678B", "#00CDBB", "#9CCC04", "#002E38", "#96C57F", "#CFF6B4", "#492818", "#766E52",
+    "#20370E", "#E3D19F", "#2E3C30", "#B2EACE", "#F3BDA4", "#A24E3D", "#976FD9", "#8C9FA8",
+    "#7C2B73", "#4E5F37", "#5D5462", "#90956F", "#6AA776", "#DBCBF6", "#DA71FF", "#987C95",
+    "#52323C", "#BB3C42", "#584D39", "#4FC15F", "#A2B9C1", "#79DB21", "#1D5958", "#BD744E",
+    "#160B00", "#20221A", "#6B8295", "#00E0E4", "#102401", "#1B782A", "#DAA9B5", "#B0415D",
+    "#859253", "#97A094", "#06E3C4", "#47688C", "#7C6755", "#075C00", "#7560D5", "#7D9F00",
+    "#C36D96", "#4D913E", "#5F4276", "#FCE4C8", "#303052", "#4F381B", "#E5A532", "#706690",
+    "#AA9A92", "#237363", "#73013E", "#FF9079", "#A79A74", "#029BDB", "#FF0169", "#C7D2E7",
+    "#CA8869", "#80FFCD", "#BB1F69", "#90B0AB", "#7D74A9", "#FCC7DB", "#99375B", "#00AB4D",
+    "#ABAED1", "#BE9D91", "#E6E5A7", "#332C22", "#DD587B", "#F5FFF7", "#5D3033", "#6D3800",
+    "#FF0020", "#B57BB3", "#D7FFE6", "#C535A9", "#260009", "#6A8781", "#A8ABB4", "#D45262",
+    "#794B61", "#4621B2", "#8DA4DB", "#C7C890", "#6FE9AD", "#A243A7", "#B2B081", "#181B00",
+    "#286154", "#4CA43B", "#6A9573", "#A8441D", "#5C727B", "#738671", "#D0CFCB", "#897B77",
+    "#1F3F22", "#4145A7", "#DA9894", "#A1757A", "#63243C", "#ADAAFF", "#00CDE2", "#DDBC62",
+    "#698EB1", "#208462", "#00B7E0", "#614A44", "#9BBB57", "#7A5C54", "#857A50", "#766B7E",
+    "#014833", "#FF8347", "#7A8EBA", "#274740", "#946444", "#EBD8E6", "#646241", "#373917",
+    "#6AD450", "#81817B", "#D499E3", "#979440", "#011A12", "#526554", "#B5885C", "#A499A5",
+    "#03AD89", "#B3008B", "#E3C4B5", "#96531F", "#867175", "#74569E", "#617D9F", "#E70452",
+    "#067EAF", "#A697B6", "#B787A8", "#9CFF93", "#311D19", "#3A9459", "#6E746E", "#B0C5AE",
+    "#84EDF7", "#ED3488", "#754C78", "#384644", "#C7847B", "#00B6C5", "#7FA670", "#C1AF9E",
+    "#2A7FFF", "#72A58C", "#FFC07F", "#9DEBDD", "#D97C8E", "#7E7C93", "#62E674", "#B5639E",
+    "#FFA861", "#C2A580", "#8D9C83", "#B70546", "#372B2E", "#0098FF", "#985975", "#20204C",
+    "#FF6C60", "#445083", "#8502AA", "#72361F", "#9676A3", "#484449", "#CED6C2", "#3B164A",
+    "#CCA763", "#2C7F77", "#02227B", "#A37E6F", "#CDE6DC", "#CDFFFB", "#BE811A", "#F77183",
+    "#EDE6E2", "#CDC6B4", "#FFE09E", "#3A7271", "#FF7B59", "#4E4E01", "#4AC684", "#8BC891",
+    "#BC8A96", "#CF6353", "#DCDE5C", "#5EAADD", "#F6A0AD", "#E269AA", "#A3DAE4", "#436E83",
+    "#002E17", "#ECFBFF", "#A1C2B6", "#50003F", "#71695B", "#67C4BB", "#536EFF", "#5D5A48",
+    "#890039", "#969381", "#371521", "#5E4665", "#AA62C3", "#8D6F81", "#2C6135", "#410601",
+    "#564620", "#E69034", "#6DA6BD", "#E58E56", "#E3A68B", "#48B176", "#D27D67", "#B5B268",
+    "#7F8427", "#FF84E6", "#435740", "#EAE408", "#F4F5FF", "#325800", "#4B6BA5", "#ADCEFF",
+    "#9B8ACC", "#885138", "#5875C1", "#7E7311", "#FEA5CA", "#9F8B5B", "#A55B54", "#89006A",
+    "#AF756F", "#2A2000", "#7499A1", "#FFB550", "#00011E", "#D1511C", "#688151", "#BC908A",
+    "#78C8EB", "#8502FF", "#483D30", "#C42221", "#5EA7FF", "#785715", "#0CEA91", "#FFFAED",
+    "#B3AF9D", "#3E3D52", "#5A9BC2", "#9C2F90", "#8D5700", "#ADD79C", "#00768B", "#337D00",
+    "#C59700", "#3156DC", "#944575", "#ECFFDC", "#D24CB2", "#97703C", "#4C257F", "#9E0366",
+    "#88FFEC", "#B56481", "#396D2B", "#56735F", "#988376", "#9BB195", "#A9795C", "#E4C5D3",
+    "#9F4F67", "#1E2B39", "#664327", "#AFCE78", "#322EDF", "#86B487", "#C23000", "#ABE86B",
+    "#96656D", "#250E35", "#A60019", "#0080CF", "#CAEFFF", "#323F61", "#A449DC", "#6A9D3B",
+    "#FF5AE4", "#636A01", "#D16CDA", "#736060", "#FFBAAD", "#D369B4", "#FFDED6", "#6C6D74",
+    "#927D5E", "#845D70", "#5B62C1", "#2F4A36", "#E45F35", "#FF3B53", "#AC84DD", "#762988",
+    "#70EC98", "#408543", "#2C3533", "#2E182D", "#323925", "#19181B", "#2F2E2C", "#023C32",
+    "#9B9EE2", "#58AFAD", "#5C424D", "#7AC5A6", "#685D75", "#B9BCBD", "#834357", "#1A7B42",
+    "#2E57AA", "#E55199", "#316E47", "#CD00C5", "#6A004D", "#7FBBEC", "#F35691", "#D7C54A",
+    "#62ACB7", "#CBA1BC", "#A28A9A", "#6C3F3B", "#FFE47D", "#DCBAE3", "#5F816D", "#3A404A",
+    "#7DBF32", "#E6ECDC", "#852C19", "#285366", "#B8CB9C", "#0E0D00", "#4B5D56", "#6B543F",
+    "#E27172", "#0568EC", "#2EB500", "#D21656", "#EFAFFF", "#682021", "#2D2011", "#DA4CFF",
+    "#70968E", "#FF7B7D", "#4A1930", "#E8C282", "#E7DBBC", "#A68486", "#1F263C", "#36574E",
+    "#52CE79", "#ADAAA9", "#8A9F45", "#6542D2", "#00FB8C", "#5D697B", "#CCD27F", "#94A5A1",
+    "#790229", "#E383E6", "#7EA4C1", "#4E4452", "#4B2C00", "#620B70", "#314C1E", "#874AA6",
+    "#E30091", "#66460A", "#EB9A8B", "#EAC3A3", "#98EAB3", "#AB9180", "#B8552F", "#1A2B2F",
+    "#94DDC5", "#9D8C76", "#9C8333", "#94A9C9", "#392935", "#8C675E", "#CCE93A", "#917100",
+    "#01400B", "#449896", "#1CA370", "#E08DA7", "#8B4A4E", "#667776", "#4692AD", "#67BDA8",
+    "#69255C", "#D3BFFF", "#4A5132", "#7E9285", "#77733C", "#E7A0CC", "#51A288", "#2C656A",
+    "#4D5C5E", "#C9403A", "#DDD7F3", "#005844", "#B4A200", "#488F69", "#858182", "#D4E9B9",
+    "#3D7397", "#CAE8CE", "#D60034", "#AA6746", "#9E5585", "#BA6200"]
+
 def discrete_coloring(n):
-    #table of precomputed discrete colors that are reasonably different from one another
-    #taken from some answer on stack exchange
+    #color of discrete group number n, from color_ls
     if n == None:
         return None
-    if n > 1023:
-        raise ValueError
-    color_ls = ["#FFFF00", "#1CE6FF", "#FF34FF", "#FF4A46", "#008941", "#006FA6", "#A30059",
-        "#FFDBE5", "#7A4900", "#0000A6", "#63FFAC", "#B79762", "#004D43", "#8FB0FF", "#997D87",
-        "#5A0007", "#809693", "#FEFFE6", "#1B4400", "#4FC601", "#3B5DFF", "#4A3B53", "#FF2F80",
-        "#61615A", "#BA0900", "#6B7900", "#00C2A0", "#FFAA92", "#FF90C9", "#B903AA", "#D16100",
-        "#DDEFFF", "#000035", "#7B4F4B", "#A1C299", "#300018", "#0AA6D8", "#013349", "#00846F",
-        "#372101", "#FFB500", "#C2FFED", "#A079BF", "#CC0744", "#C0B9B2", "#C2FF99", "#001E09",
-        "#00489C", "#6F0062", "#0CBD66", "#EEC3FF", "#456D75", "#B77B68", "#7A87A1", "#788D66",
-        "#885578", "#FAD09F", "#FF8A9A", "#D157A0", "#BEC459", "#456648", "#0086ED", "#886F4C",
-        "#34362D", "#B4A8BD", "#00A6AA", "#452C2C", "#636375", "#A3C8C9", "#FF913F", "#938A81",
-        "#575329", "#00FECF", "#B05B6F", "#8CD0FF", "#3B9700", "#04F757", "#C8A1A1", "#1E6E00",
-        "#7900D7", "#A77500", "#6367A9", "#A05837", "#6B002C", "#772600", "#D790FF", "#9B9700",
-        "#549E79", "#FFF69F", "#201625", "#72418F", "#BC23FF", "#99ADC0", "#3A2465", "#922329",
-        "#5B4534", "#FDE8DC", "#404E55", "#0089A3", "#CB7E98", "#A4E804", "#324E72", "#6A3A4C",
-        "#83AB58", "#001C1E", "#D1F7CE", "#004B28", "#C8D0F6", "#A3A489", "#806C66", "#222800",
-        "#BF5650", "#E83000", "#66796D", "#DA007C", "#FF1A59", "#8ADBB4", "#1E0200", "#5B4E51",
-        "#C895C5", "#320033", "#FF6832", "#66E1D3", "#CFCDAC", "#D0AC94", "#7ED379", "#012C58",
-        "#7A7BFF", "#D68E01", "#353339", "#78AFA1", "#FEB2C6", "#75797C", "#837393", "#943A4D",
-        "#B5F4FF", "#D2DCD5", "#9556BD", "#6A714A", "#001325", "#02525F", "#0AA3F7", "#E98176",
-        "#DBD5DD", "#5EBCD1", "#3D4F44", "#7E6405", "#02684E", "#962B75", "#8D8546", "#9695C5",
-        "#E773CE", "#D86A78", "#3E89BE", "#CA834E", "#518A87", "#5B113C", "#55813B", "#E704C4",
-        "#00005F", "#A97399", "#4B8160", "#59738A", "#FF5DA7", "#F7C9BF", "#643127", "#513A01",
-        "#6B94AA", "#51A058", "#A45B02", "#1D1702", "#E20027", "#E7AB63", "#4C6001", "#9C6966",
-        "#64547B", "#97979E", "#006A66", "#391406", "#F4D749", "#0045D2", "#006C31", "#DDB6D0",
-        "#7C6571", "#9FB2A4", "#00D891", "#15A08A", "#BC65E9", "#FFFFFE", "#C6DC99", "#203B3C",
-        "#671190", "#6B3A64", "#F5E1FF", "#FFA0F2", "#CCAA35", "#374527", "#8BB400", "#797868",
-        "#C6005A", "#3B000A", "#C86240", "#29607C", "#402334", "#7D5A44", "#CCB87C", "#B88183",
-        "#AA5199", "#B5D6C3", "#A38469", "#9F94F0", "#A74571", "#B894A6", "#71BB8C", "#00B433",
-        "#789EC9", "#6D80BA", "#953F00", "#5EFF03", "#E4FFFC", "#1BE177", "#BCB1E5", "#76912F",
-        "#003109", "#0060CD", "#D20096", "#895563", "#29201D", "#5B3213", "#A76F42", "#89412E",
-        "#1A3A2A", "#494B5A", "#A88C85", "#F4ABAA", "#A3F3AB", "#00C6C8", "#EA8B66", "#958A9F",
-        "#BDC9D2", "#9FA064", "#BE4700", "#658188", "#83A485", "#453C23", "#47675D", "#3A3F00",
-        "#061203", "#DFFB71", "#868E7E", "#98D058", "#6C8F7D", "#D7BFC2", "#3C3E6E", "#D83D66",
-        "#2F5D9B", "#6C5E46", "#D25B88", "#5B656C", "#00B57F", "#545C46", "#866097", "#365D25",
-        "#252F99", "#00CCFF", "#674E60", "#FC009C", "#92896B", "#1E2324", "#DEC9B2", "#9D4948",
-        "#85ABB4", "#342142", "#D09685", "#A4ACAC", "#00FFFF", "#AE9C86", "#742A33", "#0E72C5",
-        "#AFD8EC", "#C064B9", "#91028C", "#FEEDBF", "#FFB789", "#9CB8E4", "#AFFFD1", "#2A364C",
-        "#4F4A43", "#647095", "#34BBFF", "#807781", "#920003", "#B3A5A7", "#018615", "#F1FFC8",
-        "#976F5C", "#FF3BC1", "#FF5F6B", "#077D84", "#F56D93", "#5771DA", "#4E1E2A", "#830055",
-        "#02D346", "#BE452D", "#00905E", "#BE0028", "#6E96E3", "#007699", "#FEC96D", "#9C6A7D",
-        "#3FA1B8", "#893DE3", "#79B4D6", "#7FD4D9", "#6751BB", "#B28D2D", "#E27A05", "#DD9CB8",
-        "#AABC7A", "#980034", "#561A02", "#8F7F00", "#635000", "#CD7DAE", "#8A5E2D", "#FFB3E1",
-        "#6B6466", "#C6D300", "#0100E2", "#88EC69", "#8FCCBE", "#21001C", "#511F4D", "#E3F6E3",
-        "#FF8EB1", "#6B4F29", "#A37F46", "#6A5950", "#1F2A1A", "#04784D", "#101835", "#E6E0D0",
-        "#FF74FE", "#00A45F", "#8F5DF8", "#4B0059", "#412F23", "#D8939E", "#DB9D72", "#604143",
-        "#B5BACE", "#989EB7", "#D2C4DB", "#A587AF", "#77D796", "#7F8C94", "#FF9B03", "#555196",
-        "#31DDAE", "#74B671", "#802647", "#2A373F", "#014A68", "#696628", "#4C7B6D", "#002C27",
-        "#7A4522", "#3B5859", "#E5D381", "#FFF3FF", "#679FA0", "#261300", "#2C5742", "#9131AF",
-        "#AF5D88", "#C7706A", "#61AB1F", "#8CF2D4", "#C5D9B8", "#9FFFFB", "#BF45CC", "#493941",
-        "#863B60", "#B90076", "#003177", "#C582D2", "#C1B394", "#602B70", "#887868", "#BABFB0",
-        "#030012", "#D1ACFE", "#7FDEFE", "#4B5C71", "#A3A097", "#E66D53", "#637B5D", "#92BEA5",
-        "#00F8B3", "#BEDDFF", "#3DB5A7", "#DD3248", "#B6E4DE", "#427745", "#598C5A", "#B94C59",
-        "#8181D5", "#94888B", "#FED6BD", "#536D31", "#6EFF92", "#E4E8FF", "#20E200", "#FFD0F2",
-        "#4C83A1", "#BD7322", "#915C4E", "#8C4787", "#025117", "#A2AA45", "#2D1B21", "#A9DDB0",
-        "#FF4F78", "#528500", "#009A2E", "#17FCE4", "#71555A", "#525D82", "#00195A", "#967874",
-        "#555558", "#0B212C", "#1E202B", "#EFBFC4", "#6F9755", "#6F7586", "#501D1D", "#372D00",
-        "#741D16", "#5EB393", "#B5B400", "#DD4A38", "#363DFF", "#AD6552", "#6635AF", "#836BBA",
-        "#98AA7F", "#464836", "#322C3E", "#7CB9BA", "#5B6965", "#707D3D", "#7A001D", "#6E4636",
-        "#443A38", "#AE81FF", "#489079", "#897334", "#009087", "#DA713C", "#361618", "#FF6F01",
-        "#006679", "#370E77", "#4B3A83", "#C9E2E6", "#C44170", "#FF4526", "#73BE54", "#C4DF72",
-        "#ADFF60", "#00447D", "#DCCEC9", "#BD9479", "#656E5B", "#EC5200", "#FF6EC2", "#7A617E",
-        "#DDAEA2", "#77837F", "#A53327", "#608EFF", "#B599D7", "#A50149", "#4E0025", "#C9B1A9",
-        "#03919A", "#1B2A25", "#E500F1", "#982E0B", "#B67180", "#E05859", "#006039", "#578F9B",
-        "#305230", "#CE934C", "#B3C2BE", "#C0BAC0", "#B506D3", "#170C10", "#4C534F", "#224451",
-        "#3E4141", "#78726D", "#B6602B", "#200441", "#DDB588", "#497200", "#C5AAB6", "#033C61",
-        "#71B2F5", "#A9E088", "#4979B0", "#A2C3DF", "#784149", "#2D2B17", "#3E0E2F", "#57344C",
-        "#0091BE", "#E451D1", "#4B4B6A", "#5C011A", "#7C8060", "#FF9491", "#4C325D", "#005C8B",
-        "#E5FDA4", "#68D1B6", "#032641", "#140023", "#8683A9", "#CFFF00", "#A72C3E", "#34475A",
-        "#B1BB9A", "#B4A04F", "#8D918E", "#A168A6", "#813D3A", "#425218", "#DA8386", "#776133",
-        "#563930", "#8498AE", "#90C1D3", "#B5666B", "#9B585E", "#856465", "#AD7C90", "#E2BC00",
-        "#E3AAE0", "#B2C2FE", "#FD0039", "#009B75", "#FFF46D", "#E87EAC", "#DFE3E6", "#848590",
-        "#AA9297", "#83A193", "#577977", "#3E7158", "#C64289", "#EA0072", "#C4A8CB", "#55C899",
-        "#E78FCF", "#004547", "#F6E2E3", "#966716", "#378FDB", "#435E6A", "#DA0004", "#1B000F",
-        "#5B9C8F", "#6E2B52", "#011115", "#E3E8C4", "#AE3B85", "#EA1CA9", "#FF9E6B", "#457D8B",
-        "#92678B", "#00CDBB", "#9CCC04", "#002E38", "#96C57F", "#CFF6B4", "#492818", "#766E52",
-        "#20370E", "#E3D19F", "#2E3C30", "#B2EACE", "#F3BDA4", "#A24E3D", "#976FD9", "#8C9FA8",
-        "#7C2B73", "#4E5F37", "#5D5462", "#90956F", "#6AA776", "#DBCBF6", "#DA71FF", "#987C95",
-        "#52323C", "#BB3C42", "#584D39", "#4FC15F", "#A2B9C1", "#79DB21", "#1D5958", "#BD744E",
-        "#160B00", "#20221A", "#6B8295", "#00E0E4", "#102401", "#1B782A", "#DAA9B5", "#B0415D",
-        "#859253", "#97A094", "#06E3C4", "#47688C", "#7C6755", "#075C00", "#7560D5", "#7D9F00",
-        "#C36D96", "#4D913E", "#5F4276", "#FCE4C8", "#303052", "#4F381B", "#E5A532", "#706690",
-        "#AA9A92", "#237363", "#73013E", "#FF9079", "#A79A74", "#029BDB", "#FF0169", "#C7D2E7",
-        "#CA8869", "#80FFCD", "#BB1F69", "#90B0AB", "#7D74A9", "#FCC7DB", "#99375B", "#00AB4D",
-        "#ABAED1", "#BE9D91", "#E6E5A7", "#332C22", "#DD587B", "#F5FFF7", "#5D3033", "#6D3800",
-        "#FF0020", "#B57BB3", "#D7FFE6", "#C535A9", "#260009", "#6A8781", "#A8ABB4", "#D45262",
-        "#794B61", "#4621B2", "#8DA4DB", "#C7C890", "#6FE9AD", "#A243A7", "#B2B081", "#181B00",
-        "#286154", "#4CA43B", "#6A9573", "#A8441D", "#5C727B", "#738671", "#D0CFCB", "#897B77",
-        "#1F3F22", "#4145A7", "#DA9894", "#A1757A", "#63243C", "#ADAAFF", "#00CDE2", "#DDBC62",
-        "#698EB1", "#208462", "#00B7E0", "#614A44", "#9BBB57", "#7A5C54", "#857A50", "#766B7E",
-        "#014833", "#FF8347", "#7A8EBA", "#274740", "#946444", "#EBD8E6", "#646241", "#373917",
-        "#6AD450", "#81817B", "#D499E3", "#979440", "#011A12", "#526554", "#B5885C", "#A499A5",
-        "#03AD89", "#B3008B", "#E3C4B5", "#96531F", "#867175", "#74569E", "#617D9F", "#E70452",
-        "#067EAF", "#A697B6", "#B787A8", "#9CFF93", "#311D19", "#3A9459", "#6E746E", "#B0C5AE",
-        "#84EDF7", "#ED3488", "#754C78", "#384644", "#C7847B", "#00B6C5", "#7FA670", "#C1AF9E",
-        "#2A7FFF", "#72A58C", "#FFC07F", "#9DEBDD", "#D97C8E", "#7E7C93", "#62E674", "#B5639E",
-        "#FFA861", "#C2A580", "#8D9C83", "#B70546", "#372B2E", "#0098FF", "#985975", "#20204C",
-        "#FF6C60", "#445083", "#8502AA", "#72361F", "#9676A3", "#484449", "#CED6C2", "#3B164A",
-        "#CCA763", "#2C7F77", "#02227B", "#A37E6F", "#CDE6DC", "#CDFFFB", "#BE811A", "#F77183",
-        "#EDE6E2", "#CDC6B4", "#FFE09E", "#3A7271", "#FF7B59", "#4E4E01", "#4AC684", "#8BC891",
-        "#BC8A96", "#CF6353", "#DCDE5C", "#5EAADD", "#F6A0AD", "#E269AA", "#A3DAE4", "#436E83",
-        "#002E17", "#ECFBFF", "#A1C2B6", "#50003F", "#71695B", "#67C4BB", "#536EFF", "#5D5A48",
-        "#890039", "#969381", "#371521", "#5E4665", "#AA62C3", "#8D6F81", "#2C6135", "#410601",
-        "#564620", "#E69034", "#6DA6BD", "#E58E56", "#E3A68B", "#48B176", "#D27D67", "#B5B268",
-        "#7F8427", "#FF84E6", "#435740", "#EAE408", "#F4F5FF", "#325800", "#4B6BA5", "#ADCEFF",
-        "#9B8ACC", "#885138", "#5875C1", "#7E7311", "#FEA5CA", "#9F8B5B", "#A55B54", "#89006A",
-        "#AF756F", "#2A2000", "#7499A1", "#FFB550", "#00011E", "#D1511C", "#688151", "#BC908A",
-        "#78C8EB", "#8502FF", "#483D30", "#C42221", "#5EA7FF", "#785715", "#0CEA91", "#FFFAED",
-        "#B3AF9D", "#3E3D52", "#5A9BC2", "#9C2F90", "#8D5700", "#ADD79C", "#00768B", "#337D00",
-        "#C59700", "#3156DC", "#944575", "#ECFFDC", "#D24CB2", "#97703C", "#4C257F", "#9E0366",
-        "#88FFEC", "#B56481", "#396D2B", "#56735F", "#988376", "#9BB195", "#A9795C", "#E4C5D3",
-        "#9F4F67", "#1E2B39", "#664327", "#AFCE78", "#322EDF", "#86B487", "#C23000", "#ABE86B",
-        "#96656D", "#250E35", "#A60019", "#0080CF", "#CAEFFF", "#323F61", "#A449DC", "#6A9D3B",
-        "#FF5AE4", "#636A01", "#D16CDA", "#736060", "#FFBAAD", "#D369B4", "#FFDED6", "#6C6D74",
-        "#927D5E", "#845D70", "#5B62C1", "#2F4A36", "#E45F35", "#FF3B53", "#AC84DD", "#762988",
-        "#70EC98", "#408543", "#2C3533", "#2E182D", "#323925", "#19181B", "#2F2E2C", "#023C32",
-        "#9B9EE2", "#58AFAD", "#5C424D", "#7AC5A6", "#685D75", "#B9BCBD", "#834357", "#1A7B42",
-        "#2E57AA", "#E55199", "#316E47", "#CD00C5", "#6A004D", "#7FBBEC", "#F35691", "#D7C54A",
-        "#62ACB7", "#CBA1BC", "#A28A9A", "#6C3F3B", "#FFE47D", "#DCBAE3", "#5F816D", "#3A404A",
-        "#7DBF32", "#E6ECDC", "#852C19", "#285366", "#B8CB9C", "#0E0D00", "#4B5D56", "#6B543F",
-        "#E27172", "#0568EC", "#2EB500", "#D21656", "#EFAFFF", "#682021", "#2D2011", "#DA4CFF",
-        "#70968E", "#FF7B7D", "#4A1930", "#E8C282", "#E7DBBC", "#A68486", "#1F263C", "#36574E",
-        "#52CE79", "#ADAAA9", "#8A9F45", "#6542D2", "#00FB8C", "#5D697B", "#CCD27F", "#94A5A1",
-        "#790229", "#E383E6", "#7EA4C1", "#4E4452", "#4B2C00", "#620B70", "#314C1E", "#874AA6",
-        "#E30091", "#66460A", "#EB9A8B", "#EAC3A3", "#98EAB3", "#AB9180", "#B8552F", "#1A2B2F",
-        "#94DDC5", "#9D8C76", "#9C8333", "#94A9C9", "#392935", "#8C675E", "#CCE93A", "#917100",
-        "#01400B", "#449896", "#1CA370", "#E08DA7", "#8B4A4E", "#667776", "#4692AD", "#67BDA8",
-        "#69255C", "#D3BFFF", "#4A5132", "#7E9285", "#77733C", "#E7A0CC", "#51A288", "#2C656A",
-        "#4D5C5E", "#C9403A", "#DDD7F3", "#005844", "#B4A200", "#488F69", "#858182", "#D4E9B9",
-        "#3D7397", "#CAE8CE", "#D60034", "#AA6746", "#9E5585", "#BA6200"]
-    return color_ls[n]
\ No newline at end of file
+    if n >= len(color_ls):
+        raise ValueError("Too many discrete groups to visualize by color (there are " + str(len(color_ls)) + " precomputed colors)")
+    return color_ls[n]
+
+#values that style() gives discrete groups automatically, for visual attributes other than colors
+DISCRETE_VALUES = {
+    'shape': shape_ls,
+    'line_style': ['solid', 'dashed', 'dotted'],
+    'border_style': ['solid', 'dashed', 'dotted', 'double'],
+}
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+
+#Headless batch runs of Mission Control
+#Parses many edge/node file pairs, applies the same reductions, visual mappings and layout to each,
+#and exports and/or uploads the results, all from a JSON config file and without any prompts.
+#Jobs run in a pool of worker processes, and one progress line is printed as each job finishes.
+#
+#usage: python mission_batch.py batch.json --workers 4
+#
+#The config file holds the settings for every job, and a list of jobs, each of which can override any setting:
+#{
+#    "delimiter": "\t",                       separator of the input files
+#    "directed": false,
+#    "edgeHeader": null, "nodeHeader": null,  headers, if the files do not start with one
+#    "defaults": {"background_color": "#ffffff"},
+#    "reduce": [{"topNodes": {"attrName": "Node Degree", "k": 500}}],     see topNodes(), neighborhood() and collapse()
+#    "style": [{"attr": "Team", "visual": "shape"}],                      mappings, see Graph.style()
+#    "layout": {"method": "force", "iterations": 50},                     see Graph.layout()
+#    "export": {"edgefile": "out/{name}_edges.txt", "nodefile": "out/{name}_nodes.txt"},
+#    "upload": {"user": "me@example.com", "graphID": "{name}", "title": "{name}", "tags": ["batch"], "async": false},
+#    "jobs": [{"name": "example", "edgefile": "example_edges.txt", "nodefile": "example_nodes.txt"},
+#             {"edgefile": "data/*_edges.txt", "nodefile": "data/{name}_nodes.txt"}]
+#}
+#An edgefile with a '*' makes one job for every matching file, named by the part matched by '*'. Otherwise a job is
+#named after its edgefile. Paths are relative to the config file, and '{name}' in any string is replaced by the job name.
+#Uploads that are not queued ("async": true) log in with the password in the GRAPHSPACE_PASSWORD environment variable
+#(or the variable named by "password_env"); the upload section also takes "desc", "force", "compress", "archive",
+#"style_classes" and "timeout" as in Graph.uploadGraph().
+
+import argparse
+import concurrent.futures
+import contextlib
+import glob
+import io
+import json
+import logging
+import os
+import sys
+import time
+
+import missionControl
+
+
+SETTINGS = ['delimiter', 'directed', 'edgeHeader', 'nodeHeader', 'defaults', 'reduce', 'style', 'layout', 'export', 'upload']
+REDUCTIONS = ['topNodes', 'neighborhood', 'collapse']
+
+
+def expand_jobs(config, base):
+    #one dictionary of settings for every job in the config, with the job's overrides applied and its paths resolved
+    defaults = dict((k, config[k]) for k in SETTINGS if k in config)
+    jobs = []
+    for entry in config.get('jobs', []):
+        if 'edgefile' not in entry:
+            raise ValueError("Every job needs an edgefile: " + json.dumps(entry))
+        pattern = os.path.join(base, entry['edgefile'])
+        if '*' in pattern:
+            if pattern.count('*') > 1:
+                raise ValueError("An edgefile pattern may contain only one '*': " + entry['edgefile'])
+            prefix, suffix = pattern.split('*')
+            matches = [(f[len(prefix):len(f) - len(suffix)], f) for f in sorted(glob.glob(pattern))]
+        else:
+            name = os.path.splitext(os.path.basename(pattern))[0]
+            matches = [(entry.get('name', name), pattern)]
+
+        for name, edgefile in matches:
+            job = dict(defaults)
+            job.update(entry)
+            job = fill_name(job, name)
+            job['name'] = name
+            job['edgefile'] = edgefile
+            if job.get('nodefile'):
+                job['nodefile'] = os.path.join(base, job['nodefile'])
+            for key in ['edgefile', 'nodefile']:
+                if key in job.get('export', {}):
+                    job['export'][key] = os.path.join(base, job['export'][key])
+            jobs.append(job)
+    return jobs
+
+
+def fill_name(x, name):
+    #replaces '{name}' by the job name in every string of a config value
+    if isinstance(x, str):
+        return x.replace('{name}', name)
+    if isinstance(x, list):
+        return [fill_name(y, name) for y in x]
+    if isinstance(x, dict):
+        return dict((k, fill_name(v, name)) for k, v in x.items())
+    return x
+
+
+def check_job(job):
+    #catches mistakes in the settings of a job before any work is done
+    for key in job:
+        if key not in SETTINGS + ['name', 'edgefile', 'nodefile']:
+            raise ValueError("Unknown setting '" + key + "' in job " + job['name'] + ". Choose from " + str(SETTINGS + ['name', 'edgefile', 'nodefile']))
+    for step in job.get('reduce', []):
+        if len(step) != 1 or list(step)[0] not in REDUCTIONS:
+            raise ValueError("Each reduction is a dictionary with one of " + str(REDUCTIONS) + " as its key: " + json.dumps(step))
+    export = job.get('export')
+    if export and not ('edgefile' in export and 'nodefile' in export):
+        raise ValueError("The export of job " + job['name'] + " needs an edgefile and a nodefile.")
+    upload = job.get('upload')
+    if upload and 'user' not in upload:
+        raise ValueError("The upload of job " + job['name'] + " needs a user.")
+
+
+def run_job(job):
+    #parses, reduces, styles, lays out, exports and uploads one graph, returning a summary of how it went.
+    #everything the steps print is captured so that the progress lines of the batch stay readable.
+    result = {'name': job['name'], 'ok': False, 'seconds': {}, 'nodes': None, 'edges': None, 'upload': None, 'error': None}
+    output = io.StringIO()
+    step = 'parse'
+    try:
+        with contextlib.redirect_stdout(output):
+            start = time.time()
+            g = missionControl.parse(job['edgefile'], delimiter=job.get('delimiter', '\t'), isDirected=job.get('directed', False),
+                                     edgeHeader=job.get('edgeHeader'), nodefile=job.get('nodefile'), nodeHeader=job.get('nodeHeader'),
+                                     interactive=False)
+            result['seconds']['parse'] = time.time() - start
+
+            for step_config in job.get('reduce', []):
+                step, kwargs = list(step_config.items())[0]
+                start = time.time()
+                g = getattr(g, step)(**kwargs)
+                result['seconds'][step] = result['seconds'].get(step, 0.0) + time.time() - start
+
+            step = 'defaults'
+            for GS_attr, value in job.get('defaults', {}).items():
+                g.default(GS_attr, value)
+
+            if job.get('style'):
+                step = 'style'
+                start = time.time()
+                #the jobs already run in parallel processes, so each one computes its mappings in a single thread
+                g.style(job['style'], workers=1)
+                result['seconds']['style'] = time.time() - start
+
+            if job.get('layout'):
+                step = 'layout'
+                layout = job['layout']
+                if isinstance(layout, str):
+                    layout = {'method': layout}
+                start = time.time()
+                g.layout(**layout)
+                result['seconds']['layout'] = time.time() - start
+
+            if job.get('export'):
+                step = 'export'
+                start = time.time()
+                for path in [job['export']['edgefile'], job['export']['nodefile']]:
+                    if os.path.dirname(path):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                g.export(job['export']['edgefile'], job['export']['nodefile'], job['export'].get('delimiter', '\t'))
+                result['seconds']['export'] = time.time() - start
+
+            if job.get('upload'):
+                step = 'upload'
+                upload = job['upload']
+                start = time.time()
+                if not upload.get('async', False) and missionControl.graphspace_utils.getSession(upload['user']) == None:
+                    missionControl.graphspace_utils.login(upload['user'], job['password'])
+                result['upload'] = g.uploadGraph(title=upload.get('title', job['name']), graphID=upload.get('graphID', job['name']),
+                                                 desc=upload.get('desc', ''), tags=upload.get('tags', []), force=upload.get('force', False),
+                                                 compress=upload.get('compress'), archive=upload.get('archive'),
+                                                 async_=upload.get('async', False), style_classes=upload.get('style_classes'),
+                                                 raise_errors=True, user=upload['user'], timeout=upload.get('timeout'))
+                result['seconds']['upload'] = time.time() - start
+                if result['upload'] == 'failed':
+                    raise RuntimeError('GraphSpace did not accept the graph')
+
+        result['nodes'] = len(g.nodes)
+        result['edges'] = len(g.edges)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = '%s failed: %s: %s' % (step, e.__class__.__name__, e)
+    return result
+
+
+def run_batch(jobs, workers, report):
+    #runs the jobs with up to workers processes and calls report(i, result) as each one finishes; returns the results in finishing order
+    results = []
+    if workers <= 1:
+        for job in jobs:
+            results.append(run_job(job))
+            report(len(results), results[-1])
+        return results
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = dict((pool.submit(run_job, job), job) for job in jobs)
+        for future in concurrent.futures.as_completed(pending):
+            try:
+                result = future.result()
+            except Exception as e:
+                #the worker died (e.g. killed for running out of memory, which breaks the whole pool) or its result could not be sent back
+                result = {'name': pending[future]['name'], 'ok': False, 'seconds': {}, 'nodes': None, 'edges': None, 'upload': None,
+                          'error': 'worker failed: %s: %s' % (e.__class__.__name__, e)}
+            results.append(result)
+            report(len(results), result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parses, styles, exports and uploads many graphs from a JSON config file, without any prompts.')
+    parser.add_argument('config', help='JSON config file (see the top of mission_batch.py)')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: "workers" in the config, or the number of CPUs)')
+    parser.add_argument('--jsonl', action='store_true', help='print progress as one JSON object per job instead of text')
+    args = parser.parse_args()
+    #retries and other problems of the uploads go to standard error, so that standard output only has the progress lines
+    logging.basicConfig(stream=sys.stderr, level=logging.WARNING, format='%(message)s')
+
+    with open(args.config) as f:
+        config = json.load(f)
+    jobs = expand_jobs(config, os.path.dirname(os.path.abspath(args.config)))
+    for job in jobs:
+        check_job(job)
+        upload = job.get('upload')
+        if upload and not upload.get('async', False):
+            variable = upload.get('password_env', 'GRAPHSPACE_PASSWORD')
+            if variable not in os.environ:
+                sys.exit("The upload of job " + job['name'] + " needs a password in the " + variable + " environment variable.")
+            job['password'] = os.environ[variable]
+            upload.pop('password_env', None)
+    if not jobs:
+        sys.exit("No jobs found in " + args.config + ".")
+
+    workers = args.workers or config.get('workers') or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    start = time.time()
+
+    def report(i, result):
+        if args.jsonl:
+            line = json.dumps(dict(result, done=i, total=len(jobs), elapsed=time.time() - start))
+        elif result['ok']:
+            steps = ', '.join('%s %.2f s' % (k, v) for k, v in result['seconds'].items())
+            line = '[%d/%d] ok     %s: %d nodes, %d edges; %s' % (i, len(jobs), result['name'], result['nodes'], result['edges'], steps)
+            if result['upload']:
+                line += ' (' + result['upload'] + ')'
+        else:
+            line = '[%d/%d] FAILED %s: %s' % (i, len(jobs), result['name'], result['error'])
+        print(line, flush=True)
+
+    results = run_batch(jobs, workers, report)
+    failed = [r for r in results if not r['ok']]
+    if not args.jsonl:
+        print('%d jobs in %.2f s with %d workers, %d failed' % (len(results), time.time() - start, workers, len(failed)), flush=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()